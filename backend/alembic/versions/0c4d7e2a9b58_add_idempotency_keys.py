@@ -0,0 +1,40 @@
+"""add idempotency keys
+
+Revision ID: 0c4d7e2a9b58
+Revises: f3a8c1d5e926
+Create Date: 2026-10-19 18:04:16.730254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c4d7e2a9b58'
+down_revision: Union[str, Sequence[str], None] = 'f3a8c1d5e926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create idempotency_keys for replaying retried POST requests."""
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.String(length=255), primary_key=True),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='in_progress'),
+        sa.Column('response_status', sa.Integer(), nullable=True),
+        sa.Column('response_headers', sa.JSON(), nullable=True),
+        sa.Column('response_body', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Drop idempotency_keys."""
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
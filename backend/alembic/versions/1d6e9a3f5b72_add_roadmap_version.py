@@ -0,0 +1,29 @@
+"""add roadmap version
+
+Revision ID: 1d6e9a3f5b72
+Revises: 0c4d7e2a9b58
+Create Date: 2026-10-19 18:12:47.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d6e9a3f5b72'
+down_revision: Union[str, Sequence[str], None] = '0c4d7e2a9b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add roadmaps.version for optimistic concurrency control of step transitions."""
+    op.add_column('roadmaps', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Drop roadmaps.version."""
+    with op.batch_alter_table('roadmaps') as batch_op:
+        batch_op.drop_column('version')
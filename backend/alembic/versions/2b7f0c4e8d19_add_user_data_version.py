@@ -0,0 +1,29 @@
+"""add user data version
+
+Revision ID: 2b7f0c4e8d19
+Revises: 1d6e9a3f5b72
+Create Date: 2026-10-19 19:03:12.804117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7f0c4e8d19'
+down_revision: Union[str, Sequence[str], None] = '1d6e9a3f5b72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add users.data_version, the per-user counter behind ETags on user, roadmap and task reads."""
+    op.add_column('users', sa.Column('data_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Drop users.data_version."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_version')
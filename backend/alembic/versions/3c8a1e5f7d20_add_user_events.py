@@ -0,0 +1,38 @@
+"""add user events
+
+Revision ID: 3c8a1e5f7d20
+Revises: 2b7f0c4e8d19
+Create Date: 2026-10-19 19:41:05.216390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8a1e5f7d20'
+down_revision: Union[str, Sequence[str], None] = '2b7f0c4e8d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create user_events, the cross-process outbox for WebSocket / SSE push events."""
+    op.create_table(
+        'user_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_events_created_at', 'user_events', ['created_at'])
+
+
+def downgrade() -> None:
+    """Drop user_events."""
+    op.drop_index('ix_user_events_created_at', table_name='user_events')
+    op.drop_table('user_events')
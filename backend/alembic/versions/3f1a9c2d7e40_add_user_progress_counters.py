@@ -0,0 +1,51 @@
+"""add user progress counters
+
+Revision ID: 3f1a9c2d7e40
+Revises: 7b5238fcf721
+Create Date: 2026-10-19 09:12:05.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7e40'
+down_revision: Union[str, Sequence[str], None] = '7b5238fcf721'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create user_progress and user_step_progress counter tables."""
+    op.create_table(
+        'user_progress',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('active_roadmap_id', sa.Integer(), nullable=True),
+        sa.Column('current_step', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('tasks_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tasks_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_completed_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        'user_step_progress',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, index=True),
+        sa.Column('roadmap_id', sa.Integer(), nullable=False),
+        sa.Column('step_num', sa.Integer(), nullable=False),
+        sa.Column('tasks_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tasks_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('roadmap_id', 'step_num', name='uq_step_progress_roadmap_step'),
+    )
+    # Counters are rebuilt lazily from raw rows the first time a user is touched,
+    # or eagerly with `python manage.py progress rebuild`.
+
+
+def downgrade() -> None:
+    """Drop progress counter tables."""
+    op.drop_table('user_step_progress')
+    op.drop_table('user_progress')
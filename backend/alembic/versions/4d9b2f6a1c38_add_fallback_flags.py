@@ -0,0 +1,32 @@
+"""add fallback flags
+
+Revision ID: 4d9b2f6a1c38
+Revises: 3c8a1e5f7d20
+Create Date: 2026-10-19 21:14:37.520913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d9b2f6a1c38'
+down_revision: Union[str, Sequence[str], None] = '3c8a1e5f7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add is_fallback to roadmaps and tasks, marking canned content awaiting an LLM upgrade."""
+    op.add_column('roadmaps', sa.Column('is_fallback', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('tasks', sa.Column('is_fallback', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    """Drop the is_fallback flags."""
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('is_fallback')
+    with op.batch_alter_table('roadmaps') as batch_op:
+        batch_op.drop_column('is_fallback')
@@ -0,0 +1,49 @@
+"""never reuse task and roadmap ids
+
+Revision ID: 6a0c3e9d4b17
+Revises: 4d9b2f6a1c38
+Create Date: 2026-10-20 09:41:12.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a0c3e9d4b17'
+down_revision: Union[str, Sequence[str], None] = '4d9b2f6a1c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Live table -> archive table whose ids it must never hand out again
+ARCHIVED = {'roadmaps': 'roadmaps_archive', 'tasks': 'tasks_archive'}
+
+
+def upgrade() -> None:
+    """Rebuild roadmaps and tasks with AUTOINCREMENT on SQLite.
+
+    A plain INTEGER PRIMARY KEY reuses the highest ids once the archiver
+    moves those rows out, colliding with tasks_archive/roadmaps_archive.
+    The id counters start above both the live and the archived ids.
+    PostgreSQL sequences never hand out an id twice, so nothing changes there.
+    """
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, archive in ARCHIVED.items():
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', "
+            f"max(coalesce((SELECT max(id) FROM {table}), 0), coalesce((SELECT max(id) FROM {archive}), 0))"
+        )
+
+
+def downgrade() -> None:
+    """Rebuild roadmaps and tasks without AUTOINCREMENT on SQLite."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in ARCHIVED:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+            pass
@@ -0,0 +1,56 @@
+"""add task and roadmap archive tables
+
+Revision ID: a4d27e9b1c35
+Revises: 3f1a9c2d7e40
+Create Date: 2026-10-19 10:03:41.552907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d27e9b1c35'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create roadmaps_archive and tasks_archive."""
+    op.create_table(
+        'roadmaps_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, index=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('steps', sa.JSON(), nullable=False),
+        sa.Column('current_step', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('0')),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        'tasks_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, index=True),
+        sa.Column('roadmap_id', sa.Integer(), nullable=False),
+        sa.Column('step_num', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('assigned_time', sa.DateTime(), nullable=False),
+        sa.Column('sources', sa.JSON(), nullable=False, server_default='[]'),
+        sa.Column('completed', sa.Boolean(), nullable=False, server_default=sa.text('0')),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('0')),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Drop archive tables."""
+    op.drop_table('tasks_archive')
+    op.drop_table('roadmaps_archive')
@@ -0,0 +1,42 @@
+"""add jobs table
+
+Revision ID: b6c3e8f1a0d4
+Revises: 5e8b0f6a2d91
+Create Date: 2026-10-19 13:02:41.518273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6c3e8f1a0d4'
+down_revision: Union[str, Sequence[str], None] = '5e8b0f6a2d91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create jobs for asynchronous roadmap generation."""
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_jobs_user_id', 'jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    """Drop jobs."""
+    op.drop_index('ix_jobs_user_id', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,42 @@
+"""add job queue columns
+
+Revision ID: d9a4f2b7c163
+Revises: b6c3e8f1a0d4
+Create Date: 2026-10-19 14:37:09.224815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4f2b7c163'
+down_revision: Union[str, Sequence[str], None] = 'b6c3e8f1a0d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add priority, retry and lease columns so `jobs` can serve as a durable queue."""
+    op.add_column('jobs', sa.Column('priority', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('jobs', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('jobs', sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'))
+    op.add_column('jobs', sa.Column('run_after', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('locked_by', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('locked_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE jobs SET run_after = created_at WHERE run_after IS NULL")
+    op.create_index('ix_jobs_claim', 'jobs', ['status', 'priority', 'run_after'])
+
+
+def downgrade() -> None:
+    """Drop the queue columns."""
+    op.drop_index('ix_jobs_claim', table_name='jobs')
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('locked_at')
+        batch_op.drop_column('locked_by')
+        batch_op.drop_column('run_after')
+        batch_op.drop_column('max_attempts')
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('priority')
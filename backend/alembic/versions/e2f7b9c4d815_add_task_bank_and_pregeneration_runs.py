@@ -0,0 +1,50 @@
+"""add task bank and pregeneration runs
+
+Revision ID: e2f7b9c4d815
+Revises: d9a4f2b7c163
+Create Date: 2026-10-19 15:48:52.310647
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f7b9c4d815'
+down_revision: Union[str, Sequence[str], None] = 'd9a4f2b7c163'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create task_bank (pre-generated tasks) and pregeneration_runs (run reports)."""
+    op.create_table(
+        'task_bank',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, index=True),
+        sa.Column('roadmap_id', sa.Integer(), nullable=False),
+        sa.Column('step_num', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('tasks', sa.JSON(), nullable=False),
+        sa.Column('source_task_ids', sa.JSON(), nullable=True),
+        sa.Column('input_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('consumed_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('roadmap_id', 'step_num', 'kind', name='uq_task_bank_roadmap_step_kind'),
+    )
+    op.create_table(
+        'pregeneration_runs',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('report', sa.JSON(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Drop task_bank and pregeneration_runs."""
+    op.drop_table('pregeneration_runs')
+    op.drop_table('task_bank')
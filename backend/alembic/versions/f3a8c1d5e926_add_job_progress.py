@@ -0,0 +1,29 @@
+"""add job progress
+
+Revision ID: f3a8c1d5e926
+Revises: e2f7b9c4d815
+Create Date: 2026-10-19 16:55:31.087412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c1d5e926'
+down_revision: Union[str, Sequence[str], None] = 'e2f7b9c4d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add jobs.progress for long-running jobs such as bulk imports."""
+    op.add_column('jobs', sa.Column('progress', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop jobs.progress."""
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('progress')
@@ -0,0 +1,60 @@
+"""History and analytics endpoints, called as plain functions with a session."""
+
+import pytest
+from fastapi import Response
+
+from routes import tasks
+
+
+@pytest.mark.growth(0)
+def bench_task_history_page_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_task_history, dataset.typical_user_id, Response(), limit=100, cursor=None,
+                  format="json", db=db)
+
+
+@pytest.mark.growth(0)
+def bench_task_history_page_heavy(benchmark, dataset):
+    """First page only; keyset pagination should keep this flat however long the history is."""
+    with dataset.session() as db:
+        benchmark(tasks.get_task_history, dataset.heavy_user_id, Response(), limit=100, cursor=None,
+                  format="json", db=db)
+
+
+@pytest.mark.growth(0)
+def bench_completed_groups_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_completed_tasks, dataset.typical_user_id, Response(), limit=100, cursor=None,
+                  format="json", db=db)
+
+
+@pytest.mark.growth(0)
+def bench_completed_within_one_minute_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_completed_count_within_one_minute, dataset.typical_user_id, db=db)
+
+
+@pytest.mark.growth(1)
+def bench_completed_per_minute_heavy(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_completed_count_per_minute, dataset.heavy_user_id, db=db)
+
+
+@pytest.mark.growth(0)
+def bench_daily_completions_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_daily_completions, dataset.typical_user_id, days=30, db=db)
+
+
+@pytest.mark.growth(0)
+def bench_daily_completions_heavy(benchmark, dataset):
+    """Served from completion_rollups, so flat even for the heaviest user."""
+    with dataset.session() as db:
+        benchmark(tasks.get_daily_completions, dataset.heavy_user_id, days=30, db=db)
+
+
+@pytest.mark.growth(1)
+def bench_completed_buckets_heavy(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(tasks.get_completed_count_buckets, dataset.heavy_user_id, bucket="day", start=None,
+                  end=None, fill=False, db=db)
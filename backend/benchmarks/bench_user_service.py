@@ -0,0 +1,57 @@
+"""Per-user service calls, which should not slow down as other users' rows pile up."""
+
+import pytest
+
+from services.progress_service import ProgressService
+from services.user_service import UserService
+from database import Task
+
+user_service = UserService()
+progress_service = ProgressService()
+
+
+@pytest.mark.growth(0)
+def bench_get_user_tasks_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(user_service.get_user_tasks, db, dataset.typical_user_id)
+
+
+@pytest.mark.growth(1)
+def bench_get_user_tasks_heavy(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(user_service.get_user_tasks, db, dataset.heavy_user_id)
+
+
+@pytest.mark.growth(0)
+def bench_list_task_rows_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(user_service.list_task_rows, db, dataset.typical_user_id)
+
+
+@pytest.mark.growth(0)
+def bench_get_progress_typical(benchmark, dataset):
+    with dataset.session() as db:
+        benchmark(progress_service.get_progress, db, dataset.typical_user_id)
+
+
+@pytest.mark.growth(0)
+def bench_complete_one_task_typical(benchmark, dataset):
+    """Completing one of several open tasks: counter updates only, no step advance and no LLM call."""
+    with dataset.session() as db:
+        task_id = db.query(Task.id).filter(
+            Task.user_id == dataset.typical_user_id, Task.completed == False
+        ).order_by(Task.id).limit(1).scalar()
+
+    def setup():
+        return (dataset.rollback_session(),), {}
+
+    def complete(session):
+        try:
+            return user_service.handle_task_completion(
+                session.db, dataset.typical_user_id, [{"task_id": task_id, "completed": True}]
+            )
+        finally:
+            session.rollback()
+
+    result = benchmark.pedantic(complete, setup=setup, rounds=50)
+    assert result["status"] == "all_completed"
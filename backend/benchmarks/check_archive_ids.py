@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Regression check: archived task and roadmap ids are never handed out again.
+
+Each round, a user completes a whole roadmap and it is archived, then a new
+roadmap is generated, regenerated and archived again. Every new roadmap and
+task must get an id above all archived ones, every archive pass must
+succeed, and the user's completed history across the live and archive
+tables must not repeat an id.
+
+The LLM is replaced by a fake and a throwaway SQLite database is used
+unless DATABASE_URL is set. --alembic builds the schema with the
+migrations instead of create_all, as an upgraded deployment has it.
+
+Usage:
+    python benchmarks/check_archive_ids.py [--rounds 3] [--alembic]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("GROQ_API_KEY", "archive-check")
+os.environ.setdefault("GOOGLE_API_KEY", "archive-check")
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/archive-check.db"
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = {}
+
+
+class FakeLLM:
+    """Answers roadmap and task prompts with canned JSON."""
+
+    def invoke(self, prompt, *args, **kwargs):
+        if '"steps"' in prompt:
+            steps = [{"step_num": i, "title": f"Step {i}"} for i in (1, 2, 3)]
+            return FakeMessage(json.dumps({"title": "Archive check roadmap", "steps": steps}))
+        tasks = [{"title": f"Task {i}", "description": "archive check", "sources": []} for i in range(3)]
+        return FakeMessage(json.dumps({"tasks": tasks}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="Complete-and-archive rounds")
+    parser.add_argument("--alembic", action="store_true", help="Create the schema with the Alembic migrations")
+    args = parser.parse_args()
+
+    import config
+    config.llm = FakeLLM()
+
+    import database
+    from sqlalchemy import func, select
+    from database import SessionLocal, Roadmap, Task, RoadmapArchive, TaskArchive
+    from schemas.users import UserCreate
+    from services.archive_service import ArchiveService, completed_tasks_query
+    from services.user_service import UserService
+
+    if args.alembic:
+        from alembic import command
+        from alembic.config import Config
+        alembic_config = Config(os.path.join(BACKEND, "alembic.ini"))
+        command.upgrade(alembic_config, "head")
+    else:
+        database.Base.metadata.create_all(database.engine)
+
+    users, archive = UserService(), ArchiveService()
+    problems = []
+
+    def sweep(label: str) -> None:
+        try:
+            moved = archive.archive_inactive(db, user_id=user.id)
+        except Exception as e:
+            db.rollback()
+            problems.append(f"{label}: archiving failed: {type(e).__name__}: {e}")
+            return
+        if not moved["tasks"] or not moved["roadmaps"]:
+            problems.append(f"{label}: archived {moved}, expected tasks and a roadmap")
+
+    db = SessionLocal()
+    try:
+        user = users.create_user(db, UserCreate(name="archive-check", age=30, time_duration=60, interests=["python"]))
+        for round_num in range(1, args.rounds + 1):
+            # Everything the user had is archived by now, so the live tables hold none of their rows
+            users.generate_roadmap(db, user.id)
+            for live, archived in ((Roadmap, RoadmapArchive), (Task, TaskArchive)):
+                newest = db.execute(select(func.min(live.id)).where(live.user_id == user.id, live.is_active == True)).scalar()
+                highest_archived = db.execute(select(func.max(archived.id))).scalar() or 0
+                if newest is None or newest <= highest_archived:
+                    problems.append(f"round {round_num}: new {live.__tablename__} id {newest} "
+                                    f"reuses an archived id (highest archived {highest_archived})")
+            status = None
+            while status != "roadmap_completed":
+                tasks = db.query(Task).filter(Task.user_id == user.id, Task.is_active == True,
+                                              Task.completed == False).all()
+                if not tasks:
+                    problems.append(f"round {round_num}: no open tasks left before the roadmap was completed")
+                    break
+                result = users.handle_task_completion(db, user.id, [{"task_id": t.id, "completed": True} for t in tasks])
+                status = result.get("status")
+            sweep(f"round {round_num}, completed roadmap")
+            users.generate_roadmap(db, user.id)
+            users.regenerate_roadmap(db, user.id)
+            sweep(f"round {round_num}, regenerated roadmap")
+            users.regenerate_roadmap(db, user.id)
+            db.query(Roadmap).filter(Roadmap.user_id == user.id).update({Roadmap.is_active: False})
+            db.commit()
+            sweep(f"round {round_num}, abandoned roadmap")
+        completed = completed_tasks_query(user.id, "id")
+        ids = db.execute(select(completed.c.id)).scalars().all()
+        if len(ids) != len(set(ids)):
+            problems.append(f"completed history repeats ids: {sorted(ids)}")
+    finally:
+        db.close()
+
+    schema = "migrations" if args.alembic else "create_all"
+    print(f"{args.rounds} complete-and-archive rounds ({schema})")
+    if problems:
+        print(f"{len(problems)} problems:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("OK: no archived id was reused")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Fixtures for the scaling benchmarks (bench_*.py, run with pytest-benchmark).
+
+Every benchmark taking the `dataset` fixture runs once per scale. A scale is
+the number of task rows in a database built by generate_data.py and cached
+in --bench-data-dir, so it is generated only once. Each benchmark declares
+how its time should grow with the row count through `@pytest.mark.growth(k)`:
+0 for constant, 1 for linear. The summary reports the measured exponent
+between the two largest scales and flags benchmarks growing faster than
+declared.
+
+    pip install pytest pytest-benchmark
+    pytest benchmarks                                  # 1k and 100k rows
+    pytest benchmarks --scales 1k,100k,1m              # adds 1M rows (~1 minute to generate the first time)
+    pytest benchmarks --fail-on-growth --growth-json growth.json
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+# The app's own engine is not benchmarked; keep it off the real database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/unused.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Measure the services, not span bookkeeping
+os.environ.setdefault("TRACING", "0")
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+import config
+import generate_data
+from database import User
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+# Bump when generate_data changes shape so cached databases are rebuilt
+DATASET_VERSION = 1
+DEFAULT_GROWTH_TOLERANCE = 0.3
+
+
+class FakeLLM:
+    """Benchmarked paths should not reach the LLM; fail loudly if one does."""
+
+    def invoke(self, prompt, *args, **kwargs):
+        raise AssertionError("benchmark reached the LLM")
+
+
+config.llm = FakeLLM()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("scaling benchmarks")
+    group.addoption("--scales", default=os.getenv("BENCH_SCALES", "1k,100k"),
+                    help=f"Comma-separated dataset sizes in task rows, from {', '.join(SCALES)}")
+    group.addoption("--bench-data-dir", default=os.getenv("BENCH_DATA_DIR",
+                                                          os.path.join(tempfile.gettempdir(), "guidance-bench-data")),
+                    help="Where generated SQLite datasets are cached")
+    group.addoption("--growth-tolerance", type=float, default=DEFAULT_GROWTH_TOLERANCE,
+                    help="Flag benchmarks whose growth exponent exceeds the declared one by more than this")
+    group.addoption("--growth-json", help="Also write the growth report to this file")
+    group.addoption("--fail-on-growth", action="store_true", help="Fail the run when a benchmark is flagged")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "growth(exponent): expected growth of the time with dataset rows "
+                                       "(0 constant, 1 linear)")
+    config._growth_results = {}
+
+
+def _scales(config) -> List[str]:
+    names = [s.strip().lower() for s in config.getoption("scales").split(",") if s.strip()]
+    unknown = [s for s in names if s not in SCALES]
+    if unknown:
+        raise pytest.UsageError(f"Unknown scales {unknown}; choose from {list(SCALES)}")
+    return sorted(names, key=SCALES.get)
+
+
+def pytest_generate_tests(metafunc):
+    if "dataset" in metafunc.fixturenames:
+        scales = _scales(metafunc.config)
+        metafunc.parametrize("dataset", scales, indirect=True, ids=scales, scope="session")
+
+
+@dataclass
+class Dataset:
+    scale: str
+    rows: int
+    engine: object
+    heavy_user_id: int
+    typical_user_id: int
+    info: Dict[str, int] = field(default_factory=dict)
+
+    def session(self) -> Session:
+        return Session(self.engine)
+
+    def rollback_session(self) -> "RollbackSession":
+        return RollbackSession(self.engine)
+
+
+class RollbackSession:
+    """A session whose commits only release savepoints; `rollback()` discards everything.
+
+    Lets write benchmarks run the same change every round without drifting the cached dataset.
+    """
+
+    def __init__(self, engine):
+        self.connection = engine.connect()
+        self.transaction = self.connection.begin()
+        self.db = Session(bind=self.connection, join_transaction_mode="create_savepoint")
+
+    def rollback(self) -> None:
+        self.db.close()
+        self.transaction.rollback()
+        self.connection.close()
+
+
+def _sqlite_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    # pysqlite defers BEGIN and breaks SAVEPOINT; let SQLAlchemy issue BEGIN itself
+    @event.listens_for(engine, "connect")
+    def _no_implicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+@pytest.fixture(scope="session")
+def dataset(request) -> Dataset:
+    scale = request.param
+    rows = SCALES[scale]
+    data_dir = request.config.getoption("bench_data_dir")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bench-{scale}-v{DATASET_VERSION}.db")
+    if not os.path.exists(path):
+        partial = path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        engine = create_engine(f"sqlite:///{partial}")
+        generate_data.generate(engine, rows, seed=0)
+        engine.dispose()
+        shutil.move(partial, path)
+    engine = _sqlite_engine(path)
+    with Session(engine) as db:
+        heavy = db.execute(select(User.id).where(User.name == generate_data.HEAVY_USER_NAME)).scalar_one()
+        typical = db.execute(select(User.id).where(User.name == generate_data.TYPICAL_USER_NAME)).scalar_one()
+    yield Dataset(scale, rows, engine, heavy, typical)
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _record_growth(request):
+    """After a dataset benchmark ran, keep its mean time per scale for the growth report."""
+    yield
+    callspec = getattr(request.node, "callspec", None)
+    bench = request.node.funcargs.get("benchmark")
+    if callspec is None or "dataset" not in callspec.params or bench is None or not getattr(bench, "stats", None):
+        return
+    marker = request.node.get_closest_marker("growth")
+    expected = marker.args[0] if marker else 1
+    name = request.node.originalname
+    entry = request.config._growth_results.setdefault(name, {"expected": expected, "means": {}})
+    entry["means"][callspec.params["dataset"]] = bench.stats.stats.mean
+
+
+def growth_report(config) -> List[dict]:
+    tolerance = config.getoption("growth_tolerance")
+    report = []
+    for name, entry in sorted(config._growth_results.items()):
+        means = sorted(entry["means"].items(), key=lambda kv: SCALES[kv[0]])
+        exponent = None
+        if len(means) >= 2:
+            (small, t_small), (large, t_large) = means[-2], means[-1]
+            exponent = math.log(t_large / t_small) / math.log(SCALES[large] / SCALES[small])
+        report.append({
+            "benchmark": name,
+            "mean_seconds": {scale: mean for scale, mean in means},
+            "expected_exponent": entry["expected"],
+            "exponent": None if exponent is None else round(exponent, 2),
+            "flagged": exponent is not None and exponent > entry["expected"] + tolerance,
+        })
+    return report
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    report = growth_report(config)
+    if not report:
+        return
+    terminalreporter.section("growth with dataset size")
+    scales = _scales(config)
+    terminalreporter.write_line(f"{'benchmark':<48} " + " ".join(f"{s:>10}" for s in scales)
+                                + f" {'exponent':>9} {'expected':>9}")
+    for row in report:
+        cells = " ".join(f"{row['mean_seconds'][s] * 1000:>8.2f}ms" if s in row["mean_seconds"] else f"{'-':>10}"
+                         for s in scales)
+        exponent = "-" if row["exponent"] is None else f"{row['exponent']:.2f}"
+        flag = "  SUPER-LINEAR" if row["flagged"] and row["expected_exponent"] >= 1 else (
+            "  GROWS" if row["flagged"] else "")
+        terminalreporter.write_line(f"{row['benchmark']:<48} {cells} {exponent:>9} {row['expected_exponent']:>9}{flag}",
+                                    red=row["flagged"])
+    path = config.getoption("growth_json")
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        terminalreporter.write_line(f"growth report written to {path}")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if session.config.getoption("fail_on_growth") and any(r["flagged"] for r in growth_report(session.config)):
+        session.exitstatus = 1
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for scaling tests.
+
+Fills a SQLite or Postgres database with users, roadmaps (one active plus
+regenerated, inactive ones), tasks and task failures shaped like real usage:
+tasks are assigned in batches of three as users move through roadmap steps,
+most batches get completed, some are superseded by reassignment after a
+failure report, and only the current batch stays open. Task counts per user
+follow a long-tailed distribution, and one extra "bench-heavy" user gets a
+large share of all rows (with many open tasks) so per-user queries can be
+measured on a user with thousands of tasks. The denormalized counters
+(user_progress, step_progress, completion_rollups) are written to match, so
+`python manage.py progress check` passes on the result.
+
+Rows are added after whatever the database already holds. Tables are created
+when missing; run `alembic upgrade head` first to get the migrated schema.
+
+Usage:
+    python benchmarks/generate_data.py --tasks 100000 [--users 1000] [--heavy-user-tasks 10000]
+    DATABASE_URL=postgresql://user:pw@localhost/bench python benchmarks/generate_data.py --tasks 1000000
+    python benchmarks/generate_data.py --database-url sqlite:///bench.db --tasks 1000 --check 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "generate-data")
+os.environ.setdefault("GOOGLE_API_KEY", "generate-data")
+
+from sqlalchemy import create_engine, func, inspect, insert, select, text
+from sqlalchemy.engine import Engine
+
+import database
+from database import User, Roadmap, Task, TaskFailure, UserProgress, StepProgress, CompletionRollup
+
+HEAVY_USER_NAME = "bench-heavy"
+TYPICAL_USER_NAME = "bench-typical"
+TASKS_PER_BATCH = 3
+STEPS_PER_ROADMAP = 5
+
+INTERESTS = ["python", "javascript", "react", "docker", "kubernetes", "sql", "rust", "go", "machine learning",
+             "system design", "testing", "aws", "linux", "typescript", "data engineering"]
+STEP_TITLES = ["Fundamentals of {}", "Core tooling for {}", "Building a small {} project",
+               "Testing and debugging {}", "Advanced {} patterns", "Shipping {} to production"]
+TASK_TITLES = ["Read the official {} guide", "Write a short {} exercise", "Refactor a {} snippet",
+               "Debug a failing {} example", "Summarize a {} concept", "Build a tiny {} tool"]
+FAILURE_REASONS = ["Not enough time this week", "Tasks were too hard", "Got stuck on setup",
+                   "Work deadlines got in the way", "Did not understand the instructions"]
+
+
+class Batcher:
+    """Buffers rows per table and writes them with executemany inserts."""
+
+    def __init__(self, engine: Engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pending: Dict[Any, List[dict]] = defaultdict(list)
+        self.written: Dict[str, int] = defaultdict(int)
+
+    def add(self, table, row: dict) -> None:
+        rows = self.pending[table]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None) -> None:
+        # Parents before children so foreign keys hold on Postgres
+        order = [User.__table__, Roadmap.__table__, Task.__table__, TaskFailure.__table__,
+                 UserProgress.__table__, StepProgress.__table__, CompletionRollup.__table__]
+        tables = [table] if table is not None else order
+        if table is not None and table is not User.__table__:
+            # Children may reference parents still waiting in their buffers
+            tables = order[:order.index(table) + 1]
+        with self.engine.begin() as conn:
+            for t in tables:
+                rows = self.pending.pop(t, None)
+                if rows:
+                    conn.execute(insert(t), rows)
+                    self.written[t.name] += len(rows)
+
+
+class IdAllocator:
+    """Hands out primary keys after the current maximum of each table."""
+
+    def __init__(self, engine: Engine, *models):
+        self.next: Dict[Any, int] = {}
+        with engine.connect() as conn:
+            for model in models:
+                self.next[model] = (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def take(self, model) -> int:
+        value = self.next[model]
+        self.next[model] = value + 1
+        return value
+
+
+def task_counts(rng: random.Random, users: int, total: int) -> List[int]:
+    """Split `total` tasks across users with a long tail (Pareto weights), at least one batch each."""
+    weights = [rng.paretovariate(1.5) for _ in range(users)]
+    scale = max(total - users * TASKS_PER_BATCH, 0) / sum(weights)
+    counts = [TASKS_PER_BATCH + int(w * scale) for w in weights]
+    counts[0] += total - sum(counts)  # rounding remainder
+    return [max(c, TASKS_PER_BATCH) for c in counts]
+
+
+def generate_user(rng: random.Random, out: Batcher, ids: IdAllocator, name: str, n_tasks: int, now: datetime,
+                  days: int, completed_ratio: float, failure_ratio: float, open_ratio: float) -> None:
+    interests = rng.sample(INTERESTS, rng.randint(1, 3))
+    user_id = ids.take(User)
+    created = now - timedelta(days=days, seconds=-rng.randint(0, 3600))
+    out.add(User.__table__, {
+        "id": user_id, "name": name, "age": rng.randint(16, 65), "time_duration": rng.choice([30, 45, 60, 90, 120]),
+        "interests": interests, "created_at": created, "data_version": 1,
+    })
+
+    # Regenerated roadmaps come first and are inactive; the last one is active
+    n_roadmaps = min(1 + min(int(rng.expovariate(1.2)), 4), max(1, n_tasks // TASKS_PER_BATCH))
+    shares = [rng.random() + 0.2 for _ in range(n_roadmaps)]
+    remaining = n_tasks
+    span = (now - created) / n_roadmaps
+    total = completed = 0
+    last_completed_at: Optional[datetime] = None
+    step_counters: Dict[int, List[int]] = {}
+    daily: Dict[Any, Dict[str, int]] = defaultdict(lambda: {"completed_count": 0, "assigned_count": 0, "failures": 0})
+    active_roadmap_id = current_step = None
+
+    for r in range(n_roadmaps):
+        active = r == n_roadmaps - 1
+        k = remaining if active else max(TASKS_PER_BATCH, int(n_tasks * shares[r] / sum(shares)))
+        k = min(k, remaining - TASKS_PER_BATCH * (n_roadmaps - 1 - r))
+        remaining -= k
+        roadmap_id = ids.take(Roadmap)
+        roadmap_start = created + span * r
+        topic = rng.choice(interests)
+        n_batches = max(1, -(-k // TASKS_PER_BATCH))
+        reached_step = rng.randint(1, STEPS_PER_ROADMAP) if active else STEPS_PER_ROADMAP
+        out.add(Roadmap.__table__, {
+            "id": roadmap_id, "user_id": user_id, "title": f"Learning path: {topic}",
+            "steps": [{"step_num": s, "title": STEP_TITLES[(s - 1) % len(STEP_TITLES)].format(topic)}
+                      for s in range(1, STEPS_PER_ROADMAP + 1)],
+            "current_step": reached_step, "created_at": roadmap_start, "is_active": active,
+            "is_fallback": False, "version": 1,
+        })
+        if active:
+            active_roadmap_id, current_step = roadmap_id, reached_step
+
+        batch_gap = span / (n_batches + 1)
+        # Open tasks: the last batch, plus `open_ratio` of earlier ones for users who pile up work
+        open_batches = {n_batches - 1} if active else set()
+        if active and open_ratio > 0:
+            open_batches.update(b for b in range(n_batches - 1) if rng.random() < open_ratio)
+        for b in range(n_batches):
+            assigned = roadmap_start + batch_gap * (b + 1)
+            step_num = 1 + b * reached_step // n_batches
+            is_open = b in open_batches
+            batch_done = not is_open and rng.random() < completed_ratio
+            first_task_id = None
+            batch_completed = 0
+            size = min(TASKS_PER_BATCH, k - b * TASKS_PER_BATCH)
+            for i in range(size):
+                task_id = ids.take(Task)
+                first_task_id = first_task_id or task_id
+                # Finished batches may still have a straggler left undone
+                done = batch_done and rng.random() < 0.9
+                completed_at = assigned + timedelta(minutes=rng.randint(5, 36 * 60)) if done else None
+                completed_at = min(completed_at, now) if completed_at else None
+                # Undone tasks of past batches were superseded by a reassignment
+                is_active = active and (done or is_open)
+                out.add(Task.__table__, {
+                    "id": task_id, "user_id": user_id, "roadmap_id": roadmap_id, "step_num": step_num,
+                    "title": rng.choice(TASK_TITLES).format(topic),
+                    "description": f"Spend about {rng.randint(10, 60)} minutes on {topic}: follow the steps, "
+                                   f"note what you learned and what is still unclear. " * rng.randint(1, 3),
+                    "assigned_time": assigned, "sources": [f"https://docs.example.com/{topic.replace(' ', '-')}/{task_id}"],
+                    "completed": done, "completed_at": completed_at, "created_at": assigned,
+                    "is_active": is_active, "is_fallback": False,
+                })
+                total += 1
+                daily[assigned.date()]["assigned_count"] += 1
+                if done:
+                    completed += 1
+                    batch_completed += 1
+                    daily[completed_at.date()]["completed_count"] += 1
+                    last_completed_at = max(last_completed_at or completed_at, completed_at)
+                if active and is_active:
+                    counters = step_counters.setdefault(step_num, [0, 0])
+                    counters[0] += 1
+                    counters[1] += int(done)
+            if not is_open and batch_completed < size and rng.random() < failure_ratio:
+                failure_date = min(assigned + timedelta(days=1), now)
+                out.add(TaskFailure.__table__, {
+                    "id": ids.take(TaskFailure), "user_id": user_id, "task_id": first_task_id,
+                    "failure_reason": rng.choice(FAILURE_REASONS), "failure_date": failure_date,
+                    "tasks_completed_count": batch_completed, "total_tasks_count": size,
+                })
+                daily[failure_date.date()]["failures"] += 1
+
+    out.add(UserProgress.__table__, {
+        "user_id": user_id, "active_roadmap_id": active_roadmap_id, "current_step": current_step or 1,
+        "tasks_total": total, "tasks_completed": completed, "last_completed_at": last_completed_at, "updated_at": now,
+    })
+    for step_num, (step_total, step_completed) in sorted(step_counters.items()):
+        out.add(StepProgress.__table__, {
+            "id": ids.take(StepProgress), "user_id": user_id, "roadmap_id": active_roadmap_id,
+            "step_num": step_num, "tasks_total": step_total, "tasks_completed": step_completed,
+        })
+    for day, fields in sorted(daily.items()):
+        out.add(CompletionRollup.__table__, {"id": ids.take(CompletionRollup), "user_id": user_id, "day": day, **fields})
+
+
+def generate(engine: Engine, tasks: int, users: Optional[int] = None, heavy_user_tasks: Optional[int] = None,
+             completed_ratio: float = 0.7, failure_ratio: float = 0.3, heavy_open_ratio: float = 0.1,
+             days: int = 180, batch_size: int = 5000, seed: int = 0, progress: bool = False) -> Dict[str, Any]:
+    """Add about `tasks` task rows (plus users, roadmaps, failures and counters) to the database.
+
+    `users` defaults to one per 100 tasks (at least 10) and `heavy_user_tasks`
+    to a tenth of `tasks`; the heavy user is named `bench-heavy` and an
+    average user `bench-typical`. Returns counts of the rows written.
+    """
+    rng = random.Random(seed)
+    users = users or max(10, tasks // 100)
+    heavy_user_tasks = tasks // 10 if heavy_user_tasks is None else heavy_user_tasks
+    if not inspect(engine).has_table(Task.__tablename__):
+        database.Base.metadata.create_all(engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    ids = IdAllocator(engine, User, Roadmap, Task, TaskFailure, StepProgress, CompletionRollup)
+    out = Batcher(engine, batch_size)
+    started = time.perf_counter()
+
+    counts = task_counts(rng, users, max(tasks - heavy_user_tasks, users * TASKS_PER_BATCH))
+    # A typical user: the median task count, at least two batches so one can be completed without advancing
+    typical = sorted(range(users), key=lambda i: counts[i])[users // 2]
+    counts[typical] = max(counts[typical], 2 * TASKS_PER_BATCH)
+    if heavy_user_tasks:
+        generate_user(rng, out, ids, HEAVY_USER_NAME, heavy_user_tasks, now, days,
+                      completed_ratio, failure_ratio, heavy_open_ratio)
+    for i, n in enumerate(counts):
+        name = TYPICAL_USER_NAME if i == typical else f"user-{i}"
+        generate_user(rng, out, ids, name, n, now, days, completed_ratio, failure_ratio, 0.0)
+        if progress and (i + 1) % 1000 == 0:
+            print(f"  {i + 1}/{users} users, {out.written.get('tasks', 0)} tasks written "
+                  f"({time.perf_counter() - started:.0f}s)", file=sys.stderr)
+    out.flush()
+
+    if engine.dialect.name == "postgresql":
+        # Explicit ids bypassed the serial sequences
+        with engine.begin() as conn:
+            for model in (User, Roadmap, Task, TaskFailure, StepProgress, CompletionRollup):
+                table = model.__tablename__
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                  f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"))
+    with engine.begin() as conn:
+        if engine.dialect.name in ("sqlite", "postgresql"):
+            conn.execute(text("ANALYZE"))
+
+    return {**dict(out.written), "seconds": round(time.perf_counter() - started, 1)}
+
+
+def check(engine: Engine, sample: int, seed: int = 0) -> List[str]:
+    """Run ProgressService.check on a sample of users; returns the mismatches found."""
+    from sqlalchemy.orm import Session
+    from services.progress_service import ProgressService
+    service = ProgressService()
+    with Session(engine) as db:
+        user_ids = [row[0] for row in db.execute(select(User.id)).all()]
+        problems = []
+        for user_id in random.Random(seed).sample(user_ids, min(sample, len(user_ids))):
+            problems.extend(service.check(db, user_id))
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./hackathon.db"))
+    parser.add_argument("--tasks", type=int, default=100000, help="Task rows to add in total")
+    parser.add_argument("--users", type=int, help="Users besides the heavy one (default: tasks / 100, at least 10)")
+    parser.add_argument("--heavy-user-tasks", type=int, help="Tasks of the bench-heavy user (default: tasks / 10, 0 for none)")
+    parser.add_argument("--completed-ratio", type=float, default=0.7, help="Share of past task batches that got completed")
+    parser.add_argument("--failure-ratio", type=float, default=0.3, help="Share of unfinished past batches with a failure report")
+    parser.add_argument("--heavy-open-ratio", type=float, default=0.1,
+                        help="Share of the heavy user's batches still open (active and incomplete)")
+    parser.add_argument("--days", type=int, default=180, help="History length")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT batch")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="Verify progress counters of N random users afterwards")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    print(f"Generating ~{args.tasks} tasks into {engine.url.render_as_string(hide_password=True)}")
+    written = generate(engine, args.tasks, users=args.users, heavy_user_tasks=args.heavy_user_tasks,
+                       completed_ratio=args.completed_ratio, failure_ratio=args.failure_ratio,
+                       heavy_open_ratio=args.heavy_open_ratio, days=args.days, batch_size=args.batch_size,
+                       seed=args.seed, progress=True)
+    seconds = written.pop("seconds")
+    for table, rows in written.items():
+        print(f"  {table:<20} {rows}")
+    print(f"Done in {seconds:.1f}s")
+    if args.check:
+        problems = check(engine, args.check, args.seed)
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        print(f"{len(problems)} counter mismatches in {args.check} sampled users")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Load test of the user journey: register -> fetch tasks -> complete -> fail -> regenerate.
+
+Virtual users run the journey concurrently, each on its own thread, until
+--journeys journeys have finished (or for --duration seconds). Latency is
+recorded per endpoint, and the report gives throughput, p50/p95/p99 latency
+and error rate per endpoint and overall, printed as a table and written as
+JSON for comparing runs.
+
+By default the app runs in process behind a TestClient, with the LLM
+replaced by a fake (--llm-delay seconds per call, with jitter). It uses a
+throwaway SQLite database unless DATABASE_URL is set. With --url the same
+journeys are sent to a running server instead, and its real LLM is used.
+
+Usage:
+    python benchmarks/loadtest.py [--journeys 50] [--concurrency 10] [--llm-delay 0.05] [--out report.json]
+    python benchmarks/loadtest.py --duration 60 --concurrency 32
+    python benchmarks/loadtest.py --url http://localhost:8000
+    python benchmarks/loadtest.py --compare baseline.json      # also print the change against an earlier report
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "loadtest")
+os.environ.setdefault("GOOGLE_API_KEY", "loadtest")
+# Keep app logs from interleaving with the report
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+
+INTERESTS = [["python", "backend"], ["react", "frontend"], ["docker", "devops"], ["sql", "data"], ["rust"]]
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = {"input_tokens": 400, "output_tokens": len(content) // 4,
+                               "total_tokens": 400 + len(content) // 4}
+
+
+class FakeLLM:
+    """Answers roadmap and task prompts with canned JSON after `delay` seconds (+-50% jitter)."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def invoke(self, prompt, *args, **kwargs):
+        if self.delay:
+            time.sleep(self.delay * random.uniform(0.5, 1.5))
+        if '"steps"' in prompt:
+            steps = [{"step_num": i, "title": f"Step {i}"} for i in range(1, 5)]
+            return FakeMessage(json.dumps({"title": "Load test roadmap", "steps": steps}))
+        tasks = [{"title": f"Task {i}", "description": "Practice the concept with a short exercise. " * 4,
+                  "sources": ["https://docs.python.org/3/"]} for i in range(3)]
+        return FakeMessage(json.dumps({"tasks": tasks}))
+
+
+class Recorder:
+    """Latencies and error counts per endpoint, shared by all virtual users."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint] += 1
+                self.error_samples.setdefault(endpoint, error)
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+
+    def call(self, method: str, endpoint: str, path: str, **kwargs):
+        """Send one request, recording it under `endpoint` (the route template)."""
+        started = time.perf_counter()
+        error = None
+        response = None
+        try:
+            response = self.client.request(method, path, **kwargs)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.record(f"{method} {endpoint}", time.perf_counter() - started, error)
+        if error:
+            raise JourneyFailed(error)
+        return response.json()
+
+    def journey(self, n: int) -> None:
+        user = self.call("POST", "/api/register", "/api/register", json={
+            "name": f"load{n}", "age": random.randint(18, 60), "time_duration": random.choice([30, 60, 90]),
+            "interests": random.choice(INTERESTS),
+        })
+        user_id = user["id"]
+        tasks = self.call("GET", "/api/tasks/{user_id}", f"/api/tasks/{user_id}")["tasks"]
+        # Completing the whole step advances the roadmap and generates the next step's tasks
+        self.call("POST", "/api/tasks/complete/{user_id}", f"/api/tasks/complete/{user_id}", json={
+            "completed_tasks": [{"task_id": t["id"], "completed": True} for t in tasks],
+        })
+        tasks = self.call("GET", "/api/tasks/{user_id}", f"/api/tasks/{user_id}")["tasks"]
+        self.call("POST", "/api/tasks/failure/{user_id}", f"/api/tasks/failure/{user_id}", json={
+            "failure_reason": "Not enough time this week",
+            "completed_tasks": [{"task_id": t["id"], "completed": i == 0} for i, t in enumerate(tasks)],
+        })
+        self.call("POST", "/api/roadmap/regenerate/{user_id}", f"/api/roadmap/regenerate/{user_id}")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else None,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2) if values else None,
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2) if values else None,
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2) if values else None,
+        "max_ms": round(values[-1] * 1000, 2) if values else None,
+    }
+
+
+def build_report(args, recorder: Recorder, started_at: datetime, elapsed: float, journeys: Dict[str, int]) -> dict:
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "started_at": started_at.isoformat().replace("+00:00", "Z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "target": args.url or "in-process",
+        "config": {"concurrency": args.concurrency, "journeys": args.journeys, "duration": args.duration,
+                   "llm_delay": None if args.url else args.llm_delay, "seed": args.seed},
+        "elapsed_seconds": round(elapsed, 3),
+        "journeys": journeys,
+        "overall": summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        "endpoints": {endpoint: summarize(values, recorder.errors.get(endpoint, 0), elapsed)
+                      for endpoint, values in sorted(recorder.latencies.items())},
+        "error_samples": dict(recorder.error_samples),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['journeys']['completed']} journeys ({report['journeys']['failed']} failed) "
+          f"in {report['elapsed_seconds']:.2f}s against {report['target']}, "
+          f"concurrency {report['config']['concurrency']}")
+    header = f"{'endpoint':<40} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for endpoint, s in rows:
+        print(f"{endpoint:<40} {s['requests']:>6} {s['throughput_rps']:>8.1f} {s['p50_ms'] or 0:>9.1f} "
+              f"{s['p95_ms'] or 0:>9.1f} {s['p99_ms'] or 0:>9.1f} {s['error_rate']:>7.1%}")
+    for endpoint, sample in report["error_samples"].items():
+        print(f"  first error on {endpoint}: {sample}")
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    """Relative change in throughput and p95 per endpoint against an earlier report."""
+    print(f"\nChange against {baseline.get('commit') or 'baseline'} ({baseline.get('started_at')}):")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for endpoint, s in rows:
+        base = baseline["overall"] if endpoint == "overall" else baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            print(f"  {endpoint:<40} (not in baseline)")
+            continue
+        changes = []
+        for key, label in (("throughput_rps", "rps"), ("p95_ms", "p95"), ("p99_ms", "p99")):
+            if base.get(key) and s.get(key) is not None:
+                changes.append(f"{label} {(s[key] - base[key]) / base[key]:+.1%}")
+        changes.append(f"errors {base['error_rate']:.1%} -> {s['error_rate']:.1%}")
+        print(f"  {endpoint:<40} " + ", ".join(changes))
+
+
+@contextmanager
+def open_client(args):
+    if args.url:
+        import httpx
+        with httpx.Client(base_url=args.url.rstrip("/"), timeout=args.timeout) as client:
+            yield client
+        return
+    import config
+    config.llm = FakeLLM(args.llm_delay)
+    import database
+    database.Base.metadata.create_all(database.engine)
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--journeys", type=int, default=50, help="Journeys to run in total (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Keep starting journeys for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running journeys in parallel")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="Mean seconds per fake LLM call (in process only)")
+    parser.add_argument("--url", help="Base URL of a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout against --url")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here (default: loadtest-<timestamp>.json in the current directory)")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    recorder = Recorder()
+    counter_lock = threading.Lock()
+    journeys = {"started": 0, "completed": 0, "failed": 0}
+    stop_at = time.perf_counter() + args.duration if args.duration else None
+
+    def next_journey() -> Optional[int]:
+        with counter_lock:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return None
+            if stop_at is None and journeys["started"] >= args.journeys:
+                return None
+            journeys["started"] += 1
+            return journeys["started"]
+
+    with open_client(args) as client:
+        def run_user() -> None:
+            user = VirtualUser(client, recorder)
+            while (n := next_journey()) is not None:
+                try:
+                    user.journey(n)
+                    outcome = "completed"
+                except JourneyFailed:
+                    outcome = "failed"
+                with counter_lock:
+                    journeys[outcome] += 1
+
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run_user, name=f"vu{i}") for i in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    report = build_report(args, recorder, started_at, elapsed, journeys)
+    print_report(report)
+    out = args.out or f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    return 1 if journeys["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
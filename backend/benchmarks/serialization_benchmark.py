@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the task read path.
+
+Seeds one user with a large number of active tasks, then times building the
+`GET /api/tasks/{user_id}` body two ways:
+
+    orm      ORM Task objects -> TaskResponse models -> jsonable_encoder -> json.dumps
+             (the path before the lean read DTOs)
+    rows     Core select of the response columns -> TaskRow -> orjson (FastJSONResponse)
+
+Both bodies are checked to decode to the same JSON. A throwaway SQLite database
+is used unless DATABASE_URL is set.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--tasks 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+
+
+def seed(db, count: int) -> int:
+    from database import User, Roadmap, Task
+
+    user = User(name="bench", age=30, time_duration=60, interests=["python", "data"])
+    db.add(user)
+    db.flush()
+    roadmap = Roadmap(user_id=user.id, title="Benchmark roadmap",
+                      steps=[{"step_num": 1, "title": "Step 1"}], current_step=1, is_active=True)
+    db.add(roadmap)
+    db.flush()
+    start = datetime(2024, 1, 1, 9, 0, 0, 123456)
+    db.bulk_insert_mappings(Task, [{
+        "user_id": user.id,
+        "roadmap_id": roadmap.id,
+        "step_num": 1,
+        "title": f"Task {i}: practice list comprehensions",
+        "description": "Write five list comprehensions that replace explicit loops in an existing script. " * 2,
+        "assigned_time": start + timedelta(minutes=i),
+        "sources": [f"https://docs.python.org/3/tutorial/datastructures.html#{i}",
+                    "https://realpython.com/list-comprehension-python/"],
+        "completed": False,
+        "is_active": True,
+    } for i in range(count)])
+    db.commit()
+    return user.id
+
+
+def timed(fn, repeat: int):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        samples.append(time.perf_counter() - started)
+    return body, samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    import database
+    from database import SessionLocal, Task
+    from fastapi.encoders import jsonable_encoder
+    from responses import FastJSONResponse
+    from schemas.users import TaskResponse, TasksResponse
+    from services.user_service import UserService
+
+    database.Base.metadata.create_all(database.engine)
+    service = UserService()
+    db = SessionLocal()
+    try:
+        user_id = seed(db, args.tasks)
+
+        def orm_path() -> bytes:
+            db.expire_all()
+            tasks = db.query(Task).filter(
+                Task.user_id == user_id, Task.is_active == True, Task.completed == False
+            ).all()
+            model = TasksResponse(tasks=[TaskResponse(
+                id=t.id, title=t.title, description=t.description,
+                assigned_time=t.assigned_time, sources=t.sources or [], completed=t.completed
+            ) for t in tasks])
+            return json.dumps(jsonable_encoder(model), ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+
+        def rows_path() -> bytes:
+            return FastJSONResponse({"tasks": service.list_task_rows(db, user_id)}).body
+
+        results = {name: timed(fn, args.repeat) for name, fn in (("orm", orm_path), ("rows", rows_path))}
+    finally:
+        db.close()
+
+    if json.loads(results["orm"][0]) != json.loads(results["rows"][0]):
+        print("MISMATCH: the two paths render different JSON")
+        return 1
+
+    size = len(results["rows"][0])
+    print(f"{args.tasks} tasks, {size / 1024:.0f} KiB body, {args.repeat} runs each")
+    print(f"  {'path':<6} {'median ms':>10} {'min ms':>8} {'tasks/s':>10}")
+    for name, (_, samples) in results.items():
+        median = statistics.median(samples)
+        print(f"  {name:<6} {median * 1000:>10.1f} {min(samples) * 1000:>8.1f} {args.tasks / median:>10.0f}")
+    speedup = statistics.median(results["orm"][1]) / statistics.median(results["rows"][1])
+    print(f"rows path is {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Concurrent stress test for step advancement.
+
+For every user, all but one task of step 1 are completed, then several
+threads submit the last task at the same moment. Afterwards each user must be
+on step 2 exactly once, with one LLM call for step 2's tasks and consistent
+progress counters.
+
+The LLM is replaced by a fake with a configurable delay, and a throwaway
+SQLite database is used unless DATABASE_URL is set.
+
+Usage:
+    python benchmarks/stress_step_advance.py [--users 20] [--concurrency 8] [--llm-delay 0.2]
+    python benchmarks/stress_step_advance.py --isolated   # one UserService per thread, like separate processes
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "stress-test")
+os.environ.setdefault("GOOGLE_API_KEY", "stress-test")
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/stress.db"
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = {"input_tokens": len(content) // 4, "output_tokens": 50, "total_tokens": len(content) // 4 + 50}
+
+
+class FakeLLM:
+    """Answers roadmap and task prompts with canned JSON, counting task calls per step."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.task_calls = Counter()
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, *args, **kwargs):
+        if '"steps"' in prompt:
+            steps = [{"step_num": i, "title": f"Step {i}"} for i in (1, 2, 3)]
+            return FakeMessage(json.dumps({"title": "Stress roadmap", "steps": steps}))
+        time.sleep(self.delay)
+        with self._lock:
+            self.task_calls[threading.current_thread().name] += 1
+        tasks = [{"title": f"Task {i}", "description": "stress", "sources": []} for i in range(3)]
+        return FakeMessage(json.dumps({"tasks": tasks}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8, help="Simultaneous completions per user")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="Seconds per fake task generation call")
+    parser.add_argument("--isolated", action="store_true",
+                        help="Give each thread its own UserService so only the roadmap version check protects the advance")
+    args = parser.parse_args()
+
+    import config
+    fake = FakeLLM(args.llm_delay)
+    config.llm = fake
+
+    import database
+    from database import SessionLocal, Roadmap, Task, StepProgress
+    from schemas.users import UserCreate
+    from services.user_service import UserService
+    from services.progress_service import ProgressService
+    from services.user_locks import ConcurrentUpdateError
+
+    database.Base.metadata.create_all(database.engine)
+    shared = UserService()
+
+    db = SessionLocal()
+    user_ids, last_tasks = [], {}
+    try:
+        for i in range(args.users):
+            user = shared.create_user(db, UserCreate(name=f"stress{i}", age=30, time_duration=60, interests=["python"]))
+            shared.generate_roadmap(db, user.id)
+            tasks = db.query(Task).filter(Task.user_id == user.id, Task.step_num == 1).order_by(Task.id).all()
+            shared.handle_task_completion(db, user.id, [{"task_id": t.id, "completed": True} for t in tasks[:-1]])
+            user_ids.append(user.id)
+            last_tasks[user.id] = tasks[-1].id
+    finally:
+        db.close()
+    fake.task_calls.clear()
+
+    outcomes = Counter()
+    outcomes_lock = threading.Lock()
+    barrier = threading.Barrier(args.concurrency)
+
+    def complete(user_id: int) -> None:
+        service = UserService() if args.isolated else shared
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            result = service.handle_task_completion(session, user_id, [{"task_id": last_tasks[user_id], "completed": True}])
+            outcome = "advanced" if "tasks" in result and "status" not in result else result.get("status", "unknown")
+        except ConcurrentUpdateError:
+            outcome = "conflict"
+        except Exception as e:
+            outcome = f"error: {type(e).__name__}: {e}"
+        finally:
+            session.close()
+        with outcomes_lock:
+            outcomes[outcome] += 1
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        threads = [threading.Thread(target=complete, args=(user_id,), name=f"u{user_id}-{n}")
+                   for n in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    problems = []
+    calls_per_user = Counter()
+    for thread_name, calls in fake.task_calls.items():
+        calls_per_user[int(thread_name[1:].split("-")[0])] += calls
+    db = SessionLocal()
+    try:
+        progress = ProgressService()
+        for user_id in user_ids:
+            roadmap = db.query(Roadmap).filter(Roadmap.user_id == user_id, Roadmap.is_active == True).one()
+            step2_tasks = db.query(Task).filter(Task.roadmap_id == roadmap.id, Task.step_num == 2).count()
+            step2_counter = db.query(StepProgress.tasks_total).filter(
+                StepProgress.roadmap_id == roadmap.id, StepProgress.step_num == 2
+            ).scalar()
+            if roadmap.current_step != 2:
+                problems.append(f"user {user_id}: on step {roadmap.current_step}, expected 2")
+            if calls_per_user[user_id] != 1:
+                problems.append(f"user {user_id}: {calls_per_user[user_id]} LLM calls for step 2, expected 1")
+            if step2_tasks != 3 or step2_counter != 3:
+                problems.append(f"user {user_id}: {step2_tasks} step-2 tasks, counter says {step2_counter}")
+            problems.extend(progress.check(db, user_id))
+    finally:
+        db.close()
+
+    mode = "isolated services" if args.isolated else "shared service"
+    print(f"{args.users} users x {args.concurrency} concurrent completions ({mode}) in {elapsed:.2f}s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:<20} {count}")
+    print(f"  LLM task calls       {sum(calls_per_user.values())}")
+    if problems:
+        print(f"{len(problems)} problems:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        return 1
+    print("OK: every user advanced exactly once")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ from langchain_groq import ChatGroq
 class Settings(BaseSettings):
     GOOGLE_API_KEY:str
     GROQ_API_KEY: str
+    # Per-call limit for the LLM client; requests are additionally bounded by REQUEST_DEADLINE_SECONDS
+    LLM_TIMEOUT_SECONDS: float = 60
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -19,6 +21,7 @@ llm = ChatGroq(
     model="openai/gpt-oss-20b",
     temperature=0.3,
     api_key=settings.GROQ_API_KEY,
-    max_tokens=2048
+    max_tokens=2048,
+    timeout=settings.LLM_TIMEOUT_SECONDS
 )
 
@@ -1,13 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, JSON, UniqueConstraint, Index, LargeBinary, false
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import os
 
-# Database URL
-DATABASE_URL = "sqlite:///./hackathon.db"
+# Database URL (same variable alembic/env.py honors)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hackathon.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -21,14 +24,19 @@ class User(Base):
     time_duration = Column(Integer, nullable=False)  # minutes per day
     interests = Column(JSON, nullable=False)  # list of interests
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped in the same transaction as any write to the user's profile, roadmaps or tasks; drives ETags
+    data_version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     roadmaps = relationship("Roadmap", back_populates="user", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
     task_failures = relationship("TaskFailure", back_populates="user", cascade="all, delete-orphan")
+    progress = relationship("UserProgress", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
 class Roadmap(Base):
     __tablename__ = "roadmaps"
+    # Never reuse ids on SQLite: archived roadmaps keep theirs in roadmaps_archive
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -37,13 +45,21 @@ class Roadmap(Base):
     current_step = Column(Integer, nullable=False, default=1)  # 1-based index into steps
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # Canned roadmap served when the LLM missed the request deadline; an upgrade job replaces it
+    is_fallback = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Bumped on every change; ORM updates only apply if the row still has the version they read
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     user = relationship("User", back_populates="roadmaps")
     tasks = relationship("Task", back_populates="roadmap", cascade="all, delete-orphan")
 
+    __mapper_args__ = {"version_id_col": version}
+
 class Task(Base):
     __tablename__ = "tasks"
+    # Never reuse ids on SQLite: archived tasks keep theirs in tasks_archive
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -57,6 +73,8 @@ class Task(Base):
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # Canned task served when the LLM missed the request deadline; an upgrade job rewrites it
+    is_fallback = Column(Boolean, nullable=False, default=False, server_default=false())
     
     # Relationships
     user = relationship("User", back_populates="tasks")
@@ -78,6 +96,148 @@ class TaskFailure(Base):
     user = relationship("User", back_populates="task_failures")
     task = relationship("Task", back_populates="failures")
 
+class UserProgress(Base):
+    """Denormalized per-user counters, maintained in the same transaction as task writes."""
+    __tablename__ = "user_progress"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    active_roadmap_id = Column(Integer, nullable=True)
+    current_step = Column(Integer, nullable=False, default=1)
+    tasks_total = Column(Integer, nullable=False, default=0)  # every task ever assigned
+    tasks_completed = Column(Integer, nullable=False, default=0)
+    last_completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = relationship("User", back_populates="progress")
+
+class StepProgress(Base):
+    """Active task counters for one step of one roadmap."""
+    __tablename__ = "user_step_progress"
+    __table_args__ = (UniqueConstraint("roadmap_id", "step_num", name="uq_step_progress_roadmap_step"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    roadmap_id = Column(Integer, nullable=False)
+    step_num = Column(Integer, nullable=False)
+    tasks_total = Column(Integer, nullable=False, default=0)
+    tasks_completed = Column(Integer, nullable=False, default=0)
+
+class CompletionRollup(Base):
+    """Per-user daily counters, incremented on assignment, completion and failure events."""
+    __tablename__ = "completion_rollups"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_completion_rollups_user_day"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)  # UTC date
+    completed_count = Column(Integer, nullable=False, default=0)
+    assigned_count = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+
+class RoadmapArchive(Base):
+    """Inactive roadmaps moved out of the hot roadmaps table by the archiver."""
+    __tablename__ = "roadmaps_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    title = Column(String, nullable=False)
+    steps = Column(JSON, nullable=False)
+    current_step = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime)
+    is_active = Column(Boolean, default=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class TaskArchive(Base):
+    """Inactive tasks moved out of the hot tasks table by the archiver."""
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    roadmap_id = Column(Integer, nullable=False)
+    step_num = Column(Integer, nullable=True)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=False)
+    assigned_time = Column(DateTime, nullable=False)
+    sources = Column(JSON, nullable=False, default=list)
+    completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    is_active = Column(Boolean, default=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class UserEvent(Base):
+    """Outbox of push events when EVENT_BUS=database; every API process tails it for its subscribers."""
+    __tablename__ = "user_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class Job(Base):
+    """Durable queue entry for LLM work; status is polled via GET /api/jobs/{id}."""
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_claim", "status", "priority", "run_after"),)
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    type = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending")  # pending | running | succeeded | failed | dead
+    priority = Column(Integer, nullable=False, default=0)  # lane: 0 interactive, 10 background
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow)  # retry backoff / scheduling
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    progress = Column(JSON, nullable=True)  # handler-reported progress while running
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class TaskBankEntry(Base):
+    """Tasks pre-generated off-peak for a roadmap step, consumed instead of a live LLM call."""
+    __tablename__ = "task_bank"
+    __table_args__ = (UniqueConstraint("roadmap_id", "step_num", "kind", name="uq_task_bank_roadmap_step_kind"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    roadmap_id = Column(Integer, nullable=False)
+    step_num = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # step_tasks | reassignment
+    tasks = Column(JSON, nullable=False)  # [{title, description, sources}]
+    source_task_ids = Column(JSON, nullable=True)  # reassignment: incomplete task ids it was generated for
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    consumed_at = Column(DateTime, nullable=True)
+
+class PregenerationRun(Base):
+    """Coverage and token cost report of one pre-generation run."""
+    __tablename__ = "pregeneration_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    report = Column(JSON, nullable=False, default=dict)
+
+class IdempotencyKey(Base):
+    """Stored outcome of a POST sent with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path, query and body
+    status = Column(String, nullable=False, default="in_progress")  # in_progress | completed
+    response_status = Column(Integer, nullable=True)
+    response_headers = Column(JSON, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 # Create tables via Alembic migrations (do not call create_all here)
 
 # Dependency to get database session
@@ -5,7 +5,6 @@ Example usage of the Developer Guidance System API
 
 import requests
 import json
-import uuid
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000/api"
@@ -19,9 +18,7 @@ def example_workflow():
     # Step 1: Register a new user
     print("\n1️⃣ Registering a new user...")
     user_data = {
-        "uuid": str(uuid.uuid4()),
         "name": "Alice Johnson",
-        "username": "alice_dev",
         "age": 25,
         "time_duration": 90,  # 90 minutes per day
         "interests": ["frontend", "react", "javascript", "web development"]
@@ -1,15 +1,100 @@
+import os
+import functools
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from routes.users import router as users_router
 from routes.tasks import router as tasks_router
+from routes.analytics import router as analytics_router
+from routes.jobs import router as jobs_router, job_service
+from routes.events import router as events_router
+from routes.debug import router as debug_router
+from services.job_service import JOB_EXECUTOR
+from middleware.idempotency import IdempotencyMiddleware
+from middleware.deadline import DeadlineMiddleware
+from middleware.timing import TimingMiddleware
+from middleware.tracing import TracingMiddleware
+from middleware.profiling import ProfilingMiddleware
+from middleware.request_id import RequestIdMiddleware
+from responses import TimedJSONResponse
+from services.deadline import DeadlineExceeded
+from services.job_handlers import enqueue_upgrades
+from services.archive_service import ArchiveWorker
+from services.container import Services
+from services.idempotency_service import IdempotencyPurger, IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+from services.pregeneration_service import PregenerationScheduler
+from services.event_bus import event_bus
+from services.request_timing import REQUEST_TIMING
+from services import tracing
+from services.structured_logging import configure_logging
+
+# Non-blocking structured logs on stdout; queued records are written out at exit
+configure_logging()
+
+# Optional periodic sweep of inactive tasks/roadmaps into the archive tables
+archive_interval = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+archive_worker = ArchiveWorker(archive_interval) if archive_interval > 0 else None
+
+# Deletes expired Idempotency-Key rows so stored responses do not pile up
+idempotency_purger = (IdempotencyPurger(IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+                      if IDEMPOTENCY_PURGE_INTERVAL_SECONDS > 0 else None)
+
+# Optional off-peak task pre-generation, e.g. PREGEN_WINDOW=02:00-05:00 (UTC)
+pregen_window = os.getenv("PREGEN_WINDOW")
+pregen_scheduler = PregenerationScheduler(pregen_window) if pregen_window else None
+
+def is_primary_worker() -> bool:
+    """False in the additional workers started by serve.py, so periodic sweeps run in one process only."""
+    return os.getenv("SERVE_WORKER_INDEX", "0") == "0"
+
+def start_background_workers():
+    if archive_worker and is_primary_worker():
+        archive_worker.start()
+    if pregen_scheduler and is_primary_worker():
+        pregen_scheduler.start()
+    if idempotency_purger and is_primary_worker():
+        idempotency_purger.start()
+    # Drain jobs left queued by a previous run unless a separate worker.py owns the queue
+    if JOB_EXECUTOR == "inline":
+        job_service.start_inline_worker()
+
+def stop_background_workers():
+    if archive_worker:
+        archive_worker.stop()
+    if pregen_scheduler:
+        pregen_scheduler.stop()
+    if idempotency_purger:
+        idempotency_purger.stop()
+    job_service.shutdown()
+    event_bus.stop()
+    tracing.shutdown()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared services before any job runs (they register the job handlers), then warm them up."""
+    app.state.services = Services(job_service)
+    start_background_workers()
+    app.state.services.start_warm_up()
+    yield
+    await run_in_threadpool(stop_background_workers)
 
 app = FastAPI(
     title="Developer Guidance System",
     description="A system to guide users to become better developers",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan
 )
 
+# Bound LLM-backed requests by REQUEST_DEADLINE_SECONDS, serving fallbacks that are upgraded in the background
+app.add_middleware(DeadlineMiddleware, on_degraded=functools.partial(enqueue_upgrades, job_service))
+
+# Replay stored responses for retried POSTs carrying an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -19,9 +104,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request id on every log line; inside tracing so it can reuse the trace id
+app.add_middleware(RequestIdMiddleware)
+
+# Marks requests picked by POST /debug/profile/requests for the sampling profiler
+app.add_middleware(ProfilingMiddleware)
+
+# Root span per request; service, LLM and SQL spans nest under it
+if tracing.TRACING:
+    app.add_middleware(TracingMiddleware)
+
+# Outermost, so Server-Timing covers the other middleware too
+if REQUEST_TIMING:
+    app.add_middleware(TimingMiddleware)
+
+@app.exception_handler(DeadlineExceeded)
+def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 # Include routers
 app.include_router(users_router, prefix="/api", tags=["users"])
 app.include_router(tasks_router, prefix="/api", tags=["tasks"])
+app.include_router(analytics_router, prefix="/api", tags=["analytics"])
+app.include_router(jobs_router, prefix="/api", tags=["jobs"])
+app.include_router(events_router, prefix="/api", tags=["events"])
+app.include_router(debug_router, tags=["debug"])
 
 @app.get("/")
 def read_root():
@@ -33,9 +140,19 @@ def read_root():
 
 @app.get("/health")
 def health_check():
+    """Liveness: the process is serving requests"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check(request: Request):
+    """Readiness: 503 until the startup warm-up finished, then the time each warm-up step took"""
+    services = getattr(request.app.state, "services", None)
+    if services is None or not services.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "warmup": services.warmup}
+
 def main():
+    """Development server with auto-reload; use serve.py for production."""
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
 if __name__ == "__main__":
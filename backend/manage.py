@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the Developer Guidance System
+
+Usage:
+    python manage.py progress check [--user-id ID]
+    python manage.py progress rebuild [--user-id ID]
+    python manage.py archive [--user-id ID] [--batch-size N] [--max-batches N]
+    python manage.py rollups backfill [--user-id ID]
+    python manage.py idempotency purge
+    python manage.py pregenerate [--budget TOKENS] [--concurrency N] [--max-users N]
+    python manage.py export OUT_DIR [--format parquet|arrow|csv] [--tables T,...] [--incremental]
+"""
+
+import argparse
+import sys
+
+from database import SessionLocal, User
+from services.progress_service import ProgressService
+from services.archive_service import ArchiveService
+from services.rollup_service import RollupService
+from services.export_service import ExportService, FORMATS
+from services.idempotency_service import IdempotencyService
+from services.pregeneration_service import PregenerationService, PREGEN_CONCURRENCY, PREGEN_TOKEN_BUDGET
+
+
+def _user_ids(db, user_id=None):
+    if user_id is not None:
+        return [user_id]
+    return [row[0] for row in db.query(User.id).order_by(User.id).all()]
+
+
+def progress_check(args) -> int:
+    """Report users whose progress counters disagree with raw rows"""
+    service = ProgressService()
+    db = SessionLocal()
+    try:
+        problems = []
+        for user_id in _user_ids(db, args.user_id):
+            problems.extend(service.check(db, user_id))
+        for problem in problems:
+            print(problem)
+        print(f"{len(problems)} inconsistencies found")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+def progress_rebuild(args) -> int:
+    """Recompute progress counters from raw task and roadmap rows"""
+    service = ProgressService()
+    db = SessionLocal()
+    try:
+        user_ids = _user_ids(db, args.user_id)
+        for user_id in user_ids:
+            service.rebuild(db, user_id)
+            db.commit()
+        print(f"Rebuilt progress counters for {len(user_ids)} users")
+        return 0
+    finally:
+        db.close()
+
+
+def archive(args) -> int:
+    """Move inactive tasks and roadmaps into the archive tables"""
+    service = ArchiveService(batch_size=args.batch_size)
+    db = SessionLocal()
+    try:
+        moved = service.archive_inactive(db, user_id=args.user_id, max_batches=args.max_batches)
+        print(f"Archived {moved['tasks']} tasks and {moved['roadmaps']} roadmaps")
+        return 0
+    finally:
+        db.close()
+
+
+def rollups_backfill(args) -> int:
+    """Rebuild completion_rollups from raw tasks and failures"""
+    service = RollupService()
+    db = SessionLocal()
+    try:
+        rows = service.backfill(db, user_id=args.user_id)
+        db.commit()
+        print(f"Wrote {rows} daily rollup rows")
+        return 0
+    finally:
+        db.close()
+
+
+def idempotency_purge(args) -> int:
+    """Delete expired Idempotency-Key records"""
+    db = SessionLocal()
+    try:
+        deleted = IdempotencyService().purge_expired(db)
+        db.commit()
+        print(f"Deleted {deleted} expired idempotency keys")
+        return 0
+    finally:
+        db.close()
+
+
+def pregenerate(args) -> int:
+    """Pre-generate next-step and reassignment tasks for users with an active roadmap"""
+    service = PregenerationService(concurrency=args.concurrency, token_budget=args.budget)
+    report = service.run(max_users=args.max_users)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return 0
+
+
+def export(args) -> int:
+    """Export tasks, roadmaps and task_failures to Parquet / Arrow IPC / csv.gz"""
+    service = ExportService()
+    tables = args.tables.split(",") if args.tables else None
+    db = SessionLocal()
+    try:
+        report = service.export(db, args.out_dir, fmt=args.format, tables=tables, incremental=args.incremental)
+        for table, result in report.items():
+            print(f"{table}: {result['rows']} rows -> {result['path'] or '(nothing new)'}")
+        return 0
+    except (RuntimeError, ValueError) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Developer Guidance System maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    progress = commands.add_parser("progress", help="Denormalized progress counters")
+    progress_commands = progress.add_subparsers(dest="action", required=True)
+    check = progress_commands.add_parser("check", help="Compare counters with raw rows")
+    check.add_argument("--user-id", type=int)
+    check.set_defaults(func=progress_check)
+    rebuild = progress_commands.add_parser("rebuild", help="Rebuild counters from raw rows")
+    rebuild.add_argument("--user-id", type=int)
+    rebuild.set_defaults(func=progress_rebuild)
+
+    archive_cmd = commands.add_parser("archive", help="Archive inactive tasks and roadmaps")
+    archive_cmd.add_argument("--user-id", type=int)
+    archive_cmd.add_argument("--batch-size", type=int, default=500)
+    archive_cmd.add_argument("--max-batches", type=int)
+    archive_cmd.set_defaults(func=archive)
+
+    rollups = commands.add_parser("rollups", help="Daily completion rollups")
+    rollups_commands = rollups.add_subparsers(dest="action", required=True)
+    backfill = rollups_commands.add_parser("backfill", help="Rebuild rollups from raw rows")
+    backfill.add_argument("--user-id", type=int)
+    backfill.set_defaults(func=rollups_backfill)
+
+    idempotency = commands.add_parser("idempotency", help="Stored Idempotency-Key responses")
+    idempotency_commands = idempotency.add_subparsers(dest="action", required=True)
+    purge = idempotency_commands.add_parser("purge", help="Delete expired keys")
+    purge.set_defaults(func=idempotency_purge)
+
+    pregen = commands.add_parser("pregenerate", help="Fill the task bank ahead of peak hours")
+    pregen.add_argument("--budget", type=int, default=PREGEN_TOKEN_BUDGET, help="Token budget for this run")
+    pregen.add_argument("--concurrency", type=int, default=PREGEN_CONCURRENCY)
+    pregen.add_argument("--max-users", type=int)
+    pregen.set_defaults(func=pregenerate)
+
+    export_cmd = commands.add_parser("export", help="Bulk columnar export for offline analysis")
+    export_cmd.add_argument("out_dir")
+    export_cmd.add_argument("--format", choices=FORMATS, help="Defaults to parquet when pyarrow is installed, else csv")
+    export_cmd.add_argument("--tables", help="Comma-separated subset of tasks,roadmaps,task_failures")
+    export_cmd.add_argument("--incremental", action="store_true",
+                            help="Only rows new since the last incremental export into OUT_DIR")
+    export_cmd.set_defaults(func=export)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services import deadline
+from services.deadline import Degradation, REQUEST_DEADLINE_SECONDS
+from typing import Callable, List, Optional, Pattern
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that may wait on the LLM; everything else runs without a budget
+DEADLINE_PATHS = [re.compile(p) for p in (
+    r"^/api/register$",
+    r"^/api/roadmap/generate$",
+    r"^/api/roadmap/regenerate/\d+$",
+    r"^/api/tasks/generate/\d+$",
+    r"^/api/tasks/complete/\d+$",
+    r"^/api/tasks/failure/\d+$",
+)]
+
+
+class DeadlineMiddleware:
+    """Runs each matching request under a time budget (see services.deadline).
+
+    LLM and sources calls give up when the budget runs out and the services
+    serve their fallback content instead. Such responses carry
+    `X-Degraded: roadmap|tasks`, and `on_degraded` is called with the
+    fallbacks after the response so their upgrades can be queued.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float = REQUEST_DEADLINE_SECONDS,
+                 on_degraded: Optional[Callable[[List[Degradation]], None]] = None,
+                 paths: Optional[List[Pattern]] = None):
+        self.app = app
+        self.seconds = seconds
+        self.on_degraded = on_degraded
+        self.paths = paths if paths is not None else DEADLINE_PATHS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not any(p.match(scope["path"]) for p in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        async def flag_degraded(message: Message) -> None:
+            if message["type"] == "http.response.start" and request_budget.degraded:
+                what = sorted({d.what for d in request_budget.degraded})
+                message["headers"] = list(message.get("headers", [])) + [(b"x-degraded", ",".join(what).encode())]
+            await send(message)
+
+        # Sync endpoints run on a copy of this context, so they share the same Budget object
+        with deadline.budget(self.seconds) as request_budget:
+            await self.app(scope, receive, flag_degraded)
+        if request_budget.degraded and self.on_degraded:
+            try:
+                await run_in_threadpool(self.on_degraded, request_budget.degraded)
+            except Exception:  # the fallback stays flagged in the database; only the automatic upgrade is lost
+                logger.exception("Failed to queue upgrades for %d fallbacks", len(request_budget.degraded))
@@ -0,0 +1,129 @@
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.idempotency_service import IdempotencyService
+from typing import List, Optional, Pattern
+import asyncio
+import hashlib
+import re
+import time
+
+# POST endpoints whose retries would repeat LLM calls or duplicate rows
+IDEMPOTENT_PATHS = [re.compile(p) for p in (
+    r"^/api/register$",
+    r"^/api/users/bulk$",
+    r"^/api/roadmap/generate$",
+    r"^/api/roadmap/regenerate/\d+$",
+    r"^/api/tasks/generate/\d+$",
+    r"^/api/tasks/failure/\d+$",
+)]
+MAX_KEY_LENGTH = 255
+# How long a duplicate waits for the original request before giving up with 409
+WAIT_SECONDS = 60.0
+POLL_SECONDS = 0.1
+MAX_POLL_SECONDS = 1.0
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for a retried POST carrying the same Idempotency-Key.
+
+    The first request claims the key and runs normally; 2xx-4xx responses are
+    stored. A retry with the same key and an identical request gets the
+    stored response (with `Idempotent-Replayed: true`); a concurrent duplicate
+    waits for the first to finish. Reusing a key for a different request is a
+    422. 5xx responses release the key so the client can retry.
+    """
+
+    def __init__(self, app: ASGIApp, service: Optional[IdempotencyService] = None,
+                 paths: Optional[List[Pattern]] = None):
+        self.app = app
+        self.service = service or IdempotencyService()
+        self.paths = paths if paths is not None else IDEMPOTENT_PATHS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not self._matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(b"idempotency-key")
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1").strip()
+        if len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters"},
+                               status_code=400)(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(b"\n".join([
+            scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body
+        ])).hexdigest()
+
+        deadline = time.monotonic() + WAIT_SECONDS
+        delay = POLL_SECONDS
+        while True:
+            outcome, record = await run_in_threadpool(self.service.claim, key, fingerprint)
+            if outcome == "claimed":
+                break
+            if outcome == "completed":
+                await self._replay(record, send)
+                return
+            if outcome == "mismatch":
+                await JSONResponse({"detail": "Idempotency-Key was already used for a different request"},
+                                   status_code=422)(scope, receive, send)
+                return
+            if time.monotonic() >= deadline:
+                await JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"},
+                                   status_code=409)(scope, receive, send)
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_SECONDS)
+
+        response = {"status": 500, "headers": [], "body": []}
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except Exception:
+            await run_in_threadpool(self.service.release, key)
+            raise
+        if response["status"] >= 500:
+            await run_in_threadpool(self.service.release, key)
+        else:
+            await run_in_threadpool(self.service.complete, key, response["status"],
+                                    response["headers"], b"".join(response["body"]))
+
+    def _matches(self, path: str) -> bool:
+        return any(pattern.match(path) for pattern in self.paths)
+
+    async def _read_body(self, receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _replay(self, record, send: Send) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record.response_headers or []]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": record.response_status, "headers": headers})
+        await send({"type": "http.response.body", "body": record.response_body or b""})
@@ -0,0 +1,34 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from middleware.timing import route_template
+from services import profiler as profiling
+from services.profiler import SamplingProfiler, profiler
+from typing import Optional
+
+
+class ProfilingMiddleware:
+    """Marks requests picked by a request-mode profile (POST /debug/profile/requests).
+
+    The mark is a contextvar, so it follows the request into threadpool and
+    LLM call threads, where the sampler finds it. When no profile is armed
+    this is a single attribute check per request.
+    """
+
+    def __init__(self, app: ASGIApp, sampler: Optional[SamplingProfiler] = None):
+        self.app = app
+        self.sampler = sampler or profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.sampler.armed:
+            await self.app(scope, receive, send)
+            return
+        request = self.sampler.claim(scope["method"], scope["path"])
+        if request is None:
+            await self.app(scope, receive, send)
+            return
+        token = profiling.set_profiled_request(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiling.reset_profiled_request(token)
+            label = f"{scope['method']} {route_template(scope)}" if scope.get("route") is not None else None
+            self.sampler.release(request, label)
@@ -0,0 +1,51 @@
+from opentelemetry import trace
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services import structured_logging
+import re
+import uuid
+
+# Incoming ids are echoed into logs and headers, so only plain tokens are accepted
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    """Gives every request an id that is stamped on each log line it produces and returned in `X-Request-Id`.
+
+    A well-formed incoming `X-Request-Id` is kept; otherwise the trace id is
+    used when the request is traced, so log lines and /debug/traces share one
+    id, and a random one when it is not.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        request_id = _incoming_id(scope) or _trace_id() or uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode())
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        token = structured_logging.set_request_id(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            structured_logging.reset_request_id(token)
+
+
+def _incoming_id(scope: Scope):
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            return candidate if _VALID_REQUEST_ID.match(candidate) else None
+    return None
+
+
+def _trace_id():
+    context = trace.get_current_span().get_span_context()
+    return format(context.trace_id, "032x") if context.is_valid else None
@@ -0,0 +1,59 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services import request_timing
+from services.request_timing import TimingHistograms, timing_histograms
+from typing import Optional
+
+
+class TimingMiddleware:
+    """Adds a `Server-Timing` header with the db / llm / sources / serialize breakdown of each
+    request, and records the breakdown in per-route histograms once the response is complete.
+
+    The header reflects the time until the response starts, so for streamed
+    responses it covers time to first byte; histograms cover the whole response.
+    """
+
+    def __init__(self, app: ASGIApp, histograms: Optional[TimingHistograms] = None):
+        self.app = app
+        self.histograms = histograms or timing_histograms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timings.server_timing().encode("latin-1"))
+                ]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                self._record(scope, timings)
+
+        timings, token = request_timing.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timing.stop(token)
+
+    def _record(self, scope: Scope, timings) -> None:
+        self.histograms.record(scope["method"], route_template(scope), timings)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template with its router prefix, e.g. `/api/tasks/{user_id}`.
+
+    Histograms are kept per endpoint rather than per user id. The matched
+    route only knows its path relative to its router, so the prefix is
+    recovered from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "<unmatched>"
+    try:
+        rendered = route.path_format.format(**scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    return path[:len(path) - len(rendered)] + template if path.endswith(rendered) else template
@@ -0,0 +1,50 @@
+from opentelemetry.propagate import extract
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from middleware.timing import route_template
+from services.tracing import tracer
+
+# Reading traces should not add traces
+UNTRACED_PREFIXES = ("/debug/",)
+
+
+class TracingMiddleware:
+    """Opens a SERVER span per HTTP request, named after the matched route.
+
+    Service, LLM and SQL spans created while handling the request nest under
+    it. An incoming W3C `traceparent` header is honoured, and the trace id is
+    returned in `X-Trace-Id` for lookup at /debug/traces.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(UNTRACED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        method = scope["method"]
+        with tracer.start_as_current_span(f"{method} {scope['path']}", context=extract(carrier), kind=SpanKind.SERVER,
+                                          attributes={"http.request.method": method, "url.path": scope["path"]}) as span:
+            trace_id = format(span.get_span_context().trace_id, "032x")
+
+            async def send_traced(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                    if span.is_recording():
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"x-trace-id", trace_id.encode())
+                        ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                if scope.get("route") is not None:
+                    template = route_template(scope)
+                    span.set_attribute("http.route", template)
+                    span.update_name(f"{method} {template}")
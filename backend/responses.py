@@ -0,0 +1,28 @@
+from fastapi.responses import JSONResponse
+from services.request_timing import timed
+from typing import Any
+import orjson
+
+# Naive datetimes are stored as UTC; render them (and aware UTC ones) with a Z suffix
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson.
+
+    Serializes dicts, lists, slotted dataclasses and datetimes natively, so
+    read endpoints can return Core rows without building Pydantic models.
+    Output matches the UTCDateTime schema format.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class TimedJSONResponse(JSONResponse):
+    """The stock JSON response, with rendering counted as `serialize` time in Server-Timing."""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+from database import get_db, SessionLocal, PregenerationRun
+from routes.debug import require_admin
+from services.cohort_analytics import CohortAnalytics
+from services.export_service import ExportService, EXTENSIONS, default_format
+from typing import Iterator, Optional
+from datetime import datetime
+import os
+import tempfile
+
+router = APIRouter()
+cohort_analytics = CohortAnalytics()
+export_service = ExportService()
+
+EXPORT_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "csv": "application/gzip",
+}
+
+@router.get("/analytics/cohorts", dependencies=[Depends(require_admin)])
+def get_cohort_analytics(db: Session = Depends(get_db)):
+    """Completion, time-to-complete, drop-off and failure stats across all users,
+    grouped by interest and by daily time_duration band (admin only: scans every table)"""
+    return cohort_analytics.compute(db)
+
+@router.get("/pregeneration/runs")
+def get_pregeneration_runs(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    """Coverage and token cost reports of the most recent pre-generation runs"""
+    runs = db.query(PregenerationRun).order_by(PregenerationRun.id.desc()).limit(limit).all()
+    return [
+        {"id": r.id, "started_at": r.started_at, "finished_at": r.finished_at, **(r.report or {})}
+        for r in runs
+    ]
+
+def _stream_csv_gz(table: str, since: Optional[datetime]) -> Iterator[bytes]:
+    """Stream the export on a session of its own: the request's session is
+    closed before the response body is sent."""
+    db = SessionLocal()
+    try:
+        yield from export_service.stream_csv_gz(db, table, since=since)
+    finally:
+        db.close()
+
+@router.get("/export/{table}", dependencies=[Depends(require_admin)])
+def export_table(
+    table: str,
+    format: Optional[str] = Query(None, pattern="^(parquet|arrow|csv)$"),
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Bulk export of tasks, roadmaps or task_failures (admin only: every user's rows).
+
+    csv is streamed as gzip; parquet/arrow are written to a temporary file
+    first because both formats need a footer. `since` limits the export to
+    rows created/completed (or failed) after that time.
+    """
+    if table not in ExportService.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    fmt = format or default_format()
+    filename = f"{table}.{EXTENSIONS[fmt]}"
+    if fmt == "csv":
+        return StreamingResponse(
+            _stream_csv_gz(table, since),
+            media_type=EXPORT_MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    fd, path = tempfile.mkstemp(suffix="." + EXTENSIONS[fmt])
+    os.close(fd)
+    try:
+        export_service.export_table(db, table, path, fmt, since=since)
+    except RuntimeError as e:
+        os.remove(path)
+        raise HTTPException(status_code=501, detail=str(e))
+    return FileResponse(path, media_type=EXPORT_MEDIA_TYPES[fmt], filename=filename,
+                        background=BackgroundTask(os.remove, path))
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from services.request_timing import timing_histograms, BUCKETS_MS
+from services.tracing import span_buffer, TRACING
+from services.structured_logging import set_level
+from services.profiler import profiler, ProfilerBusy, MAX_PROFILE_SECONDS, MAX_PROFILED_REQUESTS
+from typing import Optional
+import hmac
+import os
+import re
+
+router = APIRouter()
+
+# Every /debug endpoint is refused unless this is set and sent as X-Admin-Token
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Missing or wrong X-Admin-Token")
+
+@router.get("/debug/timings", dependencies=[Depends(require_admin)])
+def get_timings():
+    """Per-route histograms of request time spent in db, llm, sources, serialize and the rest (app)"""
+    return {"buckets_ms": list(BUCKETS_MS), "routes": timing_histograms.snapshot()}
+
+@router.get("/debug/traces", dependencies=[Depends(require_admin)])
+def get_traces(
+    limit: int = Query(20, ge=1, le=200),
+    trace_id: Optional[str] = Query(None, description="Only this trace (the X-Trace-Id response header)"),
+    min_duration_ms: float = Query(0, ge=0, description="Only traces whose root took at least this long"),
+    name: Optional[str] = Query(None, description="Only traces whose root span name contains this, e.g. /tasks/failure")
+):
+    """Recent traces from the in-memory span buffer, newest first, spans nested under their parents"""
+    return {
+        "enabled": TRACING,
+        "traces": span_buffer.traces(limit=limit, trace_id=trace_id, min_duration_ms=min_duration_ms, name=name),
+    }
+
+@router.post("/debug/profile", status_code=202, dependencies=[Depends(require_admin)])
+def start_profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    format: str = Query("speedscope", pattern="^(collapsed|speedscope)$"),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting on locks, queues or the event loop")
+):
+    """Sample every thread of this worker for `seconds` and write the profile to PROFILE_DIR"""
+    try:
+        return profiler.profile_for(seconds, format, include_idle=include_idle).to_dict()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/debug/profile/requests", status_code=202, dependencies=[Depends(require_admin)])
+def start_request_profile(
+    pattern: str = Query(..., description="Regex searched in the request path, e.g. /tasks/failure"),
+    count: int = Query(1, ge=1, le=MAX_PROFILED_REQUESTS),
+    method: Optional[str] = Query(None, description="Only requests with this HTTP method"),
+    timeout: float = Query(MAX_PROFILE_SECONDS, gt=0, le=3600, description="Write what was seen after this many seconds"),
+    format: str = Query("speedscope", pattern="^(collapsed|speedscope)$"),
+    include_idle: bool = Query(False)
+):
+    """Profile the next `count` requests to this worker whose path matches `pattern`"""
+    try:
+        return profiler.profile_requests(pattern, count, format, method=method, timeout=timeout,
+                                         include_idle=include_idle).to_dict()
+    except re.error as e:
+        raise HTTPException(status_code=422, detail=f"Invalid pattern: {e}")
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/debug/profile", dependencies=[Depends(require_admin)])
+def stop_profile():
+    """Finish the running profile now; its file is still written"""
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profile is running")
+    return session.to_dict()
+
+@router.get("/debug/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """The running profile, recently finished ones and the profile files on disk"""
+    return {**profiler.sessions(), "files": profiler.files()}
+
+@router.get("/debug/profiles/{name}", dependencies=[Depends(require_admin)])
+def download_profile(name: str):
+    path = profiler.file_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {name}")
+    media_type = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+@router.put("/debug/log-level", dependencies=[Depends(require_admin)])
+def put_log_level(
+    level: str = Query(..., pattern="^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$"),
+    logger: Optional[str] = Query(None, description="Logger name, e.g. llm.completions or sqlalchemy.engine (default: root)")
+):
+    """Change a logger's level in this worker until it restarts"""
+    previous = set_level(logger, level)
+    return {"logger": logger or "root", "level": level, "previous": previous}
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal, User
+from services.event_bus import event_bus
+import asyncio
+import json
+
+router = APIRouter()
+
+# Keeps idle connections alive through proxies and lets SSE notice closed clients
+HEARTBEAT_SECONDS = 25
+
+
+def _user_exists(user_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.id == user_id).first() is not None
+    finally:
+        db.close()
+
+
+@router.websocket("/ws/users/{user_id}")
+async def user_events_ws(websocket: WebSocket, user_id: int):
+    """Push task and roadmap events for one user as JSON messages.
+
+    Events: `tasks_created`, `tasks_updated`, `step_advanced`, `roadmap_created`,
+    `roadmap_completed`, plus `resync` (refetch via REST) and `ping` heartbeats.
+    """
+    if not await run_in_threadpool(_user_exists, user_id):
+        await websocket.close(code=4404, reason="User not found")
+        return
+    await websocket.accept()
+    async with event_bus.subscribe(user_id) as queue:
+        await websocket.send_json({"type": "subscribed", "user_id": user_id})
+        # Incoming messages are ignored; receiving is how a disconnect is noticed
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+        try:
+            while not disconnected.done():
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({next_event, disconnected}, timeout=HEARTBEAT_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    await websocket.send_json(next_event.result())
+                    continue
+                next_event.cancel()
+                if not disconnected.done():
+                    await websocket.send_json({"type": "ping"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            disconnected.cancel()
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/users/{user_id}/events")
+async def user_events_sse(user_id: int, request: Request):
+    """Server-Sent Events variant of the WebSocket stream, for clients that cannot use WebSockets."""
+    if not await run_in_threadpool(_user_exists, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def stream():
+        async with event_bus.subscribe(user_id) as queue:
+            yield f"event: subscribed\ndata: {json.dumps({'user_id': user_id})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from database import SessionLocal, get_db
+from schemas.jobs import JobResponse, JobAccepted
+from services.job_service import JobService, TERMINAL_STATUSES, POLL_INTERVAL_SECONDS
+from typing import Optional
+import time
+
+router = APIRouter()
+job_service = JobService()
+
+MAX_WAIT_SECONDS = 60
+
+def job_accepted(job, user_id: Optional[int] = None, model=JobAccepted, **fields) -> JSONResponse:
+    """202 response pointing the client at the job status endpoint"""
+    status_url = f"/api/jobs/{job.id}"
+    body = model(job_id=job.id, status=job.status, status_url=status_url, user_id=user_id, **fields)
+    return JSONResponse(status_code=202, content=body.model_dump(), headers={"Location": status_url})
+
+def _load_job(job_id: str) -> Optional[JobResponse]:
+    db = SessionLocal()
+    try:
+        job = job_service.get(db, job_id)
+        return JobResponse.model_validate(job) if job else None
+    finally:
+        db.close()
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS)):
+    """Job status. With `wait`, long-polls up to that many seconds for the job to finish."""
+    deadline = time.monotonic() + wait
+    while True:
+        job = await run_in_threadpool(_load_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        remaining = deadline - time.monotonic()
+        if job.status in TERMINAL_STATUSES or remaining <= 0:
+            return job
+        await job_service.wait(job_id, min(remaining, POLL_INTERVAL_SECONDS))
+
+@router.post("/jobs/{job_id}/retry", response_model=JobResponse)
+def retry_job(job_id: str, db: Session = Depends(get_db)):
+    """Requeue a failed or dead-lettered job with a fresh attempt budget"""
+    job = job_service.retry(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail="Job not found or not in a failed/dead state")
+    return JobResponse.model_validate(job)
@@ -1,15 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from database import get_db, Task
-from typing import List
+from database import get_db, User
+from services.archive_service import completed_tasks_query
+from services.completion_analytics import completion_buckets
+from services.progress_service import ProgressService
+from services.rollup_service import RollupService
+from services.task_history import (
+    encode_cursor, decode_cursor, fetch_completed_page, fetch_completed_groups_page,
+    iter_completed, ndjson_line
+)
+from typing import List, Optional
 from collections import defaultdict
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter()
+progress_service = ProgressService()
+# Daily rollups serve /task/completed/daily only. The per-second, first-minute and
+# per-minute endpoints need finer resolution than a day, so they keep reading
+# raw (and archived) completed_at values.
+rollup_service = RollupService()
+
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _group_by_second(rows, total_tasks: int):
+    """Single pass over (completed_at, id)-ordered rows, one group per second"""
+    current, count = None, 0
+    for task in rows:
+        # Round completed_at to nearest second (remove microseconds)
+        rounded_time = task.completed_at.replace(microsecond=0)
+        if rounded_time != current and current is not None:
+            yield _completion_group(current, count, total_tasks)
+            count = 0
+        current = rounded_time
+        count += 1
+    if current is not None:
+        yield _completion_group(current, count, total_tasks)
+
+def _completion_group(completed_at, completed_count: int, total_tasks: int) -> dict:
+    ratio = completed_count / total_tasks if total_tasks else 0.0
+    return {
+        "completed_at": completed_at,
+        "completed_tasks": completed_count,
+        "completion_ratio": round(ratio, 1)
+    }
 
 @router.get("/api/task/history/{user_id}")
-def get_task_history(user_id: int, db: Session = Depends(get_db)):
-    completed_tasks = db.query(Task).filter(Task.user_id == user_id, Task.completed == True).all()
+def get_task_history(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    """Completed tasks ordered by (completed_at, id).
+
+    With `limit`, the `X-Next-Cursor` header carries the keyset position to
+    pass as `cursor` for the next page. `format=ndjson` streams every row
+    after the cursor one page at a time.
+    """
+    after = _parse_cursor(cursor)
+    if format == "ndjson":
+        rows = iter_completed(user_id, after=after)
+        return StreamingResponse(
+            (ndjson_line({"id": t.id, "title": t.title, "completed_at": t.completed_at}) for t in rows),
+            media_type="application/x-ndjson"
+        )
+    completed_tasks = fetch_completed_page(db, user_id, after=after, limit=limit)
+    if limit is not None and len(completed_tasks) == limit:
+        last = completed_tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.completed_at, last.id)
     if not completed_tasks:
         return []
     return [
@@ -22,57 +90,114 @@ def get_task_history(user_id: int, db: Session = Depends(get_db)):
     ]
 
 @router.get("/api/task/completed/{user_id}")
-def get_completed_tasks(user_id: int, db: Session = Depends(get_db)):
-    from collections import defaultdict
-    completed_tasks = db.query(Task).filter(Task.user_id == user_id, Task.completed == True).all()
+def get_completed_tasks(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    """Completed task counts grouped per second, paginated like /task/history.
+
+    A page may hold slightly more than `limit` tasks so that one second is
+    never split across pages.
+    """
+    after = _parse_cursor(cursor)
+    total_tasks = progress_service.tasks_total(db, user_id)
+    if format == "ndjson":
+        groups = _group_by_second(iter_completed(user_id, after=after), total_tasks)
+        return StreamingResponse((ndjson_line(g) for g in groups), media_type="application/x-ndjson")
+    completed_tasks = fetch_completed_groups_page(db, user_id, after=after, limit=limit)
     if not completed_tasks:
         return []
-    total_tasks = db.query(Task).filter(Task.user_id == user_id).count()
-    grouped = defaultdict(list)
-    for task in completed_tasks:
-        # Round completed_at to nearest second (remove microseconds)
-        rounded_time = task.completed_at.replace(microsecond=0)
-        grouped[rounded_time].append(task)
-    result = []
-    for completed_at, tasks in grouped.items():
-        completed_count = len(tasks)
-        ratio = completed_count / total_tasks if total_tasks else 0.0
-        result.append({
-            "completed_at": completed_at,
-            "completed_tasks": completed_count,
-            "completion_ratio": round(ratio, 1)
-        })
-    return result
+    if limit is not None and len(completed_tasks) >= limit:
+        last = completed_tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.completed_at, last.id)
+    return list(_group_by_second(completed_tasks, total_tasks))
+
+@router.get("/api/task/completed/daily/{user_id}")
+def get_daily_completions(user_id: int, days: int = Query(30, ge=1, le=366), db: Session = Depends(get_db)):
+    """Daily completed/assigned/failure counts for the last `days` UTC days.
+
+    Finished days come from completion_rollups; only today is read from raw rows.
+    """
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days - 1)
+    daily = rollup_service.daily(db, user_id, start, today + timedelta(days=1))
+    empty = {"completed_count": 0, "assigned_count": 0, "failures": 0}
+    return [
+        {"day": start + timedelta(days=i), **daily.get(start + timedelta(days=i), empty)}
+        for i in range(days)
+    ]
 
 @router.get("/api/task/completed_count/within_one_minute/{user_id}")
 def get_completed_count_within_one_minute(user_id: int, db: Session = Depends(get_db)):
-    # Get all completed tasks for user
-    completed_tasks = db.query(Task).filter(Task.user_id == user_id, Task.completed == True).order_by(Task.completed_at).all()
-    if not completed_tasks:
-        return {"completed_within_one_minute": 0}
+    completed = completed_tasks_query(user_id, "completed_at")
     # Find the earliest completed_at
-    first_completed = completed_tasks[0].completed_at
+    first_completed = db.execute(select(func.min(completed.c.completed_at))).scalar()
+    if first_completed is None:
+        return {"completed_within_one_minute": 0}
     one_minute_later = first_completed + timedelta(minutes=1)
-    count = sum(1 for task in completed_tasks if first_completed <= task.completed_at < one_minute_later)
+    count = db.execute(select(func.count()).where(
+        completed.c.completed_at >= first_completed,
+        completed.c.completed_at < one_minute_later
+    )).scalar()
     return {"completed_within_one_minute": count}
 
 @router.get("/api/task/completed_count/per_minute/{user_id}")
 def get_completed_count_per_minute(user_id: int, db: Session = Depends(get_db)):
-    completed_tasks = db.query(Task).filter(Task.user_id == user_id, Task.completed == True).order_by(Task.completed_at).all()
-    if not completed_tasks:
+    """Per-minute counts in windows anchored at the first completion.
+
+    Prefer /task/completed_count/buckets for long histories; this keeps the
+    original response shape but runs in a single pass over sorted timestamps.
+    """
+    completed = completed_tasks_query(user_id, "completed_at")
+    completed_times = db.execute(
+        select(completed.c.completed_at)
+        .where(completed.c.completed_at != None)
+        .order_by(completed.c.completed_at)
+    ).scalars().all()
+    if not completed_times:
         return []
+    first_time = completed_times[0]
+    counts = defaultdict(int)
+    for completed_at in completed_times:
+        counts[(completed_at - first_time) // timedelta(minutes=1)] += 1
+    last_index = (completed_times[-1] - first_time) // timedelta(minutes=1)
     buckets = []
-    first_time = completed_tasks[0].completed_at
-    last_time = completed_tasks[-1].completed_at
-    current_start = first_time
-    current_end = current_start + timedelta(minutes=1)
-    while current_start <= last_time:
-        count = sum(1 for task in completed_tasks if current_start <= task.completed_at < current_end)
+    for index in range(last_index + 1):
+        current_start = first_time + timedelta(minutes=index)
         buckets.append({
             "minute_start": current_start,
-            "minute_end": current_end,
-            "completed_count": count
+            "minute_end": current_start + timedelta(minutes=1),
+            "completed_count": counts.get(index, 0)
         })
-        current_start = current_end
-        current_end = current_start + timedelta(minutes=1)
     return buckets
+
+@router.get("/api/task/completed_count/buckets/{user_id}")
+def get_completed_count_buckets(
+    user_id: int,
+    bucket: str = Query("day", pattern="^(minute|hour|day|week)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fill: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Completed-task counts per minute/hour/day/week bucket within [start, end).
+
+    Empty buckets are omitted unless `fill=true`.
+    """
+    try:
+        return completion_buckets(db, user_id, bucket, start=start, end=end, fill=fill)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/api/progress/{user_id}")
+def get_progress(user_id: int, db: Session = Depends(get_db)):
+    """Dashboard counters for the user's active roadmap, read from user_progress"""
+    if not db.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    progress = progress_service.get_progress(db, user_id)
+    db.commit()  # persist counters rebuilt on first access
+    return progress
@@ -1,23 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from database import get_db, User, Task, Roadmap
+from database import get_db, SessionLocal
 from schemas.users import (
     UserCreate, UserResponse, RoadmapResponse, TasksResponse,
     TaskCompletionRequest, TaskFailureRequest, RoadmapGenerationRequest
 )
-from services.user_service import UserService
-from typing import List
+from services.container import Services, get_services
+from services.user_locks import ConcurrentUpdateError
+from services.deadline import DeadlineExceeded
+from services.data_version import etag, etag_matches
+from responses import FastJSONResponse
+from services.bulk_import_service import (
+    BULK_IMPORT_CONCURRENCY, BULK_IMPORT_MAX_CONCURRENCY, BULK_IMPORT_MAX_USERS
+)
+from schemas.jobs import BulkImportAccepted
+from routes.jobs import job_accepted
+from typing import Any, Callable, List
+import json
 
 router = APIRouter()
-user_service = UserService()
+
+def conditional_get(request: Request, db: Session, services: Services, user_id: int, resource: str,
+                    build: Callable[[], Any]) -> Any:
+    """Serve `build()` with an ETag derived from the user's data version.
+
+    A matching If-None-Match is answered with 304 after a single-row version
+    lookup; otherwise the rendered body is reused from the response cache
+    until the version changes. `build` returns plain rows rendered by orjson;
+    the route's response_model only documents the shape.
+    """
+    version = services.data_versions.get(db, user_id)
+    if version is None:  # unknown user: respond as before
+        return FastJSONResponse(build())
+    tag = etag(user_id, version)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    key = (resource, user_id, version)
+    body = services.response_cache.get(key)
+    if body is None:
+        body = FastJSONResponse(build()).body
+        services.response_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# `?async=true` returns 202 + job id instead of blocking on the LLM calls
+AsyncMode = Query(False, alias="async", description="Run generation as a background job (202 + job id)")
 
 @router.post("/register", response_model=UserResponse)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+def register_user(user_data: UserCreate, async_mode: bool = AsyncMode, db: Session = Depends(get_db),
+                  services: Services = Depends(get_services)):
     """Register a new user"""
     try:
-        user = user_service.create_user(db, user_data)
+        user = services.users.create_user(db, user_data)
+        if async_mode:
+            job = services.jobs.enqueue(db, "generate_roadmap", {"user_id": user.id}, user_id=user.id)
+            return job_accepted(job, user_id=user.id)
         # Auto-generate roadmap and initial tasks (not returned) happens inside service
-        user_service.generate_roadmap(db, user.id)
+        services.users.generate_roadmap(db, user.id)
         return UserResponse(
             id=user.id,
             name=user.name,
@@ -26,99 +67,208 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             interests=user.interests,
             created_at=user.created_at
         )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _read_bulk_records(request: Request) -> List[UserCreate]:
+    """Parse a JSON array or an NDJSON stream (one UserCreate per line)."""
+    errors, records = [], []
+
+    def add(index: int, item) -> None:
+        try:
+            records.append(UserCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False)})
+        if len(records) > BULK_IMPORT_MAX_USERS:
+            raise HTTPException(status_code=413, detail=f"At most {BULK_IMPORT_MAX_USERS} users per request")
+
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            index, buffer = 0, b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        add(index, json.loads(line))
+                        index += 1
+            if buffer.strip():
+                add(index, json.loads(buffer))
+        else:
+            body = await request.json()
+            if not isinstance(body, list):
+                raise HTTPException(status_code=422, detail="Expected a JSON array of users")
+            for index, item in enumerate(body):
+                add(index, item)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if errors:
+        raise HTTPException(status_code=422, detail=errors[:100])
+    if not records:
+        raise HTTPException(status_code=422, detail="No users in request")
+    return records
+
+def _create_bulk_users(services: Services, records: List[UserCreate], concurrency: int):
+    db = SessionLocal()
+    try:
+        user_ids = services.bulk_import.create_users(db, records)
+        job = services.jobs.enqueue(db, "bulk_generate_roadmaps", {"user_ids": user_ids, "concurrency": concurrency})
+        return job, user_ids
+    finally:
+        db.close()
+
+@router.post("/users/bulk", status_code=202, response_model=BulkImportAccepted)
+async def bulk_register_users(
+    request: Request,
+    concurrency: int = Query(BULK_IMPORT_CONCURRENCY, ge=1, le=BULK_IMPORT_MAX_CONCURRENCY),
+    services: Services = Depends(get_services)
+):
+    """Register many users in one transaction (JSON array or NDJSON) and generate their
+    roadmaps in a background job: one generation per unique interest profile, at most
+    `concurrency` in parallel. Poll the returned job for progress."""
+    records = await _read_bulk_records(request)
+    job, user_ids = await run_in_threadpool(_create_bulk_users, services, records, concurrency)
+    return job_accepted(
+        job, model=BulkImportAccepted, users_created=len(user_ids),
+        unique_profiles=services.bulk_import.count_profiles(records), user_ids=user_ids
+    )
+
 @router.get("/user/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, request: Request, db: Session = Depends(get_db),
+             services: Services = Depends(get_services)):
     """Get user by ID"""
-    user = user_service.get_user_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return UserResponse(
-        id=user.id,
-        name=user.name,
-        age=user.age,
-        time_duration=user.time_duration,
-        interests=user.interests,
-        created_at=user.created_at
-    )
+    def build():
+        user = services.users.get_user_row(db, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    return conditional_get(request, db, services, user_id, "user", build)
 
 @router.post("/roadmap/generate", response_model=RoadmapResponse)
-def generate_roadmap(request: RoadmapGenerationRequest, db: Session = Depends(get_db)):
+def generate_roadmap(request: RoadmapGenerationRequest, background_tasks: BackgroundTasks,
+                     async_mode: bool = AsyncMode, db: Session = Depends(get_db),
+                     services: Services = Depends(get_services)):
     """Generate a new roadmap for the user"""
     try:
-        roadmap = user_service.generate_roadmap(db, request.user_id)
+        if async_mode:
+            if not services.users.get_user_by_id(db, request.user_id):
+                raise ValueError("User not found")
+            job = services.jobs.enqueue(db, "generate_roadmap", {"user_id": request.user_id}, user_id=request.user_id)
+            return job_accepted(job, user_id=request.user_id)
+        roadmap = services.users.generate_roadmap(db, request.user_id)
+        # Move the superseded roadmap and its tasks out of the hot tables
+        background_tasks.add_task(services.archive.archive_user, request.user_id)
         return roadmap
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/roadmap/{user_id}", response_model=RoadmapResponse)
-def get_roadmap(user_id: int, db: Session = Depends(get_db)):
+def get_roadmap(user_id: int, request: Request, db: Session = Depends(get_db),
+                services: Services = Depends(get_services)):
     """Get the active roadmap for a user"""
-    roadmap = user_service.get_active_roadmap(db, user_id)
-    if not roadmap:
-        raise HTTPException(status_code=404, detail="No active roadmap found")
-    
-    return roadmap
+    def build():
+        roadmap = services.users.get_active_roadmap_row(db, user_id)
+        if not roadmap:
+            raise HTTPException(status_code=404, detail="No active roadmap found")
+        return roadmap
+    return conditional_get(request, db, services, user_id, "roadmap", build)
 
 @router.post("/tasks/generate/{user_id}", response_model=TasksResponse)
-def generate_tasks(user_id: int, db: Session = Depends(get_db)):
+def generate_tasks(user_id: int, async_mode: bool = AsyncMode, db: Session = Depends(get_db),
+                   services: Services = Depends(get_services)):
     """Generate tasks for the user"""
     try:
-        tasks = user_service.generate_tasks(db, user_id)
+        if async_mode:
+            if not services.users.get_user_by_id(db, user_id):
+                raise ValueError("User not found")
+            job = services.jobs.enqueue(db, "generate_step_tasks", {"user_id": user_id}, user_id=user_id)
+            return job_accepted(job, user_id=user_id)
+        tasks = services.users.generate_tasks(db, user_id)
         return tasks
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/tasks/{user_id}", response_model=TasksResponse)
-def get_tasks(user_id: int, db: Session = Depends(get_db)):
+def get_tasks(user_id: int, request: Request, db: Session = Depends(get_db),
+              services: Services = Depends(get_services)):
     """Get all active tasks for a user"""
-    tasks = user_service.get_user_tasks(db, user_id)
-    return tasks
+    return conditional_get(request, db, services, user_id, "tasks", lambda: {"tasks": services.users.list_task_rows(db, user_id)})
 
 @router.post("/tasks/complete/{user_id}")
-def complete_tasks(user_id: int, request: TaskCompletionRequest, db: Session = Depends(get_db)):
+def complete_tasks(user_id: int, request: TaskCompletionRequest, db: Session = Depends(get_db),
+                   services: Services = Depends(get_services)):
     """Handle task completion"""
     try:
-        result = user_service.handle_task_completion(db, user_id, request.completed_tasks)
+        result = services.users.handle_task_completion(db, user_id, request.completed_tasks)
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tasks/failure/{user_id}", response_model=TasksResponse)
-def handle_task_failure(user_id: int, request: TaskFailureRequest, db: Session = Depends(get_db)):
+def handle_task_failure(user_id: int, request: TaskFailureRequest, async_mode: bool = AsyncMode,
+                        db: Session = Depends(get_db),
+                        services: Services = Depends(get_services)):
     """Handle task failure and reassign tasks"""
     try:
-        tasks = user_service.handle_task_failure(
+        if async_mode:
+            if not services.users.get_user_by_id(db, user_id):
+                raise ValueError("User not found")
+            job = services.jobs.enqueue(db, "reassign_tasks", {"user_id": user_id, **request.model_dump()}, user_id=user_id)
+            return job_accepted(job, user_id=user_id)
+        tasks = services.users.handle_task_failure(
             db, user_id, request.failure_reason, request.completed_tasks
         )
         return tasks
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/roadmap/regenerate/{user_id}", response_model=RoadmapResponse)
-def regenerate_roadmap(user_id: int, db: Session = Depends(get_db)):
+def regenerate_roadmap(user_id: int, background_tasks: BackgroundTasks,
+                       async_mode: bool = AsyncMode, db: Session = Depends(get_db),
+                       services: Services = Depends(get_services)):
     """Regenerate roadmap (deletes previous roadmap and tasks)"""
     try:
-        # Deactivate all previous roadmaps and tasks
-        db.query(Task).filter(Task.user_id == user_id).update({"is_active": False})
-        db.query(Roadmap).filter(Roadmap.user_id == user_id).update({"is_active": False})
-        db.commit()
-        
-        # Generate new roadmap
-        roadmap = user_service.generate_roadmap(db, user_id)  # also generates initial tasks internally
+        if async_mode:
+            if not services.users.get_user_by_id(db, user_id):
+                raise ValueError("User not found")
+            job = services.jobs.enqueue(db, "regenerate_roadmap", {"user_id": user_id}, user_id=user_id)
+            return job_accepted(job, user_id=user_id)
+        roadmap = services.users.regenerate_roadmap(db, user_id)
+        # Move the deactivated roadmaps and tasks out of the hot tables
+        background_tasks.add_task(services.archive.archive_user, user_id)
         return roadmap
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ConcurrentUpdateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
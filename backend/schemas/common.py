@@ -0,0 +1,12 @@
+from pydantic import PlainSerializer
+from typing import Annotated
+from datetime import datetime
+
+
+def utc_isoformat(value: datetime) -> str:
+    """ISO 8601 with a Z suffix; naive datetimes are stored as UTC."""
+    return value.isoformat().replace('+00:00', 'Z') if value.tzinfo else value.isoformat() + 'Z'
+
+
+# datetime that serializes to JSON as UTC with a Z suffix (replaces the Config.json_encoders lambdas)
+UTCDateTime = Annotated[datetime, PlainSerializer(utc_isoformat, return_type=str, when_used="json")]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from schemas.common import UTCDateTime
+from typing import Any, List, Optional
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    user_id: Optional[int] = None
+    status: str  # pending | running | succeeded | failed | dead
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 0
+    run_after: Optional[UTCDateTime] = None
+    progress: Optional[Any] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: UTCDateTime
+    started_at: Optional[UTCDateTime] = None
+    finished_at: Optional[UTCDateTime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    user_id: Optional[int] = None
+
+class BulkImportAccepted(JobAccepted):
+    users_created: int
+    unique_profiles: int
+    user_ids: List[int]
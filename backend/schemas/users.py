@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from schemas.common import UTCDateTime
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # User Registration Schema
@@ -15,12 +17,7 @@ class UserResponse(BaseModel):
     age: int
     time_duration: int
     interests: List[str]
-    created_at: datetime
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat().replace('+00:00', 'Z') if v.tzinfo else v.isoformat() + 'Z'
-        }
+    created_at: UTCDateTime
 
 # Roadmap Schemas
 class RoadmapStep(BaseModel):
@@ -31,31 +28,50 @@ class RoadmapResponse(BaseModel):
     id: int
     title: str
     steps: List[RoadmapStep]
-    created_at: datetime
+    created_at: UTCDateTime
     is_active: bool
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat().replace('+00:00', 'Z') if v.tzinfo else v.isoformat() + 'Z'
-        }
-
 # Task Schemas
 class TaskResponse(BaseModel):
     id: int
     title: str
     description: str
-    assigned_time: datetime
+    assigned_time: UTCDateTime
     sources: List[str] = []
     completed: bool
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat().replace('+00:00', 'Z') if v.tzinfo else v.isoformat() + 'Z'
-        }
-
 class TasksResponse(BaseModel):
     tasks: List[TaskResponse]
 
+# Read rows for the GET endpoints: filled from Core selects and serialized by orjson
+# directly, without building or re-validating the Pydantic models above.
+# Field order matches the corresponding response model.
+@dataclass(slots=True)
+class UserRow:
+    id: int
+    name: str
+    age: int
+    time_duration: int
+    interests: List[str]
+    created_at: datetime
+
+@dataclass(slots=True)
+class RoadmapRow:
+    id: int
+    title: str
+    steps: List[Dict[str, Any]]
+    created_at: datetime
+    is_active: bool
+
+@dataclass(slots=True)
+class TaskRow:
+    id: int
+    title: str
+    description: str
+    assigned_time: datetime
+    sources: List[str]
+    completed: bool
+
 # Task Completion Schema
 class TaskCompletion(BaseModel):
     task_id: int
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Production server for the Developer Guidance System
+
+Imports the app once in this process (preload), binds the listening socket,
+then forks worker processes that serve it with uvicorn. Workers share the
+imported code copy-on-write and accept connections from the same socket; a
+worker that dies is replaced. SIGTERM or SIGINT stops the workers gracefully.
+
+The worker count defaults to WEB_CONCURRENCY, or else one worker per CPU
+available to the process (affinity and cgroup quota aware). With more than
+one worker, EVENT_BUS defaults to "database" and CACHE_BACKEND to "sqlite" so
+pushes and caches reach every worker; the archive sweep, pre-generation
+scheduler and idempotency key purge run in the first worker only.
+
+Usage:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+"""
+
+import argparse
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger("serve")
+
+# A worker exiting sooner than this after its start is restarted only after this delay
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Developer Guidance System production server")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Worker processes (default: WEB_CONCURRENCY or the available CPUs)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--graceful-timeout", type=float, default=30,
+                        help="Seconds a stopping worker may spend finishing open requests")
+    return parser
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the app and build everything workers can share before forking."""
+    from sqlalchemy.orm import configure_mappers
+    from main import app
+    import database
+    configure_mappers()
+    # Connections must not be shared across the fork; each worker opens its own
+    database.engine.dispose()
+    return app
+
+
+def run_worker(app, sock: socket.socket, index: int, args) -> None:
+    """Body of a forked worker; never returns."""
+    import uvicorn
+    from services.structured_logging import configure_logging
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.environ["SERVE_WORKER_INDEX"] = str(index)
+    # The parent's log writer thread did not survive the fork
+    configure_logging()
+    code = 0
+    try:
+        config = uvicorn.Config(app, log_config=None, timeout_graceful_shutdown=args.graceful_timeout)
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker %d crashed", index)
+        code = 1
+    finally:
+        from services.structured_logging import shutdown_logging
+        shutdown_logging()
+    os._exit(code)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.workers < 1:
+        print("--workers must be at least 1", file=sys.stderr)
+        return 2
+    if args.workers > 1:
+        # Read at import, so set before preloading
+        os.environ.setdefault("EVENT_BUS", "database")
+        os.environ.setdefault("CACHE_BACKEND", "sqlite")
+    if args.workers == 1 or not hasattr(os, "fork"):
+        import uvicorn
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                    timeout_graceful_shutdown=args.graceful_timeout, log_config=None)
+        return 0
+
+    sock = bind(args.host, args.port)
+    app = preload()
+    from services.structured_logging import configure_logging, shutdown_logging
+
+    workers = {}  # pid -> (index, started_at)
+    stopping = False
+
+    def spawn(index: int) -> None:
+        # Stop the log writer thread so the child does not inherit a held lock
+        shutdown_logging()
+        pid = os.fork()
+        if pid == 0:
+            run_worker(app, sock, index, args)
+        configure_logging()
+        workers[pid] = (index, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            logger.info("Received signal %s, stopping %d workers", signum, len(workers))
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(args.workers):
+        spawn(index)
+    logger.info("Serving on %s:%d with %d workers (pids %s)", args.host, args.port, args.workers,
+                ",".join(map(str, workers)))
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index, started_at = workers.pop(pid, (None, None))
+        if index is None or stopping:
+            continue
+        logger.warning("Worker %d (pid %d) exited with status %d; restarting it",
+                       index, pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started_at < RESPAWN_DELAY_SECONDS:
+            time.sleep(RESPAWN_DELAY_SECONDS)
+        if not stopping:
+            spawn(index)
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+from sqlalchemy import select, insert, delete, or_, union_all, literal, exists
+from sqlalchemy.orm import Session
+from database import SessionLocal, Roadmap, Task, TaskFailure, StepProgress, RoadmapArchive, TaskArchive
+from typing import Dict, Optional
+from datetime import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TASK_COLUMNS = [
+    "id", "user_id", "roadmap_id", "step_num", "title", "description", "assigned_time",
+    "sources", "completed", "completed_at", "created_at", "is_active",
+]
+ROADMAP_COLUMNS = ["id", "user_id", "title", "steps", "current_step", "created_at", "is_active"]
+
+
+def completed_tasks_query(user_id: int, *columns: str):
+    """Completed tasks for a user across the live and archive tables.
+
+    Returns a subquery exposing the requested columns (default id, title,
+    completed_at) so history and analytics read both tables transparently.
+    """
+    columns = columns or ("id", "title", "completed_at")
+    live = select(*[getattr(Task, c) for c in columns]).where(
+        Task.user_id == user_id, Task.completed == True
+    )
+    archived = select(*[getattr(TaskArchive, c) for c in columns]).where(
+        TaskArchive.user_id == user_id, TaskArchive.completed == True
+    )
+    return union_all(live, archived).subquery("completed_tasks")
+
+
+class ArchiveService:
+    """Moves inactive tasks and roadmaps into *_archive tables in batches.
+
+    A task is archivable once it is inactive or belongs to an inactive roadmap;
+    a roadmap is archivable once it is inactive and none of its tasks remain in
+    the live table. Tasks referenced by task_failures stay put so the foreign
+    key keeps pointing at a live row.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+
+    def archive_inactive(self, db: Session, user_id: Optional[int] = None,
+                         max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Archive in batches until nothing is left (or max_batches is reached).
+
+        Each batch is committed on its own so the live tables are never locked
+        for longer than one batch.
+        """
+        moved = {"tasks": 0, "roadmaps": 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            task_count = self._archive_task_batch(db, user_id)
+            roadmap_count = self._archive_roadmap_batch(db, user_id)
+            db.commit()
+            batches += 1
+            moved["tasks"] += task_count
+            moved["roadmaps"] += roadmap_count
+            if task_count < self.batch_size and roadmap_count < self.batch_size:
+                break
+        if moved["tasks"] or moved["roadmaps"]:
+            logger.info("Archived %d tasks and %d roadmaps", moved["tasks"], moved["roadmaps"])
+        return moved
+
+    def archive_user(self, user_id: int) -> Dict[str, int]:
+        """Background-task entry point: archive one user's rows in a fresh session."""
+        db = SessionLocal()
+        try:
+            return self.archive_inactive(db, user_id=user_id)
+        except Exception:
+            db.rollback()
+            logger.exception("Archiving failed for user %s", user_id)
+            return {"tasks": 0, "roadmaps": 0}
+        finally:
+            db.close()
+
+    def _archive_task_batch(self, db: Session, user_id: Optional[int]) -> int:
+        inactive_roadmaps = select(Roadmap.id).where(Roadmap.is_active == False)
+        referenced = exists().where(TaskFailure.task_id == Task.id)
+        query = select(Task.id).where(
+            or_(Task.is_active == False, Task.roadmap_id.in_(inactive_roadmaps)),
+            ~referenced
+        )
+        if user_id is not None:
+            query = query.where(Task.user_id == user_id)
+        ids = db.execute(query.order_by(Task.id).limit(self.batch_size)).scalars().all()
+        if not ids:
+            return 0
+        archived_at = datetime.utcnow()
+        db.execute(insert(TaskArchive).from_select(
+            TASK_COLUMNS + ["archived_at"],
+            select(*[getattr(Task, c) for c in TASK_COLUMNS], literal(archived_at)).where(Task.id.in_(ids))
+        ))
+        db.execute(delete(Task).where(Task.id.in_(ids)))
+        return len(ids)
+
+    def _archive_roadmap_batch(self, db: Session, user_id: Optional[int]) -> int:
+        has_live_tasks = exists().where(Task.roadmap_id == Roadmap.id)
+        query = select(Roadmap.id).where(Roadmap.is_active == False, ~has_live_tasks)
+        if user_id is not None:
+            query = query.where(Roadmap.user_id == user_id)
+        ids = db.execute(query.order_by(Roadmap.id).limit(self.batch_size)).scalars().all()
+        if not ids:
+            return 0
+        archived_at = datetime.utcnow()
+        db.execute(insert(RoadmapArchive).from_select(
+            ROADMAP_COLUMNS + ["archived_at"],
+            select(*[getattr(Roadmap, c) for c in ROADMAP_COLUMNS], literal(archived_at)).where(Roadmap.id.in_(ids))
+        ))
+        db.execute(delete(StepProgress).where(StepProgress.roadmap_id.in_(ids)))
+        db.execute(delete(Roadmap).where(Roadmap.id.in_(ids)))
+        return len(ids)
+
+
+class ArchiveWorker:
+    """Daemon thread that periodically sweeps all users' inactive rows."""
+
+    def __init__(self, interval_seconds: float, service: Optional[ArchiveService] = None):
+        self.interval_seconds = interval_seconds
+        self.service = service or ArchiveService()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="archive-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            db = SessionLocal()
+            try:
+                self.service.archive_inactive(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Archive sweep failed")
+            finally:
+                db.close()
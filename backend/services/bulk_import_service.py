@@ -0,0 +1,138 @@
+from sqlalchemy.orm import Session
+from database import SessionLocal, User, Roadmap
+from schemas.users import UserCreate
+from services.user_service import UserService
+from services.job_service import JobService
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", "4"))
+BULK_IMPORT_MAX_CONCURRENCY = 32
+BULK_IMPORT_MAX_USERS = int(os.getenv("BULK_IMPORT_MAX_USERS", "10000"))
+
+ProfileKey = Tuple[Tuple[str, ...], int, int]
+
+
+def profile_key(interests: List[str], time_duration: int, age: int) -> ProfileKey:
+    """Everything the roadmap and step-1 task prompts depend on, normalized."""
+    return tuple(sorted({str(i).strip().lower() for i in interests})), time_duration, age
+
+
+class BulkImportService:
+    """Creates many users at once and generates one roadmap per unique profile.
+
+    Users sharing interests, daily time and age get copies of the same
+    generated roadmap and step-1 tasks, so a cohort costs two LLM calls per
+    distinct profile instead of per user. Profiles are generated on a bounded
+    thread pool inside a `bulk_generate_roadmaps` job.
+    """
+
+    def __init__(self, user_service: UserService, jobs: JobService):
+        self.user_service = user_service
+        self.jobs = jobs
+
+    def create_users(self, db: Session, records: List[UserCreate]) -> List[int]:
+        """Insert every record in a single transaction; returns the new ids in input order."""
+        users = [
+            User(name=r.name, age=r.age, time_duration=r.time_duration, interests=r.interests)
+            for r in records
+        ]
+        try:
+            db.add_all(users)
+            db.flush()
+            ids = [u.id for u in users]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return ids
+
+    def count_profiles(self, records: List[UserCreate]) -> int:
+        return len({profile_key(r.interests, r.time_duration, r.age) for r in records})
+
+    def generate(self, db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Job handler: generate and assign roadmaps for payload["user_ids"].
+
+        Users that already have an active roadmap are skipped, so a retry only
+        redoes the profiles that failed.
+        """
+        concurrency = min(payload.get("concurrency") or BULK_IMPORT_CONCURRENCY, BULK_IMPORT_MAX_CONCURRENCY)
+        user_ids = payload["user_ids"]
+        done = {row[0] for row in db.query(Roadmap.user_id).filter(
+            Roadmap.user_id.in_(user_ids), Roadmap.is_active == True
+        )}
+        groups: Dict[ProfileKey, List[User]] = {}
+        for user in db.query(User).filter(User.id.in_(user_ids)).order_by(User.id):
+            if user.id not in done:
+                groups.setdefault(profile_key(user.interests, user.time_duration, user.age), []).append(user)
+        db.expunge_all()
+
+        progress = {
+            "users_total": len(user_ids),
+            "users_done": len(done),
+            "profiles_total": len(groups),
+            "profiles_done": 0,
+            "profiles_failed": 0,
+        }
+        lock = threading.Lock()
+        job_id = self.jobs.current_job_id()
+        self.jobs.report_progress(dict(progress), job_id)
+
+        def run_profile(members: List[User]) -> None:
+            try:
+                self._generate_profile(members)
+                with lock:
+                    progress["profiles_done"] += 1
+                    progress["users_done"] += len(members)
+                    snapshot = dict(progress)
+            except Exception:
+                logger.exception("Bulk generation failed for profile of user %s", members[0].id)
+                with lock:
+                    progress["profiles_failed"] += 1
+                    snapshot = dict(progress)
+            self.jobs.report_progress(snapshot, job_id)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-import") as pool:
+            list(pool.map(run_profile, groups.values()))
+
+        if progress["profiles_failed"]:
+            raise RuntimeError(
+                f"{progress['profiles_failed']} of {progress['profiles_total']} profiles failed; retry resumes them"
+            )
+        return {
+            **progress,
+            "llm_calls_saved": 2 * (progress["users_total"] - len(done) - progress["profiles_total"]),
+        }
+
+    def _generate_profile(self, members: List[User]) -> None:
+        first = members[0]
+        llm = self.user_service.llm_service
+        roadmap_data = llm.generate_roadmap(first.interests, first.time_duration, first.age)
+        steps = roadmap_data["steps"]
+        step = steps[0] if steps else {}
+        tasks_data = llm.generate_tasks(
+            roadmap_step=step.get("title") if isinstance(step, dict) else str(step),
+            user_interests=first.interests,
+            time_duration=first.time_duration,
+            previous_failures=[],
+            all_steps=steps,
+            current_step_num=1
+        )
+        # Canned content would be copied to every member; fail the profile so the job's retry redoes it
+        if roadmap_data.get("is_fallback") or any(td.get("is_fallback") for td in tasks_data):
+            raise RuntimeError("LLM unavailable; fallback content not assigned")
+        db = SessionLocal()
+        try:
+            for user in members:
+                self.user_service.assign_generated_roadmap(db, user.id, roadmap_data, tasks_data)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,214 @@
+import numpy as np
+from sqlalchemy import select, func, union_all, literal_column
+from sqlalchemy.orm import Session
+from database import User, Task, TaskArchive, TaskFailure
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+
+CHUNK_SIZE = 50000
+PERCENTILES = (10, 25, 50, 75, 90)
+# Upper bounds (inclusive) of the daily time_duration bands, in minutes
+DURATION_BANDS = ((30, "<=30"), (60, "31-60"), (120, "61-120"))
+DURATION_OVERFLOW_BAND = ">120"
+MAX_STEPS = 50
+
+
+def _epoch(column, dialect: str):
+    """SQL expression converting a naive-UTC DateTime column to epoch seconds."""
+    if dialect == "sqlite":
+        return (func.julianday(column) - literal_column("2440587.5")) * literal_column("86400.0")
+    if dialect == "postgresql":
+        return func.extract("epoch", column)
+    return column
+
+
+def _load_columns(db: Session, query, width: int, dialect: str, epoch_columns=()) -> np.ndarray:
+    """Stream a query in CHUNK_SIZE batches into a float64 (rows, width) array.
+
+    NULLs become NaN. On backends without an epoch expression, datetime
+    columns are converted chunk by chunk on the Python side.
+    """
+    chunks: List[np.ndarray] = []
+    # Core execution: skips ORM row processing, which dominates at this scale
+    result = db.connection().execute(query.execution_options(stream_results=True, yield_per=CHUNK_SIZE))
+    for rows in result.tuples().partitions(CHUNK_SIZE):
+        rows = [tuple(row) for row in rows]
+        if dialect not in ("sqlite", "postgresql") and epoch_columns:
+            rows = [
+                tuple(
+                    (v.replace(tzinfo=v.tzinfo or timezone.utc).timestamp() if isinstance(v, datetime) else v)
+                    if i in epoch_columns else v
+                    for i, v in enumerate(row)
+                )
+                for row in rows
+            ]
+        chunks.append(np.array(rows, dtype=np.float64).reshape(-1, width))
+    if not chunks:
+        return np.empty((0, width), dtype=np.float64)
+    return np.concatenate(chunks)
+
+
+def duration_band(minutes: int) -> str:
+    for upper, label in DURATION_BANDS:
+        if minutes <= upper:
+            return label
+    return DURATION_OVERFLOW_BAND
+
+
+class CohortAnalytics:
+    """Cohort views over every user, computed with NumPy instead of ORM loops.
+
+    Only the columns needed are selected, streamed in chunks into float64
+    arrays (timestamps as epoch seconds), and every statistic is a vectorized
+    reduction over those arrays.
+    """
+
+    def compute(self, db: Session) -> Dict[str, Any]:
+        dialect = db.get_bind().dialect.name
+
+        # Users: small relative to tasks, loaded with their JSON interests
+        user_rows = db.execute(
+            select(User.id, User.time_duration, User.interests).order_by(User.id)
+        ).all()
+        user_ids = np.array([r[0] for r in user_rows], dtype=np.int64)
+        n_users = len(user_ids)
+
+        tasks = union_all(
+            select(Task.user_id, Task.step_num, Task.assigned_time, Task.completed, Task.completed_at),
+            select(TaskArchive.user_id, TaskArchive.step_num, TaskArchive.assigned_time,
+                   TaskArchive.completed, TaskArchive.completed_at)
+        ).subquery()
+        task_data = _load_columns(db, select(
+            tasks.c.user_id,
+            tasks.c.step_num,
+            _epoch(tasks.c.assigned_time, dialect),
+            tasks.c.completed,
+            _epoch(tasks.c.completed_at, dialect),
+        ), 5, dialect, epoch_columns=(2, 4))
+        failure_data = _load_columns(db, select(
+            TaskFailure.user_id,
+            _epoch(TaskFailure.failure_date, dialect),
+        ), 2, dialect, epoch_columns=(1,))
+
+        # Dense user index for every task / failure row
+        task_user = np.searchsorted(user_ids, task_data[:, 0].astype(np.int64))
+        valid = (task_user < n_users)
+        valid[valid] &= user_ids[task_user[valid]] == task_data[valid, 0].astype(np.int64)
+        task_data, task_user = task_data[valid], task_user[valid]
+
+        steps = np.nan_to_num(task_data[:, 1], nan=1).astype(np.int64).clip(1, MAX_STEPS)
+        assigned = task_data[:, 2]
+        completed = task_data[:, 3] == 1
+        completed_at = task_data[:, 4]
+
+        tasks_per_user = np.bincount(task_user, minlength=n_users)
+        completed_per_user = np.bincount(task_user, weights=completed, minlength=n_users)
+        max_step_per_user = np.zeros(n_users, dtype=np.int64)
+        np.maximum.at(max_step_per_user, task_user, steps)
+
+        minutes_to_complete = (completed_at - assigned) / 60.0
+        timed = completed & ~np.isnan(minutes_to_complete) & (minutes_to_complete >= 0)
+
+        failure_step, failure_user = self._attribute_failures(
+            user_ids, failure_data, task_user, assigned, steps
+        )
+
+        # Cohort membership: one boolean vector over users per cohort
+        by_interest: Dict[str, np.ndarray] = {}
+        by_duration: Dict[str, np.ndarray] = {}
+        for i, (_, time_duration, interests) in enumerate(user_rows):
+            band = duration_band(time_duration or 0)
+            by_duration.setdefault(band, np.zeros(n_users, dtype=bool))[i] = True
+            for interest in {str(x).strip().lower() for x in (interests or []) if str(x).strip()}:
+                by_interest.setdefault(interest, np.zeros(n_users, dtype=bool))[i] = True
+
+        context = {
+            "task_user": task_user,
+            "steps": steps,
+            "tasks_per_user": tasks_per_user,
+            "completed_per_user": completed_per_user,
+            "max_step_per_user": max_step_per_user,
+            "minutes_to_complete": minutes_to_complete,
+            "timed": timed,
+            "failure_user": failure_user,
+            "failure_step": failure_step,
+        }
+        return {
+            "generated_at": datetime.now(timezone.utc),
+            "users": n_users,
+            "tasks": int(len(task_user)),
+            "failures": int(len(failure_user)),
+            "overall": self._cohort_stats(np.ones(n_users, dtype=bool), context),
+            "by_interest": {k: self._cohort_stats(m, context) for k, m in sorted(by_interest.items())},
+            "by_time_duration": {k: self._cohort_stats(m, context) for k, m in sorted(by_duration.items())},
+        }
+
+    def _attribute_failures(self, user_ids: np.ndarray, failure_data: np.ndarray,
+                            task_user: np.ndarray, assigned: np.ndarray, steps: np.ndarray):
+        """Attribute each failure to the step of the user's latest task assigned before it.
+
+        Tasks are sorted by a combined (user, assigned_time) key so a single
+        searchsorted locates every failure's preceding task.
+        """
+        if len(failure_data) == 0 or len(task_user) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        failure_user = np.searchsorted(user_ids, failure_data[:, 0].astype(np.int64))
+        known = failure_user < len(user_ids)
+        known[known] &= user_ids[failure_user[known]] == failure_data[known, 0].astype(np.int64)
+        failure_user, failure_time = failure_user[known], failure_data[known, 1]
+
+        scale = 10 ** 10  # epoch seconds stay well below this
+        task_key = task_user.astype(np.int64) * scale + np.nan_to_num(assigned, nan=0.0).astype(np.int64)
+        order = np.argsort(task_key, kind="stable")
+        sorted_key = task_key[order]
+        failure_key = failure_user.astype(np.int64) * scale + np.nan_to_num(failure_time, nan=scale - 1).astype(np.int64)
+        pos = np.searchsorted(sorted_key, failure_key, side="right") - 1
+        has_task = pos >= 0
+        has_task[has_task] &= task_user[order[pos[has_task]]] == failure_user[has_task]
+        failure_step = np.ones(len(failure_user), dtype=np.int64)
+        failure_step[has_task] = steps[order[pos[has_task]]]
+        return failure_step, failure_user
+
+    def _cohort_stats(self, members: np.ndarray, ctx: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        active = members & (ctx["tasks_per_user"] > 0)
+        rates = ctx["completed_per_user"][active] / ctx["tasks_per_user"][active]
+        task_mask = members[ctx["task_user"]]
+        minutes = ctx["minutes_to_complete"][task_mask & ctx["timed"]]
+        failure_mask = members[ctx["failure_user"]] if len(ctx["failure_user"]) else np.zeros(0, dtype=bool)
+
+        max_steps = ctx["max_step_per_user"][active]
+        top_step = int(max_steps.max()) if len(max_steps) else 0
+        # reached[k - 1] = users whose furthest step is >= k
+        reached = np.cumsum(np.bincount(max_steps, minlength=top_step + 2)[::-1])[::-1][1:]
+        tasks_by_step = np.bincount(ctx["steps"][task_mask], minlength=top_step + 1)
+        failures_by_step = np.bincount(ctx["failure_step"][failure_mask], minlength=top_step + 1)
+
+        steps: List[Dict[str, Any]] = []
+        for k in range(1, top_step + 1):
+            users_reached = int(reached[k - 1])
+            next_reached = int(reached[k]) if k < len(reached) else 0
+            step_tasks = int(tasks_by_step[k]) if k < len(tasks_by_step) else 0
+            step_failures = int(failures_by_step[k]) if k < len(failures_by_step) else 0
+            steps.append({
+                "step_num": k,
+                "users_reached": users_reached,
+                "drop_off_rate": round(1 - next_reached / users_reached, 4) if users_reached else None,
+                "tasks": step_tasks,
+                "failures": step_failures,
+                "failure_rate": round(step_failures / step_tasks, 4) if step_tasks else None,
+            })
+
+        return {
+            "users": int(members.sum()),
+            "users_with_tasks": int(active.sum()),
+            "tasks": int(task_mask.sum()),
+            "completion_rate_percentiles": self._percentiles(rates),
+            "median_minutes_to_complete": round(float(np.median(minutes)), 2) if len(minutes) else None,
+            "steps": steps,
+        }
+
+    def _percentiles(self, values: np.ndarray) -> Optional[Dict[str, float]]:
+        if not len(values):
+            return None
+        points = np.percentile(values, PERCENTILES)
+        return {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, points)}
@@ -0,0 +1,157 @@
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from services.archive_service import completed_tasks_query
+from services.rollup_service import RollupService
+from typing import List, Dict, Any, Optional, Iterable
+from datetime import date, datetime, time, timedelta, timezone
+
+BUCKET_WIDTHS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# Upper bound on the number of buckets a filled response may contain
+MAX_FILLED_BUCKETS = 10000
+
+SQLITE_BUCKET_FORMATS = {
+    "minute": ("%Y-%m-%d %H:%M:00",),
+    "hour": ("%Y-%m-%d %H:00:00",),
+    "day": ("%Y-%m-%d 00:00:00",),
+    # Monday of the row's ISO week
+    "week": ("%Y-%m-%d 00:00:00", "weekday 0", "-6 days"),
+}
+
+
+def bucket_floor(value: datetime, bucket: str) -> datetime:
+    """Start of the bucket containing `value` (weeks start on Monday)."""
+    if bucket == "minute":
+        return value.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown bucket width: {bucket}")
+
+
+def _bucket_expression(dialect: str, column, bucket: str):
+    if dialect == "sqlite":
+        fmt, *modifiers = SQLITE_BUCKET_FORMATS[bucket]
+        return func.strftime(fmt, column, *modifiers)
+    if dialect == "postgresql":
+        return func.date_trunc(bucket, column)
+    return None
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; normalize aware query bounds to match."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _as_datetime(value) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def completion_buckets(db: Session, user_id: int, bucket: str,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       fill: bool = False) -> List[Dict[str, Any]]:
+    """Completed-task counts per time bucket.
+
+    SQLite and PostgreSQL compute the counts with a GROUP BY on a truncated
+    timestamp; other backends fall back to a single pass over completed_at
+    values streamed in order. Buckets without completions are omitted unless
+    `fill` is set.
+    """
+    if bucket not in BUCKET_WIDTHS:
+        raise ValueError(f"Unknown bucket width: {bucket}")
+    start, end = _naive_utc(start), _naive_utc(end)
+    if bucket in ("day", "week") and _day_aligned(start) and _day_aligned(end):
+        counts = _rollup_counts(db, user_id, bucket, start, end)
+        return _bucket_rows(_fill(counts, bucket, start, end) if fill else counts, bucket)
+    completed = completed_tasks_query(user_id, "completed_at")
+    conditions = [completed.c.completed_at != None]
+    if start is not None:
+        conditions.append(completed.c.completed_at >= start)
+    if end is not None:
+        conditions.append(completed.c.completed_at < end)
+
+    expression = _bucket_expression(db.get_bind().dialect.name, completed.c.completed_at, bucket)
+    if expression is not None:
+        key = expression.label("bucket")
+        rows = db.execute(
+            select(key, func.count()).where(*conditions).group_by(key).order_by(key)
+        ).all()
+        counts = {_as_datetime(b): n for b, n in rows}
+    else:
+        values = db.execute(
+            select(completed.c.completed_at).where(*conditions).order_by(completed.c.completed_at)
+        ).scalars()
+        counts = _count_sorted(values, bucket)
+
+    if fill:
+        counts = _fill(counts, bucket, start, end)
+    return _bucket_rows(counts, bucket)
+
+
+def _bucket_rows(counts: Dict[datetime, int], bucket: str) -> List[Dict[str, Any]]:
+    width = BUCKET_WIDTHS[bucket]
+    return [
+        {"bucket_start": b, "bucket_end": b + width, "completed_count": n}
+        for b, n in counts.items()
+    ]
+
+
+def _day_aligned(value: Optional[datetime]) -> bool:
+    return value is None or value == bucket_floor(value, "day")
+
+
+def _rollup_counts(db: Session, user_id: int, bucket: str,
+                   start: Optional[datetime], end: Optional[datetime]) -> Dict[datetime, int]:
+    """Day/week counts from completion_rollups, with today merged from raw rows."""
+    first_day = start.date() if start is not None else date.min
+    end_day = end.date() if end is not None else date.max
+    counts: Dict[datetime, int] = {}
+    for day, fields in sorted(RollupService().daily(db, user_id, first_day, end_day).items()):
+        if fields["completed_count"]:
+            key = bucket_floor(datetime.combine(day, time.min), bucket)
+            counts[key] = counts.get(key, 0) + fields["completed_count"]
+    return counts
+
+
+def _count_sorted(values: Iterable[datetime], bucket: str) -> Dict[datetime, int]:
+    counts: Dict[datetime, int] = {}
+    current, count = None, 0
+    for value in values:
+        b = bucket_floor(value, bucket)
+        if b != current and current is not None:
+            counts[current] = count
+            count = 0
+        current = b
+        count += 1
+    if current is not None:
+        counts[current] = count
+    return counts
+
+
+def _fill(counts: Dict[datetime, int], bucket: str,
+          start: Optional[datetime], end: Optional[datetime]) -> Dict[datetime, int]:
+    """Insert zero-count buckets between the range bounds (or first/last data)."""
+    if not counts and (start is None or end is None):
+        return counts
+    first = bucket_floor(start, bucket) if start is not None else min(counts)
+    last = bucket_floor(end - timedelta(microseconds=1), bucket) if end is not None else max(counts)
+    width = BUCKET_WIDTHS[bucket]
+    if (last - first) / width + 1 > MAX_FILLED_BUCKETS:
+        raise ValueError(f"Range spans more than {MAX_FILLED_BUCKETS} {bucket} buckets; use a wider bucket or fill=false")
+    filled = {}
+    current = first
+    while current <= last:
+        filled[current] = counts.get(current, 0)
+        current += width
+    return filled
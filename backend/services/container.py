@@ -0,0 +1,154 @@
+from fastapi import Request
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import configure_mappers
+from database import SessionLocal, engine, Roadmap, TaskBankEntry, User, UserProgress
+from services.archive_service import ArchiveService
+from services.bulk_import_service import BulkImportService
+from services.data_version import DataVersionService
+from services.job_handlers import register_handlers
+from services.job_service import JobService
+from services.response_cache import ResponseCache
+from services.user_service import UserService
+from typing import Any, Callable, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Pooled connections opened (and returned) at warm-up, capped by the pool size
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+# Most recent active roadmaps copied into the roadmap cache (when ROADMAP_CACHE_TTL_SECONDS is set)
+WARMUP_PRIME_ROADMAPS = int(os.getenv("WARMUP_PRIME_ROADMAPS", "500"))
+# Send one tiny prompt so the LLM client's connection is set up before the first user needs it
+WARMUP_LLM_PING = os.getenv("WARMUP_LLM_PING", "0") == "1"
+
+# Id that no row has, so warm-up runs the hot read paths without touching data
+NO_USER = 0
+
+
+class Services:
+    """Long-lived services shared by every request of one process.
+
+    Built once by the app lifespan (or by worker.py) and handed to routes
+    through `Depends(get_services)`. `warm_up()` pays the one-off costs the
+    first requests would otherwise pay; `ready` turns true once it finished.
+    """
+
+    def __init__(self, jobs: JobService):
+        self.jobs = jobs
+        self.users = UserService()
+        self.archive = ArchiveService()
+        self.bulk_import = BulkImportService(self.users, jobs)
+        self.data_versions = DataVersionService()
+        self.response_cache = ResponseCache()
+        register_handlers(jobs, self.users, self.archive)
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start_warm_up(self) -> threading.Thread:
+        """Warm up on a background thread so the process answers liveness checks meanwhile."""
+        thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def warm_up(self) -> Dict[str, Dict[str, Any]]:
+        """Run each warm-up step, recording its time and outcome; a failed step does not block readiness."""
+        started = time.perf_counter()
+        self._step("mappers", configure_mappers)
+        self._step("connection_pool", self._warm_pool)
+        self._step("queries", self._warm_queries)
+        self._step("indexes", self._warm_indexes)
+        self._step("roadmap_cache", self._prime_roadmap_cache)
+        if WARMUP_LLM_PING:
+            self._step("llm_ping", self._ping_llm)
+        self._ready.set()
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - started,
+                    extra={"warmup": self.warmup})
+        return self.warmup
+
+    def _step(self, name: str, fn: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        started = time.perf_counter()
+        try:
+            result = {"ok": True, **(fn() or {})}
+        except Exception as e:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            result = {"ok": False, "error": str(e)}
+        result["seconds"] = round(time.perf_counter() - started, 4)
+        self.warmup[name] = result
+
+    def _warm_pool(self) -> Dict[str, Any]:
+        size = getattr(engine.pool, "size", lambda: 1)()
+        connections = []
+        try:
+            # Hold them all at once so the pool really opens that many
+            for _ in range(max(1, min(WARMUP_CONNECTIONS, size))):
+                conn = engine.connect()
+                connections.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            for conn in connections:
+                conn.close()
+        return {"connections": len(connections)}
+
+    def _warm_queries(self) -> None:
+        """Compile and cache the SQL of the hot read paths."""
+        db = SessionLocal()
+        try:
+            self.data_versions.get(db, NO_USER)
+            self.users.get_user_row(db, NO_USER)
+            self.users.get_active_roadmap_row(db, NO_USER)
+            self.users.list_task_rows(db, NO_USER)
+            db.get(UserProgress, NO_USER)
+            self.users.task_bank.take(db, NO_USER, 1, "step_tasks")
+        finally:
+            db.rollback()
+            db.close()
+
+    def _warm_indexes(self) -> Dict[str, Any]:
+        """Read the task bank and active roadmap lookups once, pulling their index pages into the DB cache."""
+        db = SessionLocal()
+        try:
+            bank = db.execute(
+                select(func.count()).select_from(TaskBankEntry).where(TaskBankEntry.consumed_at == None)
+            ).scalar()
+            roadmaps = db.execute(
+                select(func.count()).select_from(Roadmap).where(Roadmap.is_active == True)
+            ).scalar()
+            return {"task_bank_entries": bank, "active_roadmaps": roadmaps}
+        finally:
+            db.close()
+
+    def _prime_roadmap_cache(self) -> Dict[str, Any]:
+        llm = self.users.llm_service
+        if not llm.roadmap_cache.enabled:
+            return {"primed": 0, "skipped": "roadmap cache disabled"}
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(User.interests, User.time_duration, User.age, Roadmap.title, Roadmap.steps)
+                .join(Roadmap, Roadmap.user_id == User.id)
+                .where(Roadmap.is_active == True, Roadmap.is_fallback == False)
+                .order_by(Roadmap.created_at.desc())
+                .limit(WARMUP_PRIME_ROADMAPS)
+            ).all()
+        finally:
+            db.close()
+        primed = sum(
+            llm.prime_roadmap(row.interests or [], row.time_duration, row.age, {"title": row.title, "steps": row.steps})
+            for row in rows
+        )
+        return {"primed": primed}
+
+    def _ping_llm(self) -> Dict[str, Any]:
+        response = self.users.llm_service.llm.invoke("Reply with OK.")
+        return {"response_chars": len(str(getattr(response, "content", "")))}
+
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Session
+from database import User
+from typing import Optional
+
+
+class DataVersionService:
+    """Per-user monotonically increasing version of everything the user can read.
+
+    Writers call `bump` inside the transaction that changes the user's
+    profile, roadmaps or tasks, so a reader that sees version N also sees the
+    data written up to N. Readers turn the version into an ETag.
+    """
+
+    def bump(self, db: Session, user_id: int) -> None:
+        db.query(User).filter(User.id == user_id).update(
+            {User.data_version: User.data_version + 1}, synchronize_session=False
+        )
+
+    def get(self, db: Session, user_id: int) -> Optional[int]:
+        """Single-row lookup of the user's current version; None for an unknown user."""
+        return db.query(User.data_version).filter(User.id == user_id).scalar()
+
+
+def etag(user_id: int, version: int) -> str:
+    return f'"u{user_id}-v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires for GET."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or tag in [c[2:] if c.startswith("W/") else c for c in candidates]
@@ -0,0 +1,126 @@
+from sqlalchemy import event as sa_event
+from database import engine
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+import os
+import time
+
+# Total time a request may take before fallback content is served instead of waiting on the LLM
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+# Kept back from LLM and sources calls so fallback content can still be stored and returned
+DEADLINE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", "2"))
+# Threads running LLM calls on behalf of requests with a deadline
+LLM_CALL_THREADS = int(os.getenv("LLM_CALL_THREADS", "16"))
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out."""
+
+
+@dataclass
+class Degradation:
+    """Fallback content served in place of LLM output, and the job that upgrades it later."""
+    what: str  # roadmap | tasks
+    user_id: int
+    job_type: str
+    payload: Dict[str, Any]
+
+
+@dataclass
+class Budget:
+    """Time budget of one request, plus the fallbacks served while it ran.
+
+    `expires_at` is a time.monotonic() value, or None for work without a
+    deadline (background jobs), which only collects degradations.
+    """
+    expires_at: Optional[float] = None
+    reserve: float = DEADLINE_RESERVE_SECONDS
+    degraded: List[Degradation] = field(default_factory=list)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the hard deadline, after which even DB statements are refused."""
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+    def remaining_for_calls(self) -> Optional[float]:
+        """Seconds left for slow external calls (LLM, sources API), keeping the reserve back."""
+        remaining = self.remaining()
+        return None if remaining is None else remaining - self.reserve
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("request_budget", default=None)
+_executor = ThreadPoolExecutor(max_workers=LLM_CALL_THREADS, thread_name_prefix="deadline-call")
+
+
+@contextmanager
+def budget(seconds: Optional[float] = REQUEST_DEADLINE_SECONDS) -> Iterator[Budget]:
+    """Run the block under a fresh budget of `seconds` (None: no deadline, only collect degradations)."""
+    current = Budget(None if seconds is None else time.monotonic() + seconds)
+    token = _budget.set(current)
+    try:
+        yield current
+    finally:
+        _budget.reset(token)
+
+
+def current() -> Optional[Budget]:
+    return _budget.get()
+
+
+def check() -> None:
+    """Raise DeadlineExceeded once the current budget has run out."""
+    current_budget = _budget.get()
+    if current_budget is not None and current_budget.expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def clamp(timeout: float) -> float:
+    """`timeout` shortened to what the current budget leaves for an external call."""
+    current_budget = _budget.get()
+    remaining = current_budget.remaining_for_calls() if current_budget else None
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("No time left in the request budget")
+    return min(timeout, remaining)
+
+
+def call(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call a blocking function, giving up with DeadlineExceeded when the budget runs out.
+
+    Without a deadline this is a plain call. Otherwise `fn` runs on a pool
+    thread; an abandoned call keeps that thread until the client's own
+    timeout fires, but the request returns immediately.
+    """
+    current_budget = _budget.get()
+    remaining = current_budget.remaining_for_calls() if current_budget else None
+    if remaining is None:
+        return fn(*args, **kwargs)
+    if remaining <= 0:
+        raise DeadlineExceeded("No time left in the request budget")
+    future = _executor.submit(copy_context().run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=remaining)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(f"Call did not finish within the remaining {remaining:.1f}s budget")
+
+
+def degrade(what: str, user_id: int, job_type: str, **payload: Any) -> None:
+    """Record that fallback content was served; the caller's budget owner queues `job_type` to upgrade it."""
+    current_budget = _budget.get()
+    if current_budget is not None:
+        current_budget.degraded.append(Degradation(what, user_id, job_type, payload))
+
+
+@sa_event.listens_for(engine, "before_cursor_execute")
+def _refuse_statements_past_deadline(conn, cursor, statement, parameters, context, executemany):
+    check()
@@ -0,0 +1,228 @@
+from sqlalchemy import event as sa_event, func
+from sqlalchemy.orm import Session
+from database import SessionLocal, UserEvent
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "memory": events reach subscribers of this process only; "database": every process tails user_events
+EVENT_BUS = os.getenv("EVENT_BUS", "memory")
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "0.25"))
+EVENT_RETENTION_SECONDS = float(os.getenv("EVENT_RETENTION_SECONDS", "3600"))
+# Ids commit out of order; a row committing up to this long after a higher id was seen is still delivered
+EVENT_LOOKBACK_SECONDS = float(os.getenv("EVENT_LOOKBACK_SECONDS", "5"))
+# Per-subscriber buffer; a subscriber that falls further behind gets a "resync" event instead
+SUBSCRIBER_QUEUE_SIZE = 256
+POLL_BATCH_SIZE = 500
+PENDING_KEY = "pending_user_events"
+
+Event = Dict[str, Any]
+
+
+def emit(db: Session, user_id: int, event_type: str, **payload: Any) -> None:
+    """Queue an event on the session; it is published only once the transaction commits.
+
+    Payloads are built by the caller before commit (attributes are expired afterwards)
+    and must be JSON-serializable.
+    """
+    db.info.setdefault(PENDING_KEY, []).append({
+        "type": event_type,
+        "user_id": user_id,
+        "at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        **payload,
+    })
+
+
+class InProcessBackend:
+    """Delivers events straight to this process's subscribers."""
+
+    def __init__(self, bus: "EventBus"):
+        self.bus = bus
+
+    def publish(self, events: List[Event]) -> None:
+        self.bus.dispatch(events)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class DatabaseBackend:
+    """Writes events to user_events; a poller thread in each process dispatches new rows locally.
+
+    Works with any number of API processes and worker.py instances sharing the
+    database, without a broker. Ids are handed out at insert but become
+    visible at commit, so a lower id can appear after a higher one: the poller
+    rescans ids above a floor that trails the newest dispatched ids by
+    `lookback` seconds and skips the ones it already dispatched.
+    """
+
+    def __init__(self, bus: "EventBus", poll_interval: float = EVENT_POLL_SECONDS,
+                 retention: float = EVENT_RETENTION_SECONDS, lookback: float = EVENT_LOOKBACK_SECONDS):
+        self.bus = bus
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lookback = lookback
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def publish(self, events: List[Event]) -> None:
+        db = SessionLocal()
+        try:
+            db.add_all([UserEvent(user_id=e["user_id"], type=e["type"], payload=e) for e in events])
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-bus-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        floor = self._max_id()  # every id at or below it is settled
+        seen: "OrderedDict[int, float]" = OrderedDict()  # dispatched ids above the floor -> when
+        last_purge = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            db = SessionLocal()
+            try:
+                ids = db.query(UserEvent.id).filter(
+                    UserEvent.id > floor
+                ).order_by(UserEvent.id).limit(POLL_BATCH_SIZE + len(seen)).all()
+                new_ids = [row.id for row in ids if row.id not in seen][:POLL_BATCH_SIZE]
+                if new_ids:
+                    rows = db.query(UserEvent.id, UserEvent.payload).filter(
+                        UserEvent.id.in_(new_ids)
+                    ).order_by(UserEvent.id).all()
+                    now = time.monotonic()
+                    for row in rows:
+                        seen[row.id] = now
+                    self.bus.dispatch([row.payload for row in rows])
+                settled = time.monotonic() - self.lookback
+                while seen and next(iter(seen.values())) < settled:
+                    floor = max(floor, seen.popitem(last=False)[0])
+                if time.monotonic() - last_purge > 60:
+                    last_purge = time.monotonic()
+                    cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+                    db.query(UserEvent).filter(UserEvent.created_at < cutoff).delete(synchronize_session=False)
+                    db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Event poller error")
+            finally:
+                db.close()
+
+    def _max_id(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(UserEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+
+BACKENDS = {"memory": InProcessBackend, "database": DatabaseBackend}
+
+
+class EventBus:
+    """Per-user pub/sub for push delivery over WebSocket / SSE.
+
+    Events emitted on a session are handed to the backend after that
+    session's transaction commits (and dropped on rollback), so a client
+    reacting to an event always finds the data. Subscribers are asyncio
+    queues; dispatch is thread-safe.
+    """
+
+    def __init__(self, backend: str = EVENT_BUS):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown EVENT_BUS backend: {backend}")
+        self.backend = BACKENDS[backend](self)
+        self._subscribers: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def install(self, session_factory) -> None:
+        """Publish events emitted on sessions from `session_factory` when they commit."""
+        sa_event.listen(session_factory, "after_commit", self._after_commit)
+        sa_event.listen(session_factory, "after_transaction_end", self._after_transaction_end)
+
+    def publish(self, events: List[Event]) -> None:
+        try:
+            self.backend.publish(events)
+        except Exception:  # the write already committed; a lost push only means the client polls
+            logger.exception("Failed to publish %d events", len(events))
+
+    def dispatch(self, events: List[Event]) -> None:
+        """Hand events to this process's subscribers of the users they belong to."""
+        with self._lock:
+            targets = [(e, list(self._subscribers.get(e["user_id"], ()))) for e in events]
+        for event, subscribers in targets:
+            for loop, queue in subscribers:
+                try:
+                    loop.call_soon_threadsafe(_offer, queue, event)
+                except RuntimeError:  # subscriber's loop already closed
+                    pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        self.backend.start()
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def stop(self) -> None:
+        self.backend.stop()
+
+    def _after_commit(self, session: Session) -> None:
+        events = session.info.pop(PENDING_KEY, None)
+        if events:
+            self.publish(events)
+
+    def _after_transaction_end(self, session: Session, transaction) -> None:
+        # Anything still pending belonged to a transaction that rolled back or was closed
+        if transaction.parent is None:
+            session.info.pop(PENDING_KEY, None)
+
+
+def _offer(queue: asyncio.Queue, event: Event) -> None:
+    if queue.full():
+        # Too far behind to replay; tell the client to refetch instead
+        while not queue.empty():
+            queue.get_nowait()
+        event = {"type": "resync", "user_id": event["user_id"]}
+    queue.put_nowait(event)
+
+
+event_bus = EventBus()
+event_bus.install(SessionLocal)
@@ -0,0 +1,217 @@
+from sqlalchemy import select, union_all, and_, or_, literal
+from sqlalchemy.orm import Session
+from database import Roadmap, RoadmapArchive, Task, TaskArchive, TaskFailure
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import date, datetime, timezone
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet / Arrow IPC output needs `pip install pyarrow`
+    pa = None
+
+CHUNK_SIZE = 10000
+STATE_FILE = "_export_state.json"
+FORMATS = ("parquet", "arrow", "csv")
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow", "csv": "csv.gz"}
+
+TASK_COLUMNS = ["id", "user_id", "roadmap_id", "step_num", "title", "description", "assigned_time",
+                "sources", "completed", "completed_at", "created_at", "is_active"]
+ROADMAP_COLUMNS = ["id", "user_id", "title", "steps", "current_step", "created_at", "is_active"]
+FAILURE_COLUMNS = ["id", "user_id", "task_id", "failure_reason", "failure_date",
+                   "tasks_completed_count", "total_tasks_count"]
+JSON_COLUMNS = {"sources", "steps"}
+
+if pa is not None:
+    _ARROW_TYPES = {
+        "id": pa.int64(), "user_id": pa.int64(), "roadmap_id": pa.int64(), "task_id": pa.int64(),
+        "step_num": pa.int64(), "current_step": pa.int64(),
+        "tasks_completed_count": pa.int64(), "total_tasks_count": pa.int64(),
+        "completed": pa.bool_(), "is_active": pa.bool_(), "archived": pa.bool_(),
+        "assigned_time": pa.timestamp("us"), "completed_at": pa.timestamp("us"),
+        "created_at": pa.timestamp("us"), "failure_date": pa.timestamp("us"),
+    }
+
+
+def default_format() -> str:
+    return "parquet" if pa is not None else "csv"
+
+
+class ExportService:
+    """Streams tasks, roadmaps and task_failures into columnar files.
+
+    Rows are read in CHUNK_SIZE batches via Core execution and written one
+    batch at a time (a Parquet row group / Arrow record batch / CSV block),
+    so memory stays bounded by the chunk size. Archived tasks and roadmaps are
+    included with `archived = true`.
+
+    Incremental exports keep a per-table watermark in `_export_state.json`
+    inside the output directory and only write rows whose key timestamps
+    (created_at / completed_at, failure_date) moved past it.
+    """
+
+    TABLES = ("tasks", "roadmaps", "task_failures")
+
+    def columns(self, table: str) -> List[str]:
+        if table == "tasks":
+            return TASK_COLUMNS + ["archived"]
+        if table == "roadmaps":
+            return ROADMAP_COLUMNS + ["archived"]
+        if table == "task_failures":
+            return FAILURE_COLUMNS
+        raise ValueError(f"Unknown table: {table}")
+
+    def query(self, table: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """Select statement for a table, optionally limited to rows changed in (since, until]."""
+        def window(*key_columns):
+            conditions = []
+            for column in key_columns:
+                bounds = [column != None]
+                if since is not None:
+                    bounds.append(column > since)
+                if until is not None:
+                    bounds.append(column <= until)
+                conditions.append(bounds)
+            if since is None and until is None:
+                return []
+            return [or_(*[and_(*b) for b in conditions])]
+
+        if table == "tasks":
+            parts = []
+            for model, archived in ((Task, False), (TaskArchive, True)):
+                parts.append(
+                    select(*[getattr(model, c) for c in TASK_COLUMNS], literal(archived).label("archived"))
+                    .where(*window(model.created_at, model.completed_at))
+                )
+            return union_all(*parts)
+        if table == "roadmaps":
+            parts = []
+            for model, archived in ((Roadmap, False), (RoadmapArchive, True)):
+                parts.append(
+                    select(*[getattr(model, c) for c in ROADMAP_COLUMNS], literal(archived).label("archived"))
+                    .where(*window(model.created_at))
+                )
+            return union_all(*parts)
+        if table == "task_failures":
+            return select(*[getattr(TaskFailure, c) for c in FAILURE_COLUMNS]).where(*window(TaskFailure.failure_date))
+        raise ValueError(f"Unknown table: {table}")
+
+    def iter_chunks(self, db: Session, table: str, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield lists of at most CHUNK_SIZE row dicts."""
+        columns = self.columns(table)
+        stmt = self.query(table, since, until).execution_options(stream_results=True, yield_per=CHUNK_SIZE)
+        result = db.connection().execute(stmt)
+        for rows in result.partitions(CHUNK_SIZE):
+            chunk = []
+            for row in rows:
+                record = dict(zip(columns, row))
+                for column in JSON_COLUMNS.intersection(record):
+                    record[column] = json.dumps(record[column])
+                chunk.append(record)
+            yield chunk
+
+    def export_table(self, db: Session, table: str, path: str, fmt: str,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """Write one table to `path` in the given format; returns the row count."""
+        if fmt in ("parquet", "arrow") and pa is None:
+            raise RuntimeError("pyarrow is not installed; use format 'csv' or `pip install pyarrow`")
+        chunks = self.iter_chunks(db, table, since, until)
+        if fmt == "csv":
+            with gzip.open(path, "wt", newline="") as f:
+                return self._write_csv(f, table, chunks)
+        schema = self._arrow_schema(table)
+        rows = 0
+        if fmt == "parquet":
+            with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+                for chunk in chunks:
+                    writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    rows += len(chunk)
+        elif fmt == "arrow":
+            with pa.OSFile(path, "wb") as sink, pa_ipc.new_file(sink, schema) as writer:
+                for chunk in chunks:
+                    writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+                    rows += len(chunk)
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+        return rows
+
+    def export(self, db: Session, out_dir: str, fmt: Optional[str] = None,
+               tables=None, incremental: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Export tables into out_dir/<table>/; returns per-table file and row counts."""
+        fmt = fmt or default_format()
+        tables = tables or self.TABLES
+        os.makedirs(out_dir, exist_ok=True)
+        state = self._load_state(out_dir) if incremental else {}
+        until = datetime.now(timezone.utc).replace(tzinfo=None)
+        stamp = until.strftime("%Y%m%dT%H%M%S")
+        report = {}
+        for table in tables:
+            since = datetime.fromisoformat(state[table]) if table in state else None
+            table_dir = os.path.join(out_dir, table)
+            os.makedirs(table_dir, exist_ok=True)
+            suffix = "-incr" if since is not None else ""
+            path = os.path.join(table_dir, f"{table}-{stamp}{suffix}.{EXTENSIONS[fmt]}")
+            rows = self.export_table(db, table, path, fmt, since=since, until=until if incremental else None)
+            if rows == 0 and since is not None:
+                os.remove(path)  # nothing new since the last run
+                path = None
+            if incremental:
+                state[table] = until.isoformat()
+            report[table] = {"path": path, "rows": rows, "since": since}
+        if incremental:
+            self._save_state(out_dir, state)
+        return report
+
+    def stream_csv_gz(self, db: Session, table: str, since: Optional[datetime] = None) -> Iterator[bytes]:
+        """gzip-compressed CSV as a byte stream, one compressed block per chunk."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        columns = self.columns(table)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for chunk in self.iter_chunks(db, table, since=since):
+            writer.writerows(self._csv_rows(chunk))
+            data = compressor.compress(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+            if data:
+                yield data
+        yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+    def _write_csv(self, f, table: str, chunks) -> int:
+        writer = csv.DictWriter(f, fieldnames=self.columns(table))
+        writer.writeheader()
+        rows = 0
+        for chunk in chunks:
+            writer.writerows(self._csv_rows(chunk))
+            rows += len(chunk)
+        return rows
+
+    def _csv_rows(self, chunk):
+        for record in chunk:
+            yield {k: (v.isoformat() if isinstance(v, (datetime, date)) else v) for k, v in record.items()}
+
+    def _arrow_schema(self, table: str):
+        return pa.schema([(c, _ARROW_TYPES.get(c, pa.string())) for c in self.columns(table)])
+
+    def _load_state(self, out_dir: str) -> Dict[str, str]:
+        path = os.path.join(out_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_state(self, out_dir: str, state: Dict[str, str]) -> None:
+        path = os.path.join(out_dir, STATE_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
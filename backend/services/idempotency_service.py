@@ -0,0 +1,123 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal, IdempotencyKey
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# An in-progress claim older than this is treated as abandoned (e.g. the process died)
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+# Expired keys, and the response bodies stored on them, are deleted this often (0: only via manage.py)
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+
+class IdempotencyService:
+    """Claims Idempotency-Key values and stores the response they produced.
+
+    A key is claimed by inserting its row (the primary key makes the insert
+    the lock); the first request then stores its response on the row, which
+    later requests with the same key and fingerprint replay until expiry.
+    """
+
+    def claim(self, key: str, fingerprint: str) -> Tuple[str, Optional[IdempotencyKey]]:
+        """Returns ("claimed" | "completed" | "in_progress" | "mismatch", row for "completed")."""
+        db = SessionLocal()
+        now = datetime.utcnow()
+        try:
+            # Expired rows, including abandoned claims, no longer hold the key
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+            db.add(IdempotencyKey(
+                key=key, fingerprint=fingerprint, status="in_progress",
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+            ))
+            db.commit()
+            return "claimed", None
+        except IntegrityError:
+            db.rollback()
+            row = db.get(IdempotencyKey, key)
+            if row is None:  # released between our insert and read; caller retries
+                return "in_progress", None
+            if row.fingerprint != fingerprint:
+                return "mismatch", None
+            if row.status == "completed":
+                db.expunge(row)
+                return "completed", row
+            return "in_progress", None
+        finally:
+            db.close()
+
+    def complete(self, key: str, status: int, headers: List[List[str]], body: bytes) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+                IdempotencyKey.status: "completed",
+                IdempotencyKey.response_status: status,
+                IdempotencyKey.response_headers: headers,
+                IdempotencyKey.response_body: body,
+                IdempotencyKey.expires_at: datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str) -> None:
+        """Drop an in-progress claim so the request can be retried (after a server error)."""
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == "in_progress"
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete expired keys. The caller commits."""
+        return db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+
+
+class IdempotencyPurger:
+    """Daemon thread that periodically deletes expired Idempotency-Key rows."""
+
+    def __init__(self, interval_seconds: float, service: Optional[IdempotencyService] = None):
+        self.interval_seconds = interval_seconds
+        self.service = service or IdempotencyService()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idempotency-purger", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            db = SessionLocal()
+            try:
+                deleted = self.service.purge_expired(db)
+                db.commit()
+                if deleted:
+                    logger.info("Purged %d expired idempotency keys", deleted)
+            except Exception:
+                db.rollback()
+                logger.exception("Idempotency key purge failed")
+            finally:
+                db.close()
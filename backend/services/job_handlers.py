@@ -0,0 +1,100 @@
+from sqlalchemy.orm import Session
+from database import SessionLocal, Task
+from services.job_service import JobService
+from services.user_service import UserService
+from services.archive_service import ArchiveService
+from services.bulk_import_service import BulkImportService
+from services import deadline
+from services.deadline import Degradation
+from typing import Any, Dict, List
+import functools
+import os
+
+def enqueue_upgrades(jobs: JobService, degradations: List[Degradation]) -> None:
+    """Queue a background job per fallback that was served, to replace it with LLM content."""
+    if not degradations:
+        return
+    db = SessionLocal()
+    try:
+        for d in degradations:
+            jobs.enqueue(db, d.job_type, {"user_id": d.user_id, **d.payload}, user_id=d.user_id, lane="background")
+    finally:
+        db.close()
+
+def register_handlers(jobs: JobService, user_service: UserService, archive_service: ArchiveService) -> None:
+    """Bind every job type to the given service instances.
+
+    Used by both the API's inline worker pool and `python worker.py`.
+    """
+
+    def enqueue_enrichment(db: Session, user_id: int, task_ids: List[int]) -> None:
+        # Only worth a background round trip when a real sources API is configured
+        if task_ids and os.getenv("SOURCES_API_URL"):
+            jobs.enqueue(db, "enrich_sources", {"task_ids": task_ids}, user_id=user_id, lane="background")
+
+    def active_task_ids(db: Session, user_id: int) -> List[int]:
+        rows = db.query(Task.id).filter(Task.user_id == user_id, Task.is_active == True).all()
+        return [row[0] for row in rows]
+
+    def generate_roadmap(db: Session, payload: Dict[str, Any]) -> dict:
+        roadmap = user_service.generate_roadmap(db, payload["user_id"])
+        archive_service.archive_user(payload["user_id"])
+        enqueue_enrichment(db, payload["user_id"], active_task_ids(db, payload["user_id"]))
+        return roadmap.model_dump(mode="json")
+
+    def regenerate_roadmap(db: Session, payload: Dict[str, Any]) -> dict:
+        roadmap = user_service.regenerate_roadmap(db, payload["user_id"])
+        archive_service.archive_user(payload["user_id"])
+        enqueue_enrichment(db, payload["user_id"], active_task_ids(db, payload["user_id"]))
+        return roadmap.model_dump(mode="json")
+
+    def generate_step_tasks(db: Session, payload: Dict[str, Any]) -> dict:
+        tasks = user_service.generate_tasks(db, payload["user_id"])
+        enqueue_enrichment(db, payload["user_id"], [t.id for t in tasks.tasks])
+        return tasks.model_dump(mode="json")
+
+    def reassign_tasks(db: Session, payload: Dict[str, Any]) -> dict:
+        tasks = user_service.handle_task_failure(
+            db, payload["user_id"], payload["failure_reason"], payload["completed_tasks"]
+        )
+        return tasks.model_dump(mode="json")
+
+    def enrich_sources(db: Session, payload: Dict[str, Any]) -> dict:
+        return {"updated": user_service.enrich_task_sources(db, payload["task_ids"])}
+
+    def upgrade_roadmap(db: Session, payload: Dict[str, Any]) -> dict:
+        user_id = payload["user_id"]
+        upgraded = user_service.upgrade_fallback_roadmap(db, user_id, payload["roadmap_id"])
+        if upgraded:
+            archive_service.archive_user(user_id)
+            enqueue_enrichment(db, user_id, active_task_ids(db, user_id))
+        return {"upgraded": upgraded}
+
+    def upgrade_tasks(db: Session, payload: Dict[str, Any]) -> dict:
+        user_id = payload["user_id"]
+        upgraded = user_service.upgrade_fallback_tasks(
+            db, user_id, payload["task_ids"], payload["kind"],
+            payload.get("failure_reason", ""), payload.get("source_tasks")
+        )
+        if upgraded:
+            enqueue_enrichment(db, user_id, payload["task_ids"])
+        return {"upgraded": upgraded}
+
+    def upgrading(handler):
+        # Fallbacks served while a job runs get the same background upgrade as request ones
+        @functools.wraps(handler)
+        def run(db: Session, payload: Dict[str, Any]) -> Any:
+            with deadline.budget(None) as job_budget:
+                result = handler(db, payload)
+            enqueue_upgrades(jobs, job_budget.degraded)
+            return result
+        return run
+
+    jobs.register("generate_roadmap", upgrading(generate_roadmap))
+    jobs.register("regenerate_roadmap", upgrading(regenerate_roadmap))
+    jobs.register("generate_step_tasks", upgrading(generate_step_tasks))
+    jobs.register("reassign_tasks", upgrading(reassign_tasks))
+    jobs.register("enrich_sources", enrich_sources)
+    jobs.register("bulk_generate_roadmaps", BulkImportService(user_service, jobs).generate)
+    jobs.register("upgrade_roadmap", upgrading(upgrade_roadmap))
+    jobs.register("upgrade_tasks", upgrade_tasks)
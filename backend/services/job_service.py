@@ -0,0 +1,318 @@
+from sqlalchemy.orm import Session
+from database import SessionLocal, Job
+from services.tracing import tracer
+from services.structured_logging import set_request_id, reset_request_id
+from opentelemetry.trace import SpanKind
+from typing import Any, Callable, Dict, Iterable, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# "inline": the API process also runs a worker pool; "external": only `python worker.py` runs jobs
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "inline")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+# A running job whose lease is older than this is assumed abandoned by a dead worker
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+CLAIM_CANDIDATES = 5
+
+# Lower value = claimed first. Interactive requests jump ahead of background prefetch.
+LANES = {"interactive": 0, "background": 10}
+
+TERMINAL_STATUSES = ("succeeded", "failed", "dead")
+# Fallback re-check interval while long-polling (covers jobs finished by another process)
+POLL_INTERVAL_SECONDS = 1.0
+
+# Handlers take (db, payload) and return a JSON-serializable result
+JobHandler = Callable[[Session, Dict[str, Any]], Any]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+
+class JobService:
+    """Durable job queue stored in the `jobs` table.
+
+    Jobs are claimed with `SELECT ... FOR UPDATE SKIP LOCKED` on PostgreSQL
+    and with a conditional UPDATE (compare-and-swap on status) elsewhere, so
+    any number of worker threads or `worker.py` processes can share the queue.
+    Failed jobs are retried with exponential backoff and dead-lettered
+    (status "dead") after max_attempts; ValueError / PermanentJobError fail
+    immediately.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, JobHandler] = {}
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, list] = {}
+        self._work_available = threading.Event()
+        self._inline_worker = None
+        self._current = threading.local()
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        self.handlers[job_type] = handler
+
+    def enqueue(self, db: Session, job_type: str, payload: Dict[str, Any], user_id: Optional[int] = None,
+                lane: str = "interactive", max_attempts: int = JOB_MAX_ATTEMPTS,
+                run_after: Optional[datetime] = None) -> Job:
+        """Persist a pending job and commit; returns the row."""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job = Job(
+            id=uuid.uuid4().hex, type=job_type, user_id=user_id, payload=payload, status="pending",
+            priority=LANES[lane], max_attempts=max_attempts, run_after=run_after or datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if JOB_EXECUTOR == "inline":
+            self.start_inline_worker()
+        self._work_available.set()
+        return job
+
+    def get(self, db: Session, job_id: str) -> Optional[Job]:
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    def claim(self, db: Session, worker_id: str, lanes: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """Atomically take the next runnable job, highest-priority lane first."""
+        now = datetime.utcnow()
+        query = db.query(Job.id).filter(Job.status == "pending", Job.run_after <= now)
+        if lanes:
+            query = query.filter(Job.priority.in_([LANES[lane] for lane in lanes]))
+        query = query.order_by(Job.priority, Job.run_after, Job.created_at)
+        claim_values = {
+            Job.status: "running",
+            Job.locked_by: worker_id,
+            Job.locked_at: now,
+            Job.started_at: now,
+            Job.attempts: Job.attempts + 1,
+        }
+
+        if db.get_bind().dialect.name == "postgresql":
+            row = query.with_for_update(skip_locked=True).limit(1).first()
+            if row is None:
+                db.rollback()
+                return None
+            db.query(Job).filter(Job.id == row.id).update(claim_values, synchronize_session=False)
+            db.commit()
+            return self.get(db, row.id)
+
+        # No row locks: the status check in the UPDATE decides which worker wins
+        candidates = [row.id for row in query.limit(CLAIM_CANDIDATES).all()]
+        db.rollback()
+        for job_id in candidates:
+            claimed = db.query(Job).filter(Job.id == job_id, Job.status == "pending").update(
+                claim_values, synchronize_session=False
+            )
+            db.commit()
+            if claimed:
+                return self.get(db, job_id)
+        return None
+
+    def execute(self, db: Session, job: Job) -> None:
+        """Run a claimed job's handler and record success, retry or failure."""
+        job_id, job_type, payload = job.id, job.type, dict(job.payload or {})
+        self._current.job_id = job_id
+        # Log lines written by the handler carry the job id where requests carry theirs
+        log_token = set_request_id(f"job-{job_id}")
+        try:
+            handler = self.handlers.get(job_type)
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job type {job_type}")
+            with tracer.start_as_current_span(f"job {job_type}", kind=SpanKind.CONSUMER,
+                                              attributes={"app.job_id": job_id, "app.job_type": job_type}):
+                result = handler(db, payload)
+        except (ValueError, PermanentJobError) as e:
+            db.rollback()
+            self._finish(db, job_id, "failed", error=str(e))
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", job_id, job_type)
+            self._retry_or_bury(db, job_id, str(e))
+        else:
+            self._finish(db, job_id, "succeeded", result=result)
+        finally:
+            reset_request_id(log_token)
+            self._current.job_id = None
+
+    def current_job_id(self) -> Optional[str]:
+        """Id of the job executing on this thread, if any."""
+        return getattr(self._current, "job_id", None)
+
+    def report_progress(self, progress: Dict[str, Any], job_id: Optional[str] = None) -> None:
+        """Record progress for a job (default: the one running on this thread) and renew its lease.
+
+        Uses its own session and commits immediately so pollers see it.
+        """
+        job_id = job_id or self.current_job_id()
+        if job_id is None:
+            return
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id).update(
+                {Job.progress: progress, Job.locked_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def recover_stale(self, db: Session) -> int:
+        """Requeue running jobs whose worker stopped renewing them (e.g. crashed)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=LEASE_SECONDS)
+        stale = db.query(Job).filter(Job.status == "running", Job.locked_at < cutoff).all()
+        for job in stale:
+            self._retry_or_bury(db, job.id, f"Lease expired on worker {job.locked_by}")
+        return len(stale)
+
+    def retry(self, db: Session, job_id: str) -> Optional[Job]:
+        """Move a failed or dead job back to pending with a fresh attempt budget."""
+        job = self.get(db, job_id)
+        if job is None or job.status not in ("failed", "dead"):
+            return None
+        job.status, job.attempts, job.error = "pending", 0, None
+        job.run_after, job.locked_by, job.locked_at, job.finished_at = datetime.utcnow(), None, None, None
+        db.commit()
+        self._work_available.set()
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Sleep until the job finishes in this process or `timeout` elapses."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._lock:
+            self._waiters.setdefault(job_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    def wait_for_work(self, timeout: float) -> None:
+        """Block an idle worker until a job is enqueued in this process or timeout."""
+        if self._work_available.wait(timeout):
+            self._work_available.clear()
+
+    def start_inline_worker(self, concurrency: int = JOB_WORKERS) -> None:
+        with self._lock:
+            if self._inline_worker is None:
+                self._inline_worker = JobWorker(self, concurrency=concurrency)
+                self._inline_worker.start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            worker, self._inline_worker = self._inline_worker, None
+        if worker:
+            worker.stop()
+
+    def _finish(self, db: Session, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        db.query(Job).filter(Job.id == job_id).update({
+            Job.status: status, Job.result: result, Job.error: error,
+            Job.finished_at: datetime.utcnow(), Job.locked_by: None, Job.locked_at: None,
+        }, synchronize_session=False)
+        db.commit()
+        self._notify(job_id)
+
+    def _retry_or_bury(self, db: Session, job_id: str, error: str) -> None:
+        job = self.get(db, job_id)
+        if job is None:
+            return
+        if job.attempts >= job.max_attempts:
+            self._finish(db, job_id, "dead", error=error)
+            return
+        delay = min(RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), RETRY_MAX_SECONDS)
+        job.status, job.error = "pending", error
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+        job.locked_by, job.locked_at = None, None
+        db.commit()
+
+    def _notify(self, job_id: str) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(job_id, []))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # waiter's loop already closed
+                pass
+
+
+class JobWorker:
+    """Pool of threads that claim and execute jobs until stopped."""
+
+    def __init__(self, service: JobService, concurrency: int = JOB_WORKERS,
+                 lanes: Optional[Iterable[str]] = None, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.service = service
+        self.concurrency = concurrency
+        self.lanes = list(lanes) if lanes else None
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_recovery = 0.0
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, args=(f"{self.worker_id}:{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def request_stop(self) -> None:
+        """Stop claiming new jobs; running jobs finish first."""
+        self._stop.set()
+        self.service._work_available.set()
+
+    def stop(self, timeout: float = 5) -> None:
+        self.request_stop()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def join(self) -> None:
+        for thread in self._threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            job = None
+            db = SessionLocal()
+            try:
+                self._maybe_recover(db)
+                job = self.service.claim(db, worker_id, self.lanes)
+                if job is not None:
+                    self.service.execute(db, job)
+            except Exception:
+                db.rollback()
+                logger.exception("Job worker %s loop error", worker_id)
+            finally:
+                db.close()
+            if job is None:
+                self.service.wait_for_work(self.poll_interval)
+
+    def _maybe_recover(self, db: Session) -> None:
+        now = time.monotonic()
+        if now - self._last_recovery < LEASE_SECONDS / 10:
+            return
+        self._last_recovery = now
+        recovered = self.service.recover_stale(db)
+        if recovered:
+            logger.warning("Requeued %d jobs with expired leases", recovered)
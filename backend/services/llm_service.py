@@ -1,13 +1,79 @@
 from langchain_groq import ChatGroq
+from opentelemetry.trace import SpanKind
 from config import llm
+from services import deadline
+from services.request_timing import timed
+from services.shared_cache import SharedCache, cache_key
+from services.structured_logging import log_completion
+from services.tracing import tracer, traced_methods
 from typing import List, Dict, Any, Any
+from contextlib import contextmanager
+import hashlib
 import json
+import logging
+import os
 import re
+import threading
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+_usage_local = threading.local()
+
+# Reuse completions of identical prompts (0: off). Shared across workers with CACHE_BACKEND=sqlite
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "0"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Reuse roadmaps for users with the same interests, daily time and age (0: off); regeneration bypasses it
+ROADMAP_CACHE_TTL_SECONDS = float(os.getenv("ROADMAP_CACHE_TTL_SECONDS", "0"))
+ROADMAP_CACHE_MAX_ENTRIES = int(os.getenv("ROADMAP_CACHE_MAX_ENTRIES", "5000"))
+
+class LLMUsage:
+    """Token counts of the LLM calls made inside a track_llm_usage() block."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int) -> None:
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+
+@contextmanager
+def track_llm_usage():
+    """Collect token usage of every LLM call made by the current thread inside the block.
+
+    Blocks may nest; each active tracker sees every call.
+    """
+    usage = LLMUsage()
+    trackers = getattr(_usage_local, "trackers", None)
+    if trackers is None:
+        trackers = _usage_local.trackers = []
+    trackers.append(usage)
+    try:
+        yield usage
+    finally:
+        trackers.remove(usage)
+
+class CachedCompletion:
+    """Completion text served from the LLM cache, shaped like the provider's response."""
+
+    usage_metadata = None
+
+    def __init__(self, content: str):
+        self.content = content
+
+@traced_methods()
 class LLMService:
     def __init__(self):
         self.llm = llm
+        self.completion_cache = SharedCache("llm", LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+        self.roadmap_cache = SharedCache("roadmap", ROADMAP_CACHE_TTL_SECONDS, ROADMAP_CACHE_MAX_ENTRIES)
     
     def _extract_json_block(self, content: str) -> str:
         """Extract a balanced JSON object from the response, stripping code fences.
@@ -58,6 +124,47 @@ class LLMService:
         tasks_array = content[bracket_idx:end_idx + 1]
         return '{"tasks": ' + tasks_array + '}'
 
+    def _invoke(self, prompt: str, cache: bool = True):
+        """The LLM's completion of `prompt`, reused from the LLM cache when enabled and `cache` is set.
+
+        Concurrent identical prompts, also from other workers sharing the
+        cache, make a single LLM call.
+        """
+        if not (cache and self.completion_cache.enabled):
+            return self._call_llm(prompt)
+        model = getattr(self.llm, "model_name", type(self.llm).__name__)
+        key = cache_key(model, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        content = self.completion_cache.get_or_compute(
+            key, lambda: str(self._call_llm(prompt).content).encode("utf-8")
+        )
+        return CachedCompletion(content.decode("utf-8"))
+
+    def _call_llm(self, prompt: str):
+        """Call the LLM and report token usage to any active track_llm_usage() blocks.
+
+        Under a request budget the call is abandoned with DeadlineExceeded once
+        the budget runs out; callers then serve their fallback.
+        """
+        with tracer.start_as_current_span("llm.invoke", kind=SpanKind.CLIENT) as span, timed("llm"):
+            if span.is_recording():
+                span.set_attribute("gen_ai.request.model", str(getattr(self.llm, "model_name", type(self.llm).__name__)))
+                span.set_attribute("gen_ai.prompt.chars", len(prompt))
+            response = deadline.call(self.llm.invoke, prompt)
+            meta = getattr(response, "usage_metadata", None) or {}
+            if span.is_recording():
+                span.set_attribute("gen_ai.response.chars", len(str(response.content)))
+                for key in ("input_tokens", "output_tokens"):
+                    if key in meta:
+                        span.set_attribute(f"gen_ai.usage.{key}", meta[key])
+        trackers = getattr(_usage_local, "trackers", None)
+        if trackers:
+            # Rough 4-chars-per-token estimate when the provider reports no usage
+            input_tokens = meta.get("input_tokens", len(prompt) // 4)
+            output_tokens = meta.get("output_tokens", len(str(response.content)) // 4)
+            for usage in trackers:
+                usage.add(input_tokens, output_tokens)
+        return response
+
     def _safe_json_loads(self, text: str) -> Any:
         """Parse JSON, repairing common issues like unescaped backslashes and newlines."""
         try:
@@ -69,9 +176,37 @@ class LLMService:
             repaired = re.sub(r"\s+", " ", repaired)
             return json.loads(repaired)
     
-    def generate_roadmap(self, user_interests: List[str], time_duration: int, age: int) -> Dict[str, Any]:
-        """Generate a personalized roadmap based on user interests and time constraints"""
-        
+    def generate_roadmap(self, user_interests: List[str], time_duration: int, age: int,
+                         fresh: bool = False) -> Dict[str, Any]:
+        """Generate a personalized roadmap based on user interests and time constraints
+
+        Served from the roadmap cache for a profile seen before unless `fresh`;
+        fallback roadmaps are never cached.
+        """
+        if fresh or not self.roadmap_cache.enabled:
+            return self._generate_roadmap(user_interests, time_duration, age, fresh)
+        key = self._roadmap_key(user_interests, time_duration, age)
+        body = self.roadmap_cache.get_or_compute(
+            key,
+            lambda: json.dumps(self._generate_roadmap(user_interests, time_duration, age, fresh)).encode("utf-8"),
+            cacheable=lambda value: not json.loads(value).get("is_fallback"),
+        )
+        return json.loads(body)
+
+    def _roadmap_key(self, user_interests: List[str], time_duration: int, age: int) -> str:
+        return cache_key(",".join(sorted(i.strip().lower() for i in user_interests)), time_duration, age)
+
+    def prime_roadmap(self, user_interests: List[str], time_duration: int, age: int,
+                      roadmap_data: Dict[str, Any]) -> bool:
+        """Seed the roadmap cache with a stored roadmap unless the profile already has one; True if seeded."""
+        key = self._roadmap_key(user_interests, time_duration, age)
+        if not self.roadmap_cache.enabled or self.roadmap_cache.get(key) is not None:
+            return False
+        self.roadmap_cache.set(key, json.dumps(roadmap_data).encode("utf-8"))
+        return True
+
+    def _generate_roadmap(self, user_interests: List[str], time_duration: int, age: int,
+                          fresh: bool) -> Dict[str, Any]:
         prompt = f"""
         Create a comprehensive learning roadmap for a {age}-year-old developer who wants to learn about: {', '.join(user_interests)}.
         
@@ -95,13 +230,14 @@ class LLMService:
         """
         
         try:
-            response = self.llm.invoke(prompt)
+            response = self._invoke(prompt, cache=not fresh)
             content = response.content
+            log_completion("roadmap", content)
             json_str = self._extract_json_block(content)
             roadmap_data = self._safe_json_loads(json_str)
             return roadmap_data
-        except Exception as e:
-            print(f"Error generating roadmap: {e}")
+        except Exception:
+            logger.warning("Error generating roadmap, serving fallback", exc_info=True)
             # Fallback roadmap if LLM fails
             return {
                 "title": f"Learning Path for {', '.join(user_interests[:2])}",
@@ -111,7 +247,8 @@ class LLMService:
                     {"step_num": 3, "title": "Build Real Applications"},
                     {"step_num": 4, "title": "Advanced Concepts"},
                     {"step_num": 5, "title": "Portfolio Development"}
-                ]
+                ],
+                "is_fallback": True
             }
     
     def generate_tasks(self, roadmap_step: str, user_interests: List[str], time_duration: int,
@@ -175,32 +312,33 @@ class LLMService:
         """
         
         try:
-            response = self.llm.invoke(prompt)
+            response = self._invoke(prompt)
             content = response.content
-            print("--------------------------------")
-            print(f"Tasks from LLM: \n{content}")
-            print("--------------------------------")
+            log_completion("tasks", content, roadmap_step=roadmap_step)
             json_str = self._extract_json_block(content)
             tasks_data = self._safe_json_loads(json_str)
             return tasks_data.get("tasks", [])
-        except Exception as e:
-            print(f"Error generating tasks: {e}")
+        except Exception:
+            logger.warning("Error generating tasks, serving fallback", exc_info=True)
             # Fallback tasks if LLM fails
             return [
                 {
                     "title": f"Practice {roadmap_step} Basics",
                     "description": f"Spend {time_duration//2} minutes exploring the fundamentals of {roadmap_step}. Try to understand the core concepts and write down any questions you have.",
-                    "sources": []
+                    "sources": [],
+                    "is_fallback": True
                 },
                 {
                     "title": f"Hands-on {roadmap_step} Exercise",
                     "description": f"Complete a practical exercise related to {roadmap_step}. Follow a tutorial or create a simple project that demonstrates your understanding.",
-                    "sources": []
+                    "sources": [],
+                    "is_fallback": True
                 },
                 {
                     "title": f"Reflect on {roadmap_step} Learning",
                     "description": f"Take {time_duration//4} minutes to reflect on what you learned. Write down key takeaways and plan your next steps.",
-                    "sources": []
+                    "sources": [],
+                    "is_fallback": True
                 }
             ]
     
@@ -253,18 +391,21 @@ class LLMService:
             """
             
             try:
-                response = self.llm.invoke(prompt)
+                response = self._invoke(prompt)
                 content = response.content
+                log_completion("reassigned tasks", content)
                 json_str = self._extract_json_block(content)
                 tasks_data = self._safe_json_loads(json_str)
                 return tasks_data.get("tasks", [])
-            except Exception as e:
+            except Exception:
+                logger.warning("Error reassigning %d tasks, serving fallback", len(incomplete_tasks), exc_info=True)
                 # Fallback: return original tasks with more detail
                 return [
                     {
                         "title": f"Reassigned: {task['title']}",
                         "description": f"Let's break this down into smaller steps. {task['description']} Additional guidance: Take your time and don't hesitate to ask for help if needed.",
-                        "sources": []
+                        "sources": [],
+                        "is_fallback": True
                     }
                     for task in incomplete_tasks[:3]
                 ]
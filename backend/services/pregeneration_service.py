@@ -0,0 +1,309 @@
+from sqlalchemy.orm import Session
+from database import SessionLocal, User, Roadmap, Task, TaskFailure, TaskBankEntry, PregenerationRun
+from services.llm_service import LLMService, track_llm_usage
+from services.task_bank import TaskBankService, GENERIC_FAILURE_REASON
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from datetime import datetime, timedelta, time as dt_time
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PREGEN_CONCURRENCY = int(os.getenv("PREGEN_CONCURRENCY", "4"))
+PREGEN_TOKEN_BUDGET = int(os.getenv("PREGEN_TOKEN_BUDGET", "500000"))
+# Reserved per call before its real usage is known; replaced by the running average
+PREGEN_ESTIMATED_TOKENS_PER_CALL = 2500
+# USD per 1k tokens, for the run report only
+COST_PER_1K_INPUT = float(os.getenv("LLM_COST_PER_1K_INPUT", "0"))
+COST_PER_1K_OUTPUT = float(os.getenv("LLM_COST_PER_1K_OUTPUT", "0"))
+
+
+class Target(NamedTuple):
+    user_id: int
+    roadmap_id: int
+    step_num: int
+    kind: str  # step_tasks | reassignment
+    source_task_ids: Optional[Tuple[int, ...]] = None
+
+
+def _step_title(steps: List[Any], step_num: int) -> str:
+    for s in steps or []:
+        if isinstance(s, dict) and s.get("step_num") == step_num:
+            return s.get("title")
+    idx = min(max(step_num - 1, 0), len(steps) - 1)
+    step = steps[idx]
+    return step.get("title") if isinstance(step, dict) else str(step)
+
+
+def parse_window(window: str) -> Tuple[dt_time, dt_time]:
+    """'02:00-05:00' -> (start, end) in UTC; the window may wrap past midnight."""
+    start, end = (dt_time.fromisoformat(part.strip()) for part in window.split("-"))
+    return start, end
+
+
+def in_window(now: dt_time, start: dt_time, end: dt_time) -> bool:
+    return start <= now < end if start <= end else (now >= start or now < end)
+
+
+class _Budget:
+    """Thread-safe token budget with per-call reservations."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.spent = 0
+        self.reserved = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def estimate(self) -> int:
+        return self.spent // self.calls if self.calls else PREGEN_ESTIMATED_TOKENS_PER_CALL
+
+    def reserve(self) -> Optional[int]:
+        with self._lock:
+            amount = self.estimate()
+            if self.spent + self.reserved + amount > self.limit:
+                return None
+            self.reserved += amount
+            return amount
+
+    def settle(self, reserved: int, used: int, calls: int) -> None:
+        with self._lock:
+            self.reserved -= reserved
+            self.spent += used
+            self.calls += calls
+
+
+class PregenerationService:
+    """Fills the task bank for every user with an active roadmap.
+
+    Per active roadmap two targets are planned: the next step's tasks and a
+    reassignment-ready variant of the current step's incomplete tasks. Targets
+    already banked are skipped; the rest run on `concurrency` threads until
+    the run's token budget is exhausted.
+    """
+
+    def __init__(self, llm_service: Optional[LLMService] = None, concurrency: int = PREGEN_CONCURRENCY,
+                 token_budget: int = PREGEN_TOKEN_BUDGET):
+        self.llm_service = llm_service or LLMService()
+        self.task_bank = TaskBankService()
+        self.concurrency = concurrency
+        self.token_budget = token_budget
+
+    def plan(self, db: Session, max_users: Optional[int] = None) -> Tuple[List[Target], List[Target]]:
+        """Return (all targets, targets not yet covered by the bank)."""
+        query = db.query(Roadmap.id, Roadmap.user_id, Roadmap.steps, Roadmap.current_step).filter(
+            Roadmap.is_active == True
+        ).order_by(Roadmap.user_id)
+        if max_users:
+            query = query.limit(max_users)
+        roadmaps = query.all()
+        roadmap_ids = [r.id for r in roadmaps]
+        if not roadmap_ids:
+            return [], []
+
+        banked = {}
+        for entry in db.query(TaskBankEntry.roadmap_id, TaskBankEntry.step_num, TaskBankEntry.kind,
+                              TaskBankEntry.source_task_ids, TaskBankEntry.consumed_at).filter(
+                TaskBankEntry.roadmap_id.in_(roadmap_ids)):
+            banked[(entry.roadmap_id, entry.step_num, entry.kind)] = entry
+
+        incomplete = defaultdict(list)
+        for task_id, roadmap_id, step_num in db.query(Task.id, Task.roadmap_id, Task.step_num).filter(
+                Task.roadmap_id.in_(roadmap_ids), Task.is_active == True, Task.completed == False):
+            incomplete[(roadmap_id, step_num or 1)].append(task_id)
+
+        targets, missing = [], []
+        for r in roadmaps:
+            current = r.current_step or 1
+            if current < len(r.steps or []):
+                target = Target(r.user_id, r.id, current + 1, "step_tasks")
+                targets.append(target)
+                if (r.id, current + 1, "step_tasks") not in banked:
+                    missing.append(target)
+            task_ids = tuple(sorted(incomplete.get((r.id, current), [])))
+            if task_ids:
+                target = Target(r.user_id, r.id, current, "reassignment", task_ids)
+                targets.append(target)
+                entry = banked.get((r.id, current, "reassignment"))
+                if entry is None or entry.consumed_at is not None or tuple(entry.source_task_ids or ()) != task_ids:
+                    missing.append(target)
+        return targets, missing
+
+    def run(self, max_users: Optional[int] = None) -> Dict[str, Any]:
+        """Plan, generate and record one run; returns the coverage/cost report."""
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            run = PregenerationRun(started_at=datetime.utcnow(), report={})
+            db.add(run)
+            purged = self.task_bank.purge_inactive(db)
+            db.commit()
+            run_id = run.id
+            targets, missing = self.plan(db, max_users)
+        finally:
+            db.close()
+
+        budget = _Budget(self.token_budget)
+        outcomes = defaultdict(int)
+        usage_totals = {"input_tokens": 0, "output_tokens": 0}
+        lock = threading.Lock()
+
+        def work(target: Target) -> None:
+            reserved = budget.reserve()
+            if reserved is None:
+                with lock:
+                    outcomes["skipped_budget"] += 1
+                return
+            used, calls = 0, 0
+            try:
+                with track_llm_usage() as usage:
+                    generated = self._generate(target, usage)
+                used, calls = usage.total_tokens, usage.calls
+                with lock:
+                    usage_totals["input_tokens"] += usage.input_tokens
+                    usage_totals["output_tokens"] += usage.output_tokens
+                    outcomes[f"generated_{target.kind}" if generated else "failed"] += 1
+            except Exception:
+                logger.exception("Pre-generation failed for %s", target)
+                with lock:
+                    outcomes["failed"] += 1
+            finally:
+                budget.settle(reserved, used, calls)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pregen") as pool:
+            list(pool.map(work, missing))
+
+        covered_before = len(targets) - len(missing)
+        generated = outcomes["generated_step_tasks"] + outcomes["generated_reassignment"]
+        cost = (usage_totals["input_tokens"] * COST_PER_1K_INPUT
+                + usage_totals["output_tokens"] * COST_PER_1K_OUTPUT) / 1000
+        report = {
+            "active_roadmaps": len({t.roadmap_id for t in targets}),
+            "targets": len(targets),
+            "already_covered": covered_before,
+            "generated_step_tasks": outcomes["generated_step_tasks"],
+            "generated_reassignment": outcomes["generated_reassignment"],
+            "failed": outcomes["failed"],
+            "skipped_budget": outcomes["skipped_budget"],
+            "coverage_before": round(covered_before / len(targets), 4) if targets else 1.0,
+            "coverage_after": round((covered_before + generated) / len(targets), 4) if targets else 1.0,
+            "llm_calls": budget.calls,
+            "input_tokens": usage_totals["input_tokens"],
+            "output_tokens": usage_totals["output_tokens"],
+            "total_tokens": budget.spent,
+            "token_budget": self.token_budget,
+            "estimated_cost_usd": round(cost, 4),
+            "purged_inactive_entries": purged,
+            "duration_seconds": round(time.monotonic() - started, 2),
+        }
+        db = SessionLocal()
+        try:
+            db.query(PregenerationRun).filter(PregenerationRun.id == run_id).update({
+                PregenerationRun.finished_at: datetime.utcnow(),
+                PregenerationRun.report: report,
+            })
+            db.commit()
+        finally:
+            db.close()
+        report["run_id"] = run_id
+        return report
+
+    def _generate(self, target: Target, usage) -> bool:
+        """Generate and bank one target in its own session. False if the LLM call failed."""
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.id == target.user_id).first()
+            roadmap = db.query(Roadmap).filter(Roadmap.id == target.roadmap_id, Roadmap.is_active == True).first()
+            if user is None or roadmap is None:
+                return False
+            failure_reasons = [row[0] for row in db.query(TaskFailure.failure_reason).filter(
+                TaskFailure.user_id == user.id
+            ).order_by(TaskFailure.failure_date.desc()).limit(5).all()]
+
+            if target.kind == "step_tasks":
+                tasks = self.llm_service.generate_tasks(
+                    roadmap_step=_step_title(roadmap.steps, target.step_num),
+                    user_interests=user.interests,
+                    time_duration=user.time_duration,
+                    previous_failures=failure_reasons,
+                    all_steps=roadmap.steps,
+                    current_step_num=target.step_num
+                )
+            else:
+                incomplete = db.query(Task).filter(Task.id.in_(target.source_task_ids)).order_by(Task.id).all()
+                tasks = self.llm_service.reassign_tasks(
+                    [{"title": t.title, "description": t.description} for t in incomplete],
+                    GENERIC_FAILURE_REASON,
+                    user.interests,
+                    user.time_duration,
+                    failure_reasons
+                )
+            # LLMService swallows errors and returns canned fallback tasks, which are not worth banking
+            if usage.calls == 0 or not tasks or any(t.get("is_fallback") for t in tasks):
+                return False
+            self.task_bank.store(db, user.id, roadmap.id, target.step_num, target.kind, tasks, usage,
+                                 source_task_ids=list(target.source_task_ids) if target.source_task_ids else None)
+            db.commit()
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class PregenerationScheduler:
+    """Daemon thread that starts one pre-generation run per day inside an off-peak UTC window.
+
+    A run already recorded in pregeneration_runs for the current window (by
+    any process) suppresses another one.
+    """
+
+    def __init__(self, window: str, service: Optional[PregenerationService] = None, check_interval: float = 60):
+        self.start_time, self.end_time = parse_window(window)
+        self.service = service or PregenerationService()
+        self.check_interval = check_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pregeneration-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _window_started_at(self, now: datetime) -> datetime:
+        start = datetime.combine(now.date(), self.start_time)
+        if start > now:  # window wraps past midnight and began yesterday
+            start -= timedelta(days=1)
+        return start
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            now = datetime.utcnow()
+            if not in_window(now.time(), self.start_time, self.end_time):
+                continue
+            db = SessionLocal()
+            try:
+                already_ran = db.query(PregenerationRun.id).filter(
+                    PregenerationRun.started_at >= self._window_started_at(now)
+                ).first() is not None
+            finally:
+                db.close()
+            if already_ran:
+                continue
+            try:
+                report = self.service.run()
+                logger.info("Pre-generation run %s: %s", report["run_id"], report)
+            except Exception:
+                logger.exception("Pre-generation run failed")
@@ -0,0 +1,372 @@
+from concurrent.futures import thread as futures_thread
+from contextvars import Context, ContextVar
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+import asyncio.events
+import json
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+FORMATS = ("collapsed", "speedscope")
+EXTENSIONS = {"collapsed": "collapsed.txt", "speedscope": "speedscope.json"}
+MAX_PROFILE_SECONDS = 300
+MAX_PROFILED_REQUESTS = 100
+MAX_STACK_DEPTH = 200
+
+# Frames that run a callable inside a copied contextvars Context, mapped to how the
+# Context is found in their locals: asyncio callbacks and task steps, anyio worker
+# threads (FastAPI's threadpool for sync endpoints and dependencies), and
+# ThreadPoolExecutor work items (deadline.call for LLM calls)
+_CARRIERS = {
+    asyncio.events.Handle._run.__code__: lambda local: getattr(local.get("self"), "_context", None),
+    futures_thread._WorkItem.run.__code__: lambda local: getattr(getattr(local.get("self"), "fn", None), "__self__", None),
+}
+try:
+    from anyio._backends._asyncio import WorkerThread
+    _CARRIERS[WorkerThread.run.__code__] = lambda local: local.get("context")
+except (ImportError, AttributeError):
+    pass
+
+# Leaf frames of threads that are waiting rather than working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is still running."""
+
+
+@dataclass(eq=False)
+class ProfiledRequest:
+    """One request picked for profiling; its samples are grouped under `label`."""
+    number: int
+    label: str
+    finished: bool = False
+
+
+_profiled_request: ContextVar[Optional[ProfiledRequest]] = ContextVar("profiled_request", default=None)
+
+
+@dataclass(eq=False)
+class ProfileSession:
+    mode: str  # "seconds" or "requests"
+    format: str
+    path: str
+    interval_ms: float
+    include_idle: bool
+    seconds: Optional[float] = None
+    pattern: Optional[Pattern] = None
+    method: Optional[str] = None
+    count: int = 0
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    deadline: float = 0.0
+    status: str = "running"
+    error: Optional[str] = None
+    claimed: List[ProfiledRequest] = field(default_factory=list)
+    samples: int = 0
+    stacks: "Counter[Tuple[Any, Tuple[str, ...]]]" = field(default_factory=Counter)
+    stop: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "format": self.format,
+            "file": os.path.basename(self.path),
+            "status": self.status,
+            "error": self.error,
+            "started_at": self.started_at.isoformat().replace("+00:00", "Z"),
+            "seconds": self.seconds,
+            "pattern": self.pattern.pattern if self.pattern else None,
+            "method": self.method,
+            "count": self.count if self.mode == "requests" else None,
+            "profiled_requests": [r.label for r in self.claimed],
+            "samples": self.samples,
+            "interval_ms": self.interval_ms,
+            "pid": os.getpid(),
+        }
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler driven from a background thread.
+
+    Every `interval_ms` the stacks of all threads are read with
+    `sys._current_frames()`; nothing is installed in the profiled code, so a
+    profile can be started and stopped in a running worker. Samples are
+    aggregated per thread (`profile_for`) or per request (`profile_requests`)
+    and written to `directory` as collapsed stacks or a speedscope file. Only
+    one profile runs at a time.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.directory = directory
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._session: Optional[ProfileSession] = None
+        self._history: "deque[ProfileSession]" = deque(maxlen=20)
+
+    @property
+    def armed(self) -> bool:
+        """True while a request-mode profile may still pick up requests; checked per request."""
+        session = self._session
+        return session is not None and session.mode == "requests" and len(session.claimed) < session.count
+
+    def profile_for(self, seconds: float, fmt: str = "speedscope", include_idle: bool = False) -> ProfileSession:
+        """Sample every thread for `seconds`, grouped by thread name."""
+        session = self._new_session("seconds", fmt, include_idle, seconds=seconds)
+        session.deadline = time.monotonic() + seconds
+        return self._start(session)
+
+    def profile_requests(self, pattern: str, count: int, fmt: str = "speedscope", method: Optional[str] = None,
+                         timeout: float = MAX_PROFILE_SECONDS, include_idle: bool = False) -> ProfileSession:
+        """Profile the next `count` requests whose path matches the regex `pattern`.
+
+        Only threads working for a picked request are sampled: its event loop
+        callbacks, the threadpool thread running its endpoint and the
+        threads of its LLM calls. The profile is written once `count`
+        requests have finished, or after `timeout` seconds with what was seen.
+        """
+        session = self._new_session("requests", fmt, include_idle, pattern=re.compile(pattern),
+                                    method=method.upper() if method else None, count=count)
+        session.deadline = time.monotonic() + timeout
+        return self._start(session)
+
+    def stop(self) -> Optional[ProfileSession]:
+        """Finish the running profile early; its file is still written."""
+        session = self._session
+        if session is not None:
+            session.stop.set()
+        return session
+
+    def claim(self, method: str, path: str) -> Optional[ProfiledRequest]:
+        """Pick this request for the running request-mode profile, if it matches and a slot is left."""
+        session = self._session
+        if session is None or session.mode != "requests":
+            return None
+        if session.method and method != session.method or not session.pattern.search(path):
+            return None
+        with self._lock:
+            if self._session is not session or len(session.claimed) >= session.count:
+                return None
+            request = ProfiledRequest(len(session.claimed) + 1, f"{method} {path}")
+            session.claimed.append(request)
+            return request
+
+    def release(self, request: ProfiledRequest, label: Optional[str] = None) -> None:
+        if label:
+            request.label = label
+        request.finished = True
+
+    def sessions(self) -> Dict[str, Any]:
+        current = self._session
+        return {
+            "current": current.to_dict() if current else None,
+            "finished": [s.to_dict() for s in reversed(self._history)],
+        }
+
+    def files(self) -> List[Dict[str, Any]]:
+        """Profile files on disk, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(tuple(EXTENSIONS.values())):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append({
+                "name": name,
+                "bytes": stat.st_size,
+                "modified": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat().replace("+00:00", "Z"),
+            })
+        entries.sort(key=lambda e: e["modified"], reverse=True)
+        return entries
+
+    def file_path(self, name: str) -> Optional[str]:
+        """Path of a profile file by bare name, or None if there is no such file."""
+        if os.path.basename(name) != name or not name.endswith(tuple(EXTENSIONS.values())):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def _new_session(self, mode: str, fmt: str, include_idle: bool, **params: Any) -> ProfileSession:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"{stamp}-{mode}-{os.getpid()}.{EXTENSIONS[fmt]}")
+        return ProfileSession(mode=mode, format=fmt, path=path, interval_ms=self.interval_ms,
+                              include_idle=include_idle, **params)
+
+    def _start(self, session: ProfileSession) -> ProfileSession:
+        with self._lock:
+            if self._session is not None:
+                raise ProfilerBusy(f"A {self._session.mode} profile is already running")
+            self._session = session
+        threading.Thread(target=self._run, args=(session,), name="sampling-profiler", daemon=True).start()
+        return session
+
+    def _run(self, session: ProfileSession) -> None:
+        own = threading.get_ident()
+        interval = session.interval_ms / 1000
+        last = time.perf_counter()
+        try:
+            while not session.stop.wait(interval):
+                now = time.perf_counter()
+                self._sample(session, own, (now - last) * 1000)
+                last = now
+                if time.monotonic() >= session.deadline or self._requests_done(session):
+                    break
+            os.makedirs(self.directory, exist_ok=True)
+            write_profile(session)
+            session.status = "finished"
+        except Exception as e:
+            session.status = "failed"
+            session.error = str(e)
+        finally:
+            with self._lock:
+                self._session = None
+                self._history.append(session)
+
+    @staticmethod
+    def _requests_done(session: ProfileSession) -> bool:
+        return (session.mode == "requests" and len(session.claimed) >= session.count
+                and all(r.finished for r in session.claimed))
+
+    @staticmethod
+    def _sample(session: ProfileSession, own: int, weight_ms: float) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if not session.include_idle and _is_idle(frame):
+                continue
+            if session.mode == "requests":
+                group = _request_of(frame)
+                if group is None or group.finished:
+                    continue
+            else:
+                group = names.get(ident, f"thread {ident}")
+            session.stacks[(group, _stack(frame))] += weight_ms
+            session.samples += 1
+
+
+def _request_of(frame) -> Optional[ProfiledRequest]:
+    """The profiled request whose context the innermost context-running frame of this stack belongs to."""
+    child = None
+    depth = 0
+    while frame is not None and depth < MAX_STACK_DEPTH:
+        carrier = _CARRIERS.get(frame.f_code)
+        if carrier is not None:
+            # An idle anyio worker still holds the context of its last job
+            if child is not None and child.f_code.co_filename.endswith("queue.py"):
+                return None
+            context = carrier(frame.f_locals)
+            return context.get(_profiled_request) if isinstance(context, Context) else None
+        child, frame = frame, frame.f_back
+        depth += 1
+    return None
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    """Root-first frame labels like `generate_tasks (services/llm_service.py:42)`."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_BASE_DIR + os.sep):
+        return os.path.relpath(filename, _BASE_DIR)
+    if filename.startswith(_STDLIB_DIR + os.sep):
+        return os.path.relpath(filename, _STDLIB_DIR)
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    return filename[index + len(marker):] if index >= 0 else filename
+
+
+def _group_name(group: Any) -> str:
+    return f"#{group.number} {group.label}" if isinstance(group, ProfiledRequest) else str(group)
+
+
+def write_profile(session: ProfileSession) -> None:
+    """Write the session's samples to its path, replacing the file atomically."""
+    if session.format == "collapsed":
+        # Brendan Gregg's folded format, one `frame;frame;... weight` line per stack,
+        # weights in whole milliseconds; readable by flamegraph.pl and speedscope
+        lines = []
+        for (group, stack), weight in sorted(session.stacks.items(), key=lambda kv: _group_name(kv[0][0])):
+            frames = (_group_name(group),) + stack
+            lines.append(";".join(f.replace(";", ":") for f in frames) + f" {max(round(weight), 1)}\n")
+        content = "".join(lines)
+    else:
+        content = json.dumps(_speedscope(session))
+    tmp_path = session.path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, session.path)
+
+
+def _speedscope(session: ProfileSession) -> Dict[str, Any]:
+    """A speedscope file with one sampled profile per thread or request.
+
+    Identical stacks are merged with their summed duration as weight, so the
+    left-heavy and sandwich views are exact while the time-order view is not.
+    """
+    frame_index: Dict[str, int] = {}
+    frames: List[Dict[str, Any]] = []
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for (group, stack), weight in session.stacks.items():
+        name = _group_name(group)
+        profile = profiles.get(name)
+        if profile is None:
+            profile = profiles[name] = {"type": "sampled", "name": name, "unit": "milliseconds",
+                                        "startValue": 0, "endValue": 0, "samples": [], "weights": []}
+        indexes = []
+        for label in stack:
+            index = frame_index.get(label)
+            if index is None:
+                index = frame_index[label] = len(frames)
+                func, _, location = label.rpartition(" (")
+                file, _, line = location.rstrip(")").rpartition(":")
+                frames.append({"name": func, "file": file, "line": int(line)})
+            indexes.append(index)
+        profile["samples"].append(indexes)
+        profile["weights"].append(round(weight, 3))
+        profile["endValue"] = round(profile["endValue"] + weight, 3)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [profiles[name] for name in sorted(profiles)],
+        "name": os.path.basename(session.path),
+        "exporter": "developer-guidance sampling profiler",
+    }
+
+
+profiler = SamplingProfiler()
+
+
+def set_profiled_request(request: ProfiledRequest):
+    return _profiled_request.set(request)
+
+
+def reset_profiled_request(token) -> None:
+    _profiled_request.reset(token)
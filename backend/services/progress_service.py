@@ -0,0 +1,233 @@
+from sqlalchemy import func, case, select, union_all
+from sqlalchemy.orm import Session
+from database import Roadmap, Task, TaskArchive, UserProgress, StepProgress
+from typing import List, Dict, Any, Tuple
+
+
+class ProgressService:
+    """Maintains denormalized progress counters alongside task writes.
+
+    Every hook only touches the session; the caller commits, so counters land in
+    the same transaction as the task rows they describe. Rows that do not exist
+    yet (e.g. users created before the counters table) are rebuilt from raw rows
+    the first time they are needed.
+    """
+
+    def ensure(self, db: Session, user_id: int) -> UserProgress:
+        """Return the user's progress row, rebuilding it from raw rows if missing.
+
+        Call this before flushing new task rows so the rebuild does not count
+        them twice.
+        """
+        progress = db.get(UserProgress, user_id)
+        if progress is None:
+            progress = self.rebuild(db, user_id)
+        return progress
+
+    def on_roadmap_created(self, db: Session, roadmap: Roadmap) -> None:
+        """Point the user's counters at a freshly created roadmap."""
+        progress = self.ensure(db, roadmap.user_id)
+        progress.active_roadmap_id = roadmap.id
+        progress.current_step = roadmap.current_step or 1
+
+    def on_tasks_created(self, db: Session, user_id: int, roadmap_id: int, step_num: int, count: int) -> None:
+        """Add newly assigned tasks to the user and step totals."""
+        if count <= 0:
+            return
+        progress = self.ensure(db, user_id)
+        db.query(UserProgress).filter(UserProgress.user_id == user_id).update(
+            {UserProgress.tasks_total: UserProgress.tasks_total + count}
+        )
+        if progress.active_roadmap_id != roadmap_id:
+            return
+        self._ensure_step(db, user_id, roadmap_id, step_num)
+        db.query(StepProgress).filter(
+            StepProgress.roadmap_id == roadmap_id,
+            StepProgress.step_num == step_num
+        ).update({StepProgress.tasks_total: StepProgress.tasks_total + count})
+
+    def on_task_completed(self, db: Session, task: Task) -> None:
+        """Count a task that just transitioned from incomplete to completed."""
+        progress = self.ensure(db, task.user_id)
+        completed_at = task.completed_at
+        db.query(UserProgress).filter(UserProgress.user_id == task.user_id).update({
+            UserProgress.tasks_completed: UserProgress.tasks_completed + 1,
+            UserProgress.last_completed_at: case(
+                (UserProgress.last_completed_at == None, completed_at),
+                (UserProgress.last_completed_at < completed_at, completed_at),
+                else_=UserProgress.last_completed_at
+            ),
+        })
+        if task.is_active is not False and task.roadmap_id == progress.active_roadmap_id:
+            self._ensure_step(db, task.user_id, task.roadmap_id, task.step_num or 1)
+            db.query(StepProgress).filter(
+                StepProgress.roadmap_id == task.roadmap_id,
+                StepProgress.step_num == (task.step_num or 1)
+            ).update({StepProgress.tasks_completed: StepProgress.tasks_completed + 1})
+
+    def on_step_advanced(self, db: Session, roadmap: Roadmap) -> None:
+        """Track the roadmap's new current step."""
+        progress = self.ensure(db, roadmap.user_id)
+        progress.active_roadmap_id = roadmap.id
+        progress.current_step = roadmap.current_step
+
+    def on_roadmap_finished(self, db: Session, roadmap: Roadmap) -> None:
+        """Clear the active roadmap once it has been completed."""
+        progress = self.ensure(db, roadmap.user_id)
+        if progress.active_roadmap_id == roadmap.id:
+            progress.active_roadmap_id = None
+            progress.current_step = 1
+
+    def remaining_in_step(self, db: Session, roadmap_id: int, step_num: int) -> int:
+        """O(1) count of incomplete active tasks in a roadmap step."""
+        total, completed = self.step_counts(db, roadmap_id, step_num)
+        return max(total - completed, 0)
+
+    def step_counts(self, db: Session, roadmap_id: int, step_num: int) -> Tuple[int, int]:
+        """(tasks_total, tasks_completed) of a roadmap step; (0, 0) before any task exists."""
+        row = db.query(StepProgress.tasks_total, StepProgress.tasks_completed).filter(
+            StepProgress.roadmap_id == roadmap_id,
+            StepProgress.step_num == step_num
+        ).first()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def tasks_total(self, db: Session, user_id: int) -> int:
+        """The user's tasks_total counter, counted from raw rows without creating it when missing.
+
+        For read paths: an unknown user_id must not add a row pointing at a nonexistent user.
+        """
+        progress = db.get(UserProgress, user_id)
+        if progress is not None:
+            return progress.tasks_total
+        all_tasks = union_all(
+            select(Task.id).where(Task.user_id == user_id),
+            select(TaskArchive.id).where(TaskArchive.user_id == user_id)
+        ).subquery()
+        return db.execute(select(func.count()).select_from(all_tasks)).scalar()
+
+    def get_progress(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """Dashboard snapshot of the user's counters."""
+        progress = self.ensure(db, user_id)
+        steps = []
+        if progress.active_roadmap_id is not None:
+            steps = [
+                {
+                    "step_num": s.step_num,
+                    "tasks_total": s.tasks_total,
+                    "tasks_completed": s.tasks_completed,
+                }
+                for s in db.query(StepProgress).filter(
+                    StepProgress.roadmap_id == progress.active_roadmap_id
+                ).order_by(StepProgress.step_num).all()
+            ]
+        return {
+            "user_id": progress.user_id,
+            "active_roadmap_id": progress.active_roadmap_id,
+            "current_step": progress.current_step,
+            "tasks_total": progress.tasks_total,
+            "tasks_completed": progress.tasks_completed,
+            "last_completed_at": progress.last_completed_at,
+            "steps": steps,
+        }
+
+    def rebuild(self, db: Session, user_id: int) -> UserProgress:
+        """Recompute one user's counters from raw task and roadmap rows."""
+        expected = self._compute(db, user_id)
+        progress = db.get(UserProgress, user_id)
+        if progress is None:
+            progress = UserProgress(user_id=user_id)
+            db.add(progress)
+        progress.active_roadmap_id = expected["active_roadmap_id"]
+        progress.current_step = expected["current_step"]
+        progress.tasks_total = expected["tasks_total"]
+        progress.tasks_completed = expected["tasks_completed"]
+        progress.last_completed_at = expected["last_completed_at"]
+
+        db.query(StepProgress).filter(StepProgress.user_id == user_id).delete(synchronize_session=False)
+        for step_num, (total, completed) in expected["steps"].items():
+            db.add(StepProgress(
+                user_id=user_id,
+                roadmap_id=expected["active_roadmap_id"],
+                step_num=step_num,
+                tasks_total=total,
+                tasks_completed=completed
+            ))
+        db.flush()
+        return progress
+
+    def check(self, db: Session, user_id: int) -> List[str]:
+        """Compare stored counters with raw rows; returns human-readable mismatches."""
+        expected = self._compute(db, user_id)
+        progress = db.get(UserProgress, user_id)
+        if progress is None:
+            return [f"user {user_id}: no progress row"]
+        problems = []
+        for field in ("active_roadmap_id", "current_step", "tasks_total", "tasks_completed", "last_completed_at"):
+            stored = getattr(progress, field)
+            if stored != expected[field]:
+                problems.append(f"user {user_id}: {field} is {stored}, expected {expected[field]}")
+        stored_steps = {}
+        if progress.active_roadmap_id is not None:
+            stored_steps = {
+                s.step_num: (s.tasks_total, s.tasks_completed)
+                for s in db.query(StepProgress).filter(
+                    StepProgress.roadmap_id == progress.active_roadmap_id
+                ).all()
+            }
+        for step_num in sorted(set(stored_steps) | set(expected["steps"])):
+            stored = stored_steps.get(step_num, (0, 0))
+            wanted = expected["steps"].get(step_num, (0, 0))
+            if stored != wanted:
+                problems.append(f"user {user_id}: step {step_num} counters are {stored}, expected {wanted}")
+        return problems
+
+    def _ensure_step(self, db: Session, user_id: int, roadmap_id: int, step_num: int) -> None:
+        exists = db.query(StepProgress.id).filter(
+            StepProgress.roadmap_id == roadmap_id,
+            StepProgress.step_num == step_num
+        ).first()
+        if not exists:
+            db.add(StepProgress(user_id=user_id, roadmap_id=roadmap_id, step_num=step_num,
+                                tasks_total=0, tasks_completed=0))
+            db.flush()
+
+    def _compute(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """Derive the counters for one user from raw rows."""
+        all_tasks = union_all(
+            select(Task.completed, Task.completed_at).where(Task.user_id == user_id),
+            select(TaskArchive.completed, TaskArchive.completed_at).where(TaskArchive.user_id == user_id)
+        ).subquery()
+        total, completed, last_completed_at = db.execute(select(
+            func.count(),
+            func.coalesce(func.sum(case((all_tasks.c.completed == True, 1), else_=0)), 0),
+            func.max(all_tasks.c.completed_at)
+        )).one()
+
+        roadmap = db.query(Roadmap.id, Roadmap.current_step).filter(
+            Roadmap.user_id == user_id,
+            Roadmap.is_active == True
+        ).first()
+
+        steps: Dict[int, tuple] = {}
+        if roadmap:
+            rows = db.query(
+                Task.step_num,
+                func.count(Task.id),
+                func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0)
+            ).filter(
+                Task.roadmap_id == roadmap.id,
+                Task.is_active == True
+            ).group_by(Task.step_num).all()
+            for step_num, step_total, step_completed in rows:
+                key = step_num or 1
+                prev = steps.get(key, (0, 0))
+                steps[key] = (prev[0] + step_total, prev[1] + int(step_completed))
+
+        return {
+            "active_roadmap_id": roadmap.id if roadmap else None,
+            "current_step": (roadmap.current_step or 1) if roadmap else 1,
+            "tasks_total": total,
+            "tasks_completed": int(completed),
+            "last_completed_at": last_completed_at,
+            "steps": steps,
+        }
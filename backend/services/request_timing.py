@@ -0,0 +1,164 @@
+from sqlalchemy import event as sa_event
+from database import engine
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import threading
+import time
+
+# Set to 0 to drop the Server-Timing header and histograms entirely
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "1") != "0"
+CATEGORIES = ("db", "llm", "sources", "serialize")
+# Histogram bucket upper bounds in milliseconds; the last bucket is unbounded
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class RequestTimings:
+    """Time spent per category (db, llm, sources, serialize) by one request.
+
+    Shared by every thread that runs on a copy of the request's context; a
+    float add per timed call is all it costs.
+    """
+
+    __slots__ = ("started", "durations", "counts")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = dict.fromkeys(CATEGORIES, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(CATEGORIES, 0)
+
+    def add(self, category: str, seconds: float) -> None:
+        self.durations[category] += seconds
+        self.counts[category] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        """Milliseconds per category, plus `app` (everything else) and `total`."""
+        total = self.elapsed() * 1000
+        breakdown = {c: d * 1000 for c, d in self.durations.items()}
+        breakdown["app"] = max(total - sum(breakdown.values()), 0.0)
+        breakdown["total"] = total
+        return breakdown
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value, e.g. `db;dur=3.1;desc="12 calls", llm;dur=4210.7, ...`."""
+        parts = []
+        for name, ms in self.breakdown_ms().items():
+            count = self.counts.get(name)
+            desc = f';desc="{count} call{"" if count == 1 else "s"}"' if count else ""
+            parts.append(f"{name};dur={ms:.1f}{desc}")
+        return ", ".join(parts)
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start() -> Tuple[RequestTimings, object]:
+    """Begin timing the current request; pass the token to `stop`."""
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def stop(token) -> None:
+    _timings.reset(token)
+
+
+@contextmanager
+def timed(category: str) -> Iterator[None]:
+    """Add the block's duration to `category` of the current request, if one is being timed."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(category, time.perf_counter() - started)
+
+
+class Histogram:
+    __slots__ = ("counts", "total_ms", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.count = 0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None for the unbounded bucket)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {("+Inf" if i == len(BUCKETS_MS) else str(BUCKETS_MS[i])): n
+                        for i, n in enumerate(self.counts) if n},
+        }
+
+
+class TimingHistograms:
+    """Per-route histograms of each timing category, kept in process memory."""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, timings: RequestTimings) -> None:
+        breakdown = timings.breakdown_ms()
+        with self._lock:
+            per_category = self._histograms.get((method, route))
+            if per_category is None:
+                per_category = self._histograms[(method, route)] = {
+                    name: Histogram() for name in breakdown
+                }
+            for name, ms in breakdown.items():
+                per_category[name].observe(ms)
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [
+                {"method": method, "route": route,
+                 "timings": {name: h.snapshot() for name, h in per_category.items()}}
+                for (method, route), per_category in sorted(self._histograms.items(), key=lambda kv: kv[0][1])
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+timing_histograms = TimingHistograms()
+
+
+@sa_event.listens_for(engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if _timings.get() is not None:
+        context._timing_started = time.perf_counter()
+
+
+@sa_event.listens_for(engine, "after_cursor_execute")
+def _stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_timing_started", None)
+    timings = _timings.get()
+    if started is not None and timings is not None:
+        timings.add("db", time.perf_counter() - started)
@@ -0,0 +1,29 @@
+from typing import Optional
+import os
+
+from services.shared_cache import SharedCache, cache_key
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ResponseCache:
+    """Short-lived cache of rendered response bodies, shared by workers with CACHE_BACKEND=sqlite.
+
+    Keys include the user's data version, so a write never serves stale data:
+    it just makes the old entries unreachable until they expire or are evicted.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = SharedCache("response", ttl, max_entries)
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        return self._cache.get(cache_key(*key))
+
+    def put(self, key: tuple, body: bytes) -> None:
+        self._cache.set(cache_key(*key), body)
+
+    def clear(self) -> None:
+        self._cache.clear()
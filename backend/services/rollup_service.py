@@ -0,0 +1,127 @@
+from sqlalchemy import select, func, delete, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from database import Task, TaskArchive, TaskFailure, CompletionRollup
+from typing import Dict, Optional
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+ROLLUP_FIELDS = ("completed_count", "assigned_count", "failures")
+
+
+def _utc_day(value: Optional[datetime]) -> date:
+    if value is None:
+        return datetime.now(timezone.utc).date()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class RollupService:
+    """Maintains the completion_rollups table (one row per user per UTC day).
+
+    Hooks upsert into the caller's session so rollups commit with the event
+    that produced them. Dashboards read finished days from the rollup and
+    recompute only the current day from raw rows.
+    """
+
+    def on_tasks_assigned(self, db: Session, user_id: int, count: int, when: Optional[datetime] = None) -> None:
+        if count > 0:
+            self._increment(db, user_id, _utc_day(when), assigned_count=count)
+
+    def on_task_completed(self, db: Session, task: Task) -> None:
+        self._increment(db, task.user_id, _utc_day(task.completed_at), completed_count=1)
+
+    def on_failure(self, db: Session, user_id: int, when: Optional[datetime] = None) -> None:
+        self._increment(db, user_id, _utc_day(when), failures=1)
+
+    def daily(self, db: Session, user_id: int, start: date, end: date) -> Dict[date, Dict[str, int]]:
+        """Counters per day in [start, end): rollup rows for past days, raw rows for today."""
+        today = datetime.now(timezone.utc).date()
+        result: Dict[date, Dict[str, int]] = {}
+        rows = db.query(CompletionRollup).filter(
+            CompletionRollup.user_id == user_id,
+            CompletionRollup.day >= start,
+            CompletionRollup.day < min(end, today)
+        ).order_by(CompletionRollup.day).all()
+        for row in rows:
+            result[row.day] = {field: getattr(row, field) for field in ROLLUP_FIELDS}
+        if start <= today < end:
+            live = self._compute(db, user_id, since=today)
+            result[today] = live.get(today, {field: 0 for field in ROLLUP_FIELDS})
+        return result
+
+    def backfill(self, db: Session, user_id: Optional[int] = None) -> int:
+        """Rebuild rollup rows from raw tasks, archived tasks and failures.
+
+        Returns the number of (user, day) rows written. The caller commits.
+        """
+        counts = self._compute(db, user_id)
+        query = delete(CompletionRollup)
+        if user_id is not None:
+            query = query.where(CompletionRollup.user_id == user_id)
+        db.execute(query)
+        rows = 0
+        for (uid, day), fields in counts.items():
+            db.add(CompletionRollup(user_id=uid, day=day, **fields))
+            rows += 1
+        db.flush()
+        return rows
+
+    def _compute(self, db: Session, user_id: Optional[int] = None, since: Optional[date] = None):
+        """Group raw rows by (user_id, UTC day).
+
+        With `since` set, only days from that date onward are computed and the
+        result is keyed by day alone (user_id is then required).
+        """
+        counts = defaultdict(lambda: {field: 0 for field in ROLLUP_FIELDS})
+
+        def collect(field, user_col, time_col, selectable):
+            day = func.date(time_col)
+            query = select(user_col, day, func.count()).select_from(selectable).where(time_col != None)
+            if user_id is not None:
+                query = query.where(user_col == user_id)
+            if since is not None:
+                query = query.where(time_col >= datetime.combine(since, datetime.min.time()))
+            for uid, d, n in db.execute(query.group_by(user_col, day)).all():
+                key = _as_date(d) if since is not None else (uid, _as_date(d))
+                counts[key][field] += n
+
+        tasks = union_all(
+            select(Task.user_id, Task.completed_at, Task.created_at),
+            select(TaskArchive.user_id, TaskArchive.completed_at, TaskArchive.created_at)
+        ).subquery()
+        collect("completed_count", tasks.c.user_id, tasks.c.completed_at, tasks)
+        collect("assigned_count", tasks.c.user_id, tasks.c.created_at, tasks)
+        collect("failures", TaskFailure.user_id, TaskFailure.failure_date, TaskFailure)
+        return dict(counts)
+
+    def _increment(self, db: Session, user_id: int, day: date, **deltas: int) -> None:
+        """Atomically add `deltas` to the (user_id, day) row, creating it if needed."""
+        values = {field: deltas.get(field, 0) for field in ROLLUP_FIELDS}
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialect == "sqlite" else pg_insert
+            stmt = insert(CompletionRollup).values(user_id=user_id, day=day, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "day"],
+                set_={field: getattr(CompletionRollup, field) + getattr(stmt.excluded, field) for field in deltas}
+            )
+            db.execute(stmt)
+            return
+        row = db.query(CompletionRollup).filter(
+            CompletionRollup.user_id == user_id,
+            CompletionRollup.day == day
+        ).first()
+        if row is None:
+            db.add(CompletionRollup(user_id=user_id, day=day, **values))
+            db.flush()
+            return
+        db.query(CompletionRollup).filter(CompletionRollup.id == row.id).update(
+            {getattr(CompletionRollup, field): getattr(CompletionRollup, field) + n for field, n in deltas.items()}
+        )
@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from services import deadline
+
+logger = logging.getLogger(__name__)
+
+# "memory": entries live in this process only; "sqlite": one file shared by every worker process on the host
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_PATH = os.getenv("CACHE_PATH", "cache.db")
+# How long a worker computing a value holds its lease; others wait for the value meanwhile
+CACHE_LEASE_SECONDS = float(os.getenv("CACHE_LEASE_SECONDS", "60"))
+CACHE_POLL_SECONDS = 0.05
+# Expired and surplus sqlite entries are pruned once every this many writes per process
+PRUNE_EVERY = 256
+
+
+class MemoryBackend:
+    """LRU dict with per-entry expiry; visible to this process only."""
+
+    def __init__(self, namespace: str, max_entries: int):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store `value` unless a live entry exists; True if stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.time():
+                return False
+            self._entries[key] = (time.time() + ttl, value)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Entries in a local SQLite file in WAL mode, shared by every process that opens it.
+
+    Each thread keeps its own connection, reopened after a fork. When a
+    namespace exceeds `max_entries`, the entries closest to expiry are
+    evicted first.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, path: str = CACHE_PATH):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expiry ON cache_entries (namespace, expires_at)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (self.namespace, key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, value, time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store `value` unless a live entry exists; True if stored. Atomic across processes."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache_entries.expires_at < ?",
+            (self.namespace, key, value, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def prune(self) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at "
+            "LIMIT max((SELECT count(*) FROM cache_entries WHERE namespace = ?) - ?, 0))",
+            (self.namespace, self.namespace, self.namespace, self.max_entries),
+        )
+
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend}
+
+
+class SharedCache:
+    """Byte values under string keys with a fixed TTL, on the CACHE_BACKEND backend.
+
+    With the sqlite backend every worker process reads and fills the same
+    entries, and `get_or_compute` lets only one of them compute a missing
+    value while the others wait for it.
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int, backend: str = CACHE_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+        self.ttl = ttl
+        self.backend = BACKENDS[backend](namespace, max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        try:
+            return self.backend.get(key)
+        except sqlite3.Error:
+            logger.warning("Cache read failed for %s", key, exc_info=True)
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except sqlite3.Error:
+            logger.warning("Cache write failed for %s", key, exc_info=True)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_or_compute(self, key: str, compute: Callable[[], bytes],
+                       cacheable: Callable[[bytes], bool] = lambda value: True) -> bytes:
+        """Cached value of `key`, or `compute()` stored when `cacheable`.
+
+        Concurrent misses for the same key, in this process or another one
+        sharing the backend, wait for the first caller's value instead of
+        computing it again. Waiting respects the request budget; a lease
+        whose holder died expires after CACHE_LEASE_SECONDS.
+        """
+        if not self.enabled:
+            return compute()
+        value = self.get(key)
+        if value is not None:
+            return value
+        lease = f"{key}#lease"
+        try:
+            while not self.backend.add(lease, b"", CACHE_LEASE_SECONDS):
+                time.sleep(deadline.clamp(CACHE_POLL_SECONDS))
+                value = self.get(key)
+                if value is not None:
+                    return value
+        except sqlite3.Error:
+            logger.warning("Cache lease failed for %s", key, exc_info=True)
+            return compute()
+        try:
+            value = compute()
+            if cacheable(value):
+                self.set(key, value)
+            return value
+        finally:
+            try:
+                self.backend.delete(lease)
+            except sqlite3.Error:
+                logger.warning("Cache lease release failed for %s", key, exc_info=True)
+
+
+def cache_key(*parts: object) -> str:
+    return ":".join(str(part) for part in parts)
+
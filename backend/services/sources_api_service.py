@@ -1,6 +1,14 @@
+from services import deadline
+from services.request_timing import timed
 from typing import List, Dict, Any
 import requests
 import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SOURCES_API_TIMEOUT_SECONDS = float(os.getenv("SOURCES_API_TIMEOUT_SECONDS", "10"))
 
 class SourcesAPIService:
     """Service to handle calling external sources API"""
@@ -28,33 +36,34 @@ class SourcesAPIService:
                 for task in tasks_data
             ]
             
-            print(f"Calling sources API at {self.sources_api_url} with {len(payload)} tasks")
+            logger.debug("Calling sources API at %s with %d tasks", self.sources_api_url, len(payload))
             
             # Make API call
-            response = requests.post(
-                self.sources_api_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30  # 30 second timeout
-            )
+            with timed("sources"):
+                response = requests.post(
+                    self.sources_api_url,
+                    json=payload,
+                    headers={"Content-Type": "application/json"},
+                    timeout=deadline.clamp(SOURCES_API_TIMEOUT_SECONDS)  # never past the request deadline
+                )
             
             if response.status_code == 200:
                 sources_response = response.json()
                 # Convert to dict for easy lookup: {id: [sources]}
                 sources_dict = {item["id"]: item["sources"] for item in sources_response}
-                print(f"Successfully received sources for {len(sources_dict)} tasks")
+                logger.debug("Received sources for %d tasks", len(sources_dict))
                 return sources_dict
             else:
-                print(f"Sources API returned status {response.status_code}: {response.text}")
+                logger.warning("Sources API returned status %d: %.500s", response.status_code, response.text)
                 return {}
-        except requests.exceptions.Timeout:
-            print("Sources API call timed out")
+        except (requests.exceptions.Timeout, deadline.DeadlineExceeded):
+            logger.warning("Sources API call timed out")
             return {}
         except requests.exceptions.ConnectionError:
-            print("Could not connect to sources API")
+            logger.warning("Could not connect to sources API at %s", self.sources_api_url)
             return {}
-        except Exception as e:
-            print(f"Error calling sources API: {e}")
+        except Exception:
+            logger.exception("Error calling sources API")
             return {}
 
 # Mock implementation for testing purposes
@@ -71,5 +80,5 @@ class MockSourcesAPIService:
                 f"https://tutorial.com/{task['title'][:10].lower()}",
                 f"https://reference.com/api/{task['id']}"
             ]
-        print(f"Mock: Generated sources for {len(sources_dict)} tasks")
+        logger.debug("Mock: generated sources for %d tasks", len(sources_dict))
         return sources_dict
\ No newline at end of file
@@ -0,0 +1,184 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-logger overrides, e.g. "llm.completions=DEBUG,sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# json (one object per line) or text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Records waiting for the writer thread; further records are dropped rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of raw LLM completions logged, and how much of each
+LOG_COMPLETION_SAMPLE_RATE = float(os.getenv("LOG_COMPLETION_SAMPLE_RATE", "0.01"))
+LOG_COMPLETION_MAX_CHARS = int(os.getenv("LOG_COMPLETION_MAX_CHARS", "2000"))
+
+completion_logger = logging.getLogger("llm.completions")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def set_request_id(request_id: str):
+    """Tag log records from the current context with `request_id`; pass the token to `reset_request_id`."""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the request id of the context that logged them.
+
+    Attached to the queue handler, so it runs on the caller's thread where
+    the contextvar is visible, not on the writer thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id, then any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s]: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to a bounded queue drained by a QueueListener thread.
+
+    The caller only merges the message arguments and renders any traceback;
+    formatting and the stdout write happen on the listener thread. When the
+    queue is full the record is dropped and counted, and the count is logged
+    once there is room again.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.addFilter(RequestIdFilter())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the stock prepare, keep `extra=` fields and the traceback
+        # separate so the listener's formatter can render them as fields
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"Dropped {self.dropped} log records, queue was full", "request_id": None,
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, levels: str = LOG_LEVELS) -> None:
+    """Route the root logger through a non-blocking queue to stdout. Safe to call more than once."""
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    for spec in filter(None, (part.strip() for part in levels.split(","))):
+        name, _, logger_level = spec.partition("=")
+        logging.getLogger(name.strip()).setLevel(logger_level.strip().upper())
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def set_level(logger_name: Optional[str], level: str) -> str:
+    """Change a logger's level (the root logger for None) at runtime; returns the previous level name."""
+    target = logging.getLogger(logger_name)
+    previous = logging.getLevelName(target.level)
+    target.setLevel(level.upper())
+    return previous
+
+
+def log_completion(kind: str, content: str, **fields: Any) -> None:
+    """Log a raw LLM completion, cut to LOG_COMPLETION_MAX_CHARS, for a LOG_COMPLETION_SAMPLE_RATE fraction of calls.
+
+    Logged at INFO on the `llm.completions` logger, so
+    `LOG_LEVELS=llm.completions=WARNING` silences it entirely.
+    """
+    if LOG_COMPLETION_SAMPLE_RATE <= 0 or random.random() >= LOG_COMPLETION_SAMPLE_RATE:
+        return
+    if not completion_logger.isEnabledFor(logging.INFO):
+        return
+    completion_logger.info(
+        "LLM completion for %s", kind,
+        extra={
+            "completion": content[:LOG_COMPLETION_MAX_CHARS],
+            "completion_chars": len(content),
+            "truncated": len(content) > LOG_COMPLETION_MAX_CHARS,
+            **fields,
+        },
+    )
@@ -0,0 +1,81 @@
+from sqlalchemy.orm import Session
+from database import Roadmap, TaskBankEntry
+from services.llm_service import LLMUsage
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import re
+
+KINDS = ("step_tasks", "reassignment")
+# The prefetched reassignment cannot know the user's real reason; it assumes the most common one
+GENERIC_FAILURE_REASON = "I ran out of time and the tasks felt too big to finish in one session"
+# Submitted reasons that say no more than GENERIC_FAILURE_REASON, so the banked variant still fits
+GENERIC_FAILURE_PHRASES = (
+    GENERIC_FAILURE_REASON, "ran out of time", "I ran out of time", "not enough time", "no time",
+    "too busy", "tasks were too big", "the tasks were too big",
+)
+
+
+def _normalize_reason(reason: Optional[str]) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", (reason or "").lower()).split())
+
+
+_GENERIC_REASONS = {_normalize_reason(phrase) for phrase in GENERIC_FAILURE_PHRASES}
+
+
+def is_generic_failure_reason(reason: Optional[str]) -> bool:
+    """True for an empty reason or one of the stock phrases the banked reassignment was generated for."""
+    normalized = _normalize_reason(reason)
+    return not normalized or normalized in _GENERIC_REASONS
+
+
+class TaskBankService:
+    """Pre-generated tasks keyed by (roadmap, step, kind).
+
+    `step_tasks` entries replace the LLM call that generates a step's tasks;
+    `reassignment` entries replace the reassignment call after a failure, as
+    long as the user's incomplete tasks are still the ones the entry was
+    generated for and their failure reason is a generic one. Each entry is
+    consumed at most once.
+    """
+
+    def take(self, db: Session, roadmap_id: int, step_num: int, kind: str,
+             source_task_ids: Optional[List[int]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Claim an unconsumed entry in the caller's transaction; returns its tasks or None."""
+        entry = db.query(TaskBankEntry).filter(
+            TaskBankEntry.roadmap_id == roadmap_id,
+            TaskBankEntry.step_num == step_num,
+            TaskBankEntry.kind == kind,
+            TaskBankEntry.consumed_at == None
+        ).first()
+        if entry is None or not entry.tasks:
+            return None
+        if kind == "reassignment" and sorted(entry.source_task_ids or []) != sorted(source_task_ids or []):
+            return None
+        claimed = db.query(TaskBankEntry).filter(
+            TaskBankEntry.id == entry.id,
+            TaskBankEntry.consumed_at == None
+        ).update({TaskBankEntry.consumed_at: datetime.utcnow()}, synchronize_session=False)
+        return list(entry.tasks) if claimed else None
+
+    def store(self, db: Session, user_id: int, roadmap_id: int, step_num: int, kind: str,
+              tasks: List[Dict[str, Any]], usage: LLMUsage, source_task_ids: Optional[List[int]] = None) -> TaskBankEntry:
+        """Insert or replace the entry for (roadmap, step, kind). The caller commits."""
+        db.query(TaskBankEntry).filter(
+            TaskBankEntry.roadmap_id == roadmap_id,
+            TaskBankEntry.step_num == step_num,
+            TaskBankEntry.kind == kind
+        ).delete(synchronize_session=False)
+        entry = TaskBankEntry(
+            user_id=user_id, roadmap_id=roadmap_id, step_num=step_num, kind=kind, tasks=tasks,
+            source_task_ids=sorted(source_task_ids) if source_task_ids is not None else None,
+            input_tokens=usage.input_tokens, output_tokens=usage.output_tokens
+        )
+        db.add(entry)
+        return entry
+
+    def purge_inactive(self, db: Session) -> int:
+        """Delete entries whose roadmap is no longer active. The caller commits."""
+        active = db.query(Roadmap.id).filter(Roadmap.is_active == True)
+        return db.query(TaskBankEntry).filter(
+            ~TaskBankEntry.roadmap_id.in_(active)
+        ).delete(synchronize_session=False)
@@ -0,0 +1,95 @@
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from services.archive_service import completed_tasks_query
+from typing import Iterator, List, Optional, Tuple, Any
+from datetime import datetime, timedelta
+import base64
+import json
+
+Cursor = Tuple[datetime, int]
+
+STREAM_PAGE_SIZE = 500
+
+
+def encode_cursor(completed_at: datetime, task_id: int) -> str:
+    """Opaque keyset cursor for the (completed_at, id) position of a row."""
+    raw = f"{completed_at.isoformat()}|{task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        completed_at, task_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(completed_at), int(task_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def fetch_completed_page(db: Session, user_id: int, after: Optional[Cursor] = None,
+                         limit: Optional[int] = None, before_time: Optional[datetime] = None) -> List[Any]:
+    """Completed (id, title, completed_at) rows ordered by (completed_at, id).
+
+    Only the three projected columns are read, from both the live and archive
+    tables. `after` is an exclusive keyset position; `before_time` bounds
+    completed_at from above (exclusive).
+    """
+    completed = completed_tasks_query(user_id)
+    query = select(completed).where(completed.c.completed_at != None)
+    if after is not None:
+        after_time, after_id = after
+        query = query.where(or_(
+            completed.c.completed_at > after_time,
+            and_(completed.c.completed_at == after_time, completed.c.id > after_id)
+        ))
+    if before_time is not None:
+        query = query.where(completed.c.completed_at < before_time)
+    query = query.order_by(completed.c.completed_at, completed.c.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return db.execute(query).all()
+
+
+def fetch_completed_groups_page(db: Session, user_id: int, after: Optional[Cursor] = None,
+                                limit: Optional[int] = None) -> List[Any]:
+    """Like fetch_completed_page, but never splits a one-second group across pages.
+
+    The per-second grouping in /task/completed would otherwise report a
+    second twice when its rows straddle a page boundary, so the page is
+    extended to the end of the last row's second.
+    """
+    rows = fetch_completed_page(db, user_id, after=after, limit=limit)
+    if limit is None or len(rows) < limit:
+        return rows
+    last = rows[-1]
+    second_end = last.completed_at.replace(microsecond=0) + timedelta(seconds=1)
+    rows.extend(fetch_completed_page(
+        db, user_id, after=(last.completed_at, last.id), before_time=second_end
+    ))
+    return rows
+
+
+def iter_completed(user_id: int, after: Optional[Cursor] = None,
+                   page_size: int = STREAM_PAGE_SIZE) -> Iterator[Any]:
+    """Yield every completed row after the cursor, one keyset page at a time.
+
+    Uses its own short-lived session per page so a slow client never holds a
+    read transaction open, and server memory stays bounded by page_size.
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            rows = fetch_completed_page(db, user_id, after=after, limit=page_size)
+        finally:
+            db.close()
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = (rows[-1].completed_at, rows[-1].id)
+
+
+def ndjson_line(item: dict) -> bytes:
+    """Serialize one record as a newline-terminated JSON line."""
+    return (json.dumps(item, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)) + "\n").encode()
@@ -0,0 +1,205 @@
+from sqlalchemy import event as sa_event
+from database import engine
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, SimpleSpanProcessor, SpanExporter, SpanExportResult
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import functools
+import os
+import threading
+
+# Set to 0 to create no spans at all
+TRACING = os.getenv("TRACING", "1") != "0"
+# Finished spans kept in memory for GET /debug/traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+# Also append every span as one JSON line to this file
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+MAX_STATEMENT_LENGTH = 1000
+
+
+class RingBufferExporter(SpanExporter):
+    """Keeps the most recent finished spans in memory, grouped into traces on read."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self._spans: "deque[ReadableSpan]" = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock:
+            self._spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def traces(self, limit: int = 20, trace_id: Optional[str] = None, min_duration_ms: float = 0,
+               name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent traces first, each with its spans nested under their parents.
+
+        A trace is listed once its root span has finished; spans whose parent
+        was evicted from the buffer (or ran in another process) become roots.
+        """
+        with self._lock:
+            spans = list(self._spans)
+        by_trace: Dict[int, List[ReadableSpan]] = {}
+        for span in spans:
+            by_trace.setdefault(span.context.trace_id, []).append(span)
+        result = []
+        for tid, members in by_trace.items():
+            if trace_id and format(tid, "032x") != trace_id:
+                continue
+            tree = _nest(members)
+            root = tree[0]
+            if root["duration_ms"] < min_duration_ms or (name and name not in root["name"]):
+                continue
+            result.append({
+                "trace_id": format(tid, "032x"),
+                "name": root["name"],
+                "start": root["start"],
+                "duration_ms": root["duration_ms"],
+                "span_count": len(members),
+                "spans": tree,
+            })
+        result.sort(key=lambda t: t["start"], reverse=True)
+        return result[:limit]
+
+
+class JsonlFileExporter(SpanExporter):
+    """Appends spans to a file, one OpenTelemetry JSON span per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _span_dict(span: ReadableSpan) -> Dict[str, Any]:
+    return {
+        "name": span.name,
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "kind": span.kind.name,
+        "start": datetime.fromtimestamp(span.start_time / 1e9, timezone.utc).isoformat().replace("+00:00", "Z"),
+        "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "events": [{"name": e.name, "attributes": dict(e.attributes or {})} for e in span.events],
+        "children": [],
+    }
+
+
+def _nest(spans: Iterable[ReadableSpan]) -> List[Dict[str, Any]]:
+    """Span dicts arranged as a forest ordered by start time, longest root first."""
+    nodes = {span.context.span_id: (span, _span_dict(span)) for span in spans}
+    roots = []
+    for span, node in sorted(nodes.values(), key=lambda pair: pair[0].start_time):
+        parent = nodes.get(span.parent.span_id) if span.parent else None
+        (parent[1]["children"] if parent else roots).append(node)
+    roots.sort(key=lambda node: node["duration_ms"], reverse=True)
+    return roots
+
+
+span_buffer = RingBufferExporter()
+
+if TRACING:
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "developer-guidance-api"}),
+        sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(SimpleSpanProcessor(span_buffer))
+    if TRACE_FILE:
+        provider.add_span_processor(BatchSpanProcessor(JsonlFileExporter(TRACE_FILE)))
+    tracer = provider.get_tracer("developer-guidance")
+else:
+    provider = None
+    tracer = trace.NoOpTracer()
+
+
+def shutdown() -> None:
+    """Flush spans still waiting for the JSONL file."""
+    if provider is not None:
+        provider.shutdown()
+
+
+def traced(name: str) -> Callable:
+    """Run the decorated function in a span called `name`.
+
+    Methods following the (self, db, user_id, ...) convention also get an
+    `app.user_id` attribute.
+    """
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name) as span:
+                if len(args) > 2 and isinstance(args[2], int) and span.is_recording():
+                    span.set_attribute("app.user_id", args[2])
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_methods(*private: str) -> Callable[[type], type]:
+    """Class decorator: a span per call of every public method, plus the named private ones."""
+    def decorate(cls: type) -> type:
+        for attr, value in list(vars(cls).items()):
+            if callable(value) and (not attr.startswith("_") or attr in private):
+                setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+        return cls
+    return decorate
+
+
+# One CLIENT span per SQL statement, only inside an already recorded trace so
+# background pollers do not flood the buffer with single-span traces
+@sa_event.listens_for(engine, "before_cursor_execute")
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany):
+    if not trace.get_current_span().is_recording():
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    context._trace_span = tracer.start_span(operation, kind=SpanKind.CLIENT, attributes={
+        "db.system": conn.dialect.name,
+        "db.operation.name": operation,
+        "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+    })
+
+
+@sa_event.listens_for(engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.response.returned_rows", cursor.rowcount)
+        span.end()
+        context._trace_span = None
+
+
+@sa_event.listens_for(engine, "handle_error")
+def _fail_statement_span(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR, type(exception_context.original_exception).__name__))
+        span.end()
+        exception_context.execution_context._trace_span = None
@@ -0,0 +1,42 @@
+from services import deadline
+from contextlib import contextmanager
+from typing import Iterator
+import os
+import threading
+import weakref
+
+# How long a request waits for another in-flight transition of the same user
+USER_LOCK_TIMEOUT_SECONDS = float(os.getenv("USER_LOCK_TIMEOUT_SECONDS", "120"))
+
+
+class ConcurrentUpdateError(Exception):
+    """Another request changed or is changing the same user's roadmap; the caller may retry."""
+
+
+class UserLocks:
+    """Per-user re-entrant locks that serialize state transitions inside one process.
+
+    Locks are created on demand and dropped once no thread holds a reference.
+    Across processes the roadmap version check still guarantees that only one
+    transition wins; this only keeps same-process requests from racing at all.
+    """
+
+    def __init__(self, timeout: float = USER_LOCK_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._locks: "weakref.WeakValueDictionary[int, threading.RLock]" = weakref.WeakValueDictionary()
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, user_id: int) -> Iterator[None]:
+        with self._guard:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = threading.RLock()
+                self._locks[user_id] = lock
+        # A request waits no longer than its own deadline allows
+        if not lock.acquire(timeout=deadline.clamp(self.timeout)):
+            raise ConcurrentUpdateError(f"Another request for user {user_id} is still in progress")
+        try:
+            yield
+        finally:
+            lock.release()
@@ -1,16 +1,54 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
 from database import User, Roadmap, Task, TaskFailure
-from schemas.users import UserCreate, RoadmapResponse, TaskResponse, TasksResponse
+from schemas.users import UserCreate, RoadmapResponse, TaskResponse, TasksResponse, UserRow, RoadmapRow, TaskRow
 from services.llm_service import LLMService
 from services.sources_api_service import SourcesAPIService, MockSourcesAPIService
+from services.progress_service import ProgressService
+from services.rollup_service import RollupService
+from services.task_bank import TaskBankService, is_generic_failure_reason
+from services.user_locks import UserLocks, ConcurrentUpdateError
+from services.data_version import DataVersionService
+from services.event_bus import emit
+from services import deadline
+from services.tracing import traced_methods
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
+import functools
+import logging
+import random
+import time
 import uuid
 import os
 
+logger = logging.getLogger(__name__)
+
+# Attempts at a roadmap transition that keeps losing its version check to concurrent requests
+TRANSITION_ATTEMPTS = 3
+TRANSITION_RETRY_SECONDS = 0.05
+
+
+def serialized(method):
+    """Run a UserService method that takes (db, user_id, ...) while holding that user's lock."""
+    @functools.wraps(method)
+    def wrapper(self, db: Session, user_id: int, *args, **kwargs):
+        with self.user_locks.hold(user_id):
+            return method(self, db, user_id, *args, **kwargs)
+    return wrapper
+
+
+@traced_methods("_store_roadmap", "_generate_and_store_tasks_for_current_step", "_advance_if_step_done",
+                "_reassigned_tasks", "_retry_on_conflict")
 class UserService:
     def __init__(self):
         self.llm_service = LLMService()
+        self.progress = ProgressService()
+        self.rollups = RollupService()
+        self.task_bank = TaskBankService()
+        self.user_locks = UserLocks()
+        self.versions = DataVersionService()
         
         # Initialize sources API service
         # Check if we should use mock or real API
@@ -20,7 +58,7 @@ class UserService:
         else:
             # Use mock service for testing
             self.sources_service = MockSourcesAPIService()
-            print("Using mock sources API service")
+            logger.info("SOURCES_API_URL is not set, using mock sources API service")
     
     def create_user(self, db: Session, user_data: UserCreate) -> User:
         """Create a new user"""
@@ -35,34 +73,117 @@ class UserService:
         db.refresh(db_user)
         return db_user
     
+    def _record_tasks_created(self, db: Session, user_id: int, roadmap_id: int, step_num: int,
+                              tasks: List[Task]) -> None:
+        """Keep counters, rollups and the data version in step with new (flushed) task rows and push them."""
+        self.progress.on_tasks_created(db, user_id, roadmap_id, step_num, len(tasks))
+        self.rollups.on_tasks_assigned(db, user_id, len(tasks))
+        self.versions.bump(db, user_id)
+        if tasks:
+            emit(db, user_id, "tasks_created", roadmap_id=roadmap_id, step_num=step_num,
+                 tasks=[self._task_payload(t) for t in tasks])
+
+    def _record_task_completed(self, db: Session, task: Task) -> None:
+        """Keep progress counters, daily rollups and the data version in step with a newly completed task."""
+        self.progress.on_task_completed(db, task)
+        self.rollups.on_task_completed(db, task)
+        self.versions.bump(db, task.user_id)
+        emit(db, task.user_id, "tasks_updated", tasks=[self._task_payload(task)])
+
+    def _task_payload(self, task: Task) -> Dict[str, Any]:
+        """A task as pushed to subscribers: the TaskResponse JSON the REST endpoints return."""
+        return TaskResponse(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            assigned_time=task.assigned_time,
+            sources=task.sources or [],
+            completed=task.completed
+        ).model_dump(mode="json")
+
+    def _roadmap_created(self, db: Session, roadmap: Roadmap) -> None:
+        self.progress.on_roadmap_created(db, roadmap)
+        emit(db, roadmap.user_id, "roadmap_created", roadmap_id=roadmap.id, title=roadmap.title,
+             steps=roadmap.steps, current_step=roadmap.current_step or 1)
+        if roadmap.is_fallback:
+            deadline.degrade("roadmap", roadmap.user_id, "upgrade_roadmap", roadmap_id=roadmap.id)
+
+    def _note_fallback_tasks(self, roadmap: Roadmap, tasks: List[Task], kind: str, **payload: Any) -> None:
+        """Flag fallback tasks as degraded and queue their upgrade (a fallback roadmap's upgrade replaces them anyway)."""
+        fallback_ids = [t.id for t in tasks if t.is_fallback]
+        if fallback_ids and not roadmap.is_fallback:
+            deadline.degrade("tasks", roadmap.user_id, "upgrade_tasks", task_ids=fallback_ids, kind=kind, **payload)
+
+    def _complete_task(self, db: Session, task: Task) -> bool:
+        """Mark a task completed unless a concurrent request already did; True if this call did."""
+        completed_at = datetime.now(timezone.utc)
+        updated = db.query(Task).filter(Task.id == task.id, Task.completed == False).update(
+            {Task.completed: True, Task.completed_at: completed_at}, synchronize_session=False
+        )
+        if not updated:
+            return False
+        set_committed_value(task, "completed", True)
+        set_committed_value(task, "completed_at", completed_at)
+        self._record_task_completed(db, task)
+        return True
+
+    def _retry_on_conflict(self, db: Session, transition):
+        """Run `transition`, re-running it on fresh rows when a concurrent request changed the roadmap first."""
+        for attempt in range(TRANSITION_ATTEMPTS):
+            try:
+                return transition()
+            except StaleDataError:
+                db.rollback()
+                if attempt + 1 == TRANSITION_ATTEMPTS:
+                    raise ConcurrentUpdateError("Roadmap was changed by concurrent requests; please retry")
+                time.sleep(TRANSITION_RETRY_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+    
     def get_user_by_id(self, db: Session, user_id: int) -> Optional[User]:
         """Get user by ID"""
         return db.query(User).filter(User.id == user_id).first()
     
-    def generate_roadmap(self, db: Session, user_id: int) -> RoadmapResponse:
-        """Generate a new roadmap for the user"""
+    @serialized
+    def generate_roadmap(self, db: Session, user_id: int, fresh: bool = False) -> RoadmapResponse:
+        """Generate a new roadmap for the user; `fresh` skips the roadmap and LLM caches"""
         user = self.get_user_by_id(db, user_id)
         if not user:
             raise ValueError("User not found")
         
-        # Deactivate previous roadmaps
-        db.query(Roadmap).filter(Roadmap.user_id == user_id).update({"is_active": False})
+        self.progress.ensure(db, user_id)
         
         # Generate new roadmap using LLM
         roadmap_data = self.llm_service.generate_roadmap(
             user.interests, 
             user.time_duration, 
-            user.age
+            user.age,
+            fresh=fresh
         )
+        roadmap = self._store_roadmap(db, user, roadmap_data)
+        
+        return RoadmapResponse(
+            id=roadmap.id,
+            title=roadmap.title,
+            steps=roadmap.steps,
+            created_at=roadmap.created_at,
+            is_active=roadmap.is_active
+        )
+    
+    def _store_roadmap(self, db: Session, user: User, roadmap_data: Dict[str, Any]) -> Roadmap:
+        """Make `roadmap_data` the user's active roadmap and generate its step-1 tasks."""
+        # Deactivate previous roadmaps (after the LLM call, so no write transaction spans it)
+        self._deactivate_roadmaps(db, user.id)
         
         # Create roadmap in database
         roadmap = Roadmap(
-            user_id=user_id,
+            user_id=user.id,
             title=roadmap_data["title"],
             steps=roadmap_data["steps"],
-            is_active=True
+            is_active=True,
+            is_fallback=bool(roadmap_data.get("is_fallback"))
         )
         db.add(roadmap)
+        db.flush()
+        self._roadmap_created(db, roadmap)
         db.commit()
         db.refresh(roadmap)
 
@@ -72,15 +193,61 @@ class UserService:
             db.commit()
         except Exception:
             db.rollback()
-        
-        return RoadmapResponse(
-            id=roadmap.id,
-            title=roadmap.title,
-            steps=roadmap.steps,
-            created_at=roadmap.created_at,
-            is_active=roadmap.is_active
+        return roadmap
+
+    @serialized
+    def assign_generated_roadmap(self, db: Session, user_id: int, roadmap_data: Dict[str, Any],
+                                 tasks_data: List[Dict[str, Any]]) -> Roadmap:
+        """Store an already generated roadmap and step-1 tasks for a user. The caller commits."""
+        self.progress.ensure(db, user_id)
+        self._deactivate_roadmaps(db, user_id)
+        roadmap = Roadmap(
+            user_id=user_id,
+            title=roadmap_data["title"],
+            steps=roadmap_data["steps"],
+            is_active=True,
+            is_fallback=bool(roadmap_data.get("is_fallback"))
         )
-    
+        db.add(roadmap)
+        db.flush()
+        self._roadmap_created(db, roadmap)
+        assigned_time = datetime.now(timezone.utc)
+        tasks = [
+            Task(
+                user_id=user_id,
+                roadmap_id=roadmap.id,
+                step_num=1,
+                title=td["title"],
+                description=td["description"],
+                assigned_time=assigned_time,
+                sources=td.get("sources", []),
+                completed=False,
+                is_fallback=bool(td.get("is_fallback"))
+            )
+            for td in tasks_data
+        ]
+        db.add_all(tasks)
+        db.flush()
+        self._record_tasks_created(db, user_id, roadmap.id, 1, tasks)
+        self._note_fallback_tasks(roadmap, tasks, "step_tasks")
+        return roadmap
+
+    @serialized
+    def regenerate_roadmap(self, db: Session, user_id: int) -> RoadmapResponse:
+        """Deactivate all previous roadmaps and tasks, then generate a new roadmap"""
+        db.query(Task).filter(Task.user_id == user_id).update({"is_active": False})
+        self._deactivate_roadmaps(db, user_id)
+        db.commit()
+        # A regenerated roadmap should differ from the cached one for the same profile
+        return self.generate_roadmap(db, user_id, fresh=True)  # also generates initial tasks internally
+
+    def _deactivate_roadmaps(self, db: Session, user_id: int) -> None:
+        """Deactivate a user's roadmaps, bumping their versions so in-flight transitions on them fail."""
+        db.query(Roadmap).filter(Roadmap.user_id == user_id, Roadmap.is_active == True).update(
+            {Roadmap.is_active: False, Roadmap.version: Roadmap.version + 1}, synchronize_session="fetch"
+        )
+        self.versions.bump(db, user_id)
+
     def get_active_roadmap(self, db: Session, user_id: int) -> Optional[RoadmapResponse]:
         """Get the active roadmap for a user"""
         roadmap = db.query(Roadmap).filter(
@@ -99,6 +266,7 @@ class UserService:
             is_active=roadmap.is_active
         )
     
+    @serialized
     def generate_tasks(self, db: Session, user_id: int) -> TasksResponse:
         """Generate tasks for the user based on their active roadmap and current step"""
         user = self.get_user_by_id(db, user_id)
@@ -113,6 +281,8 @@ class UserService:
         if not roadmap:
             raise ValueError("No active roadmap found. Please generate a roadmap first.")
         
+        self.progress.ensure(db, user_id)
+        
         previous_failures = db.query(TaskFailure.failure_reason).filter(
             TaskFailure.user_id == user_id
         ).order_by(TaskFailure.failure_date.desc()).limit(5).all()
@@ -128,14 +298,17 @@ class UserService:
             idx = min(max(current_step_num - 1, 0), len(roadmap.steps) - 1)
             step = roadmap.steps[idx]
         step_title = step.get("title") if isinstance(step, dict) else str(step)
-        tasks_data = self.llm_service.generate_tasks(
-            roadmap_step=step_title,
-            user_interests=user.interests,
-            time_duration=user.time_duration,
-            previous_failures=failure_reasons,
-            all_steps=roadmap.steps,
-            current_step_num=current_step_num
-        )
+        # Pre-generated off-peak tasks turn this into a DB read
+        tasks_data = self.task_bank.take(db, roadmap.id, current_step_num, "step_tasks")
+        if tasks_data is None:
+            tasks_data = self.llm_service.generate_tasks(
+                roadmap_step=step_title,
+                user_interests=user.interests,
+                time_duration=user.time_duration,
+                previous_failures=failure_reasons,
+                all_steps=roadmap.steps,
+                current_step_num=current_step_num
+            )
         
         tasks = []
         assigned_time = datetime.now(timezone.utc)
@@ -149,7 +322,8 @@ class UserService:
                 description=task_data["description"],
                 assigned_time=assigned_time,
                 sources=task_data.get("sources", []),  # Use sources from LLM
-                completed=False
+                completed=False,
+                is_fallback=bool(task_data.get("is_fallback"))
             )
             db.add(task)
             db.flush()
@@ -163,11 +337,14 @@ class UserService:
                 completed=False
             ))
         
+        self._record_tasks_created(db, user_id, roadmap.id, current_step_num, created_task_objs)
+        self._note_fallback_tasks(roadmap, created_task_objs, "step_tasks")
         db.commit()
         return TasksResponse(tasks=tasks)
 
     def _generate_and_store_tasks_for_current_step(self, db: Session, user: User, roadmap: Roadmap) -> List[Task]:
         """Internal: generate tasks for current step and store; returns Task list."""
+        self.progress.ensure(db, user.id)
         current_step_num = getattr(roadmap, 'current_step', 1) or 1
         step = None
         for s in roadmap.steps:
@@ -182,14 +359,16 @@ class UserService:
             TaskFailure.user_id == user.id
         ).order_by(TaskFailure.failure_date.desc()).limit(5).all()
         failure_reasons = [failure[0] for failure in previous_failures]
-        tasks_data = self.llm_service.generate_tasks(
-            roadmap_step=step_title,
-            user_interests=user.interests,
-            time_duration=user.time_duration,
-            previous_failures=failure_reasons,
-            all_steps=roadmap.steps,
-            current_step_num=current_step_num
-        )
+        tasks_data = self.task_bank.take(db, roadmap.id, current_step_num, "step_tasks")
+        if tasks_data is None:
+            tasks_data = self.llm_service.generate_tasks(
+                roadmap_step=step_title,
+                user_interests=user.interests,
+                time_duration=user.time_duration,
+                previous_failures=failure_reasons,
+                all_steps=roadmap.steps,
+                current_step_num=current_step_num
+            )
         assigned_time = datetime.now(timezone.utc)
         created_tasks: List[Task] = []
         for td in tasks_data:
@@ -201,42 +380,87 @@ class UserService:
                 description=td["description"],
                 assigned_time=assigned_time,
                 sources=td.get("sources", []),  # Use sources from LLM
-                completed=False
+                completed=False,
+                is_fallback=bool(td.get("is_fallback"))
             )
             db.add(t)
             db.flush()
             created_tasks.append(t)
+        self._record_tasks_created(db, user.id, roadmap.id, current_step_num, created_tasks)
+        self._note_fallback_tasks(roadmap, created_tasks, "step_tasks")
         db.commit()
         return created_tasks
     
+    def enrich_task_sources(self, db: Session, task_ids: List[int]) -> int:
+        """Fill in sources from the sources API for tasks that have none; returns tasks updated"""
+        tasks = db.query(Task).filter(Task.id.in_(task_ids)).all()
+        missing = [t for t in tasks if not t.sources]
+        if not missing:
+            return 0
+        sources = self.sources_service.fetch_sources_for_tasks([
+            {"id": t.id, "title": t.title, "description": t.description} for t in missing
+        ])
+        updated_by_user: Dict[int, List[Task]] = {}
+        for task in missing:
+            if sources.get(task.id):
+                task.sources = sources[task.id]
+                updated_by_user.setdefault(task.user_id, []).append(task)
+        for user_id, updated_tasks in updated_by_user.items():
+            self.versions.bump(db, user_id)
+            emit(db, user_id, "tasks_updated", tasks=[self._task_payload(t) for t in updated_tasks])
+        db.commit()
+        return sum(len(t) for t in updated_by_user.values())
+
     def get_user_tasks(self, db: Session, user_id: int) -> TasksResponse:
         """Get all active incomplete tasks for a user"""
-        tasks = db.query(Task).filter(
-            Task.user_id == user_id,
-            Task.is_active == True,
-            Task.completed == False
-        ).all()
-        
-        task_responses = [
-            TaskResponse(
-                id=task.id,
-                title=task.title,
-                description=task.description,
-                assigned_time=task.assigned_time,
-                sources=getattr(task, 'sources', []),
-                completed=task.completed
+        return TasksResponse(tasks=[
+            TaskResponse.model_construct(
+                id=row.id,
+                title=row.title,
+                description=row.description,
+                assigned_time=row.assigned_time,
+                sources=row.sources,
+                completed=row.completed
             )
-            for task in tasks
-        ]
-        
-        return TasksResponse(tasks=task_responses)
+            for row in self.list_task_rows(db, user_id)
+        ])
+
+    def list_task_rows(self, db: Session, user_id: int) -> List[TaskRow]:
+        """Active incomplete tasks as plain rows, selecting only the response columns."""
+        rows = db.execute(
+            select(Task.id, Task.title, Task.description, Task.assigned_time, Task.sources, Task.completed)
+            .where(Task.user_id == user_id, Task.is_active == True, Task.completed == False)
+        )
+        return [TaskRow(id, title, description, assigned_time, sources or [], completed)
+                for id, title, description, assigned_time, sources, completed in rows]
+
+    def get_user_row(self, db: Session, user_id: int) -> Optional[UserRow]:
+        row = db.execute(
+            select(User.id, User.name, User.age, User.time_duration, User.interests, User.created_at)
+            .where(User.id == user_id)
+        ).first()
+        return UserRow(*row) if row else None
+
+    def get_active_roadmap_row(self, db: Session, user_id: int) -> Optional[RoadmapRow]:
+        row = db.execute(
+            select(Roadmap.id, Roadmap.title, Roadmap.steps, Roadmap.created_at, Roadmap.is_active)
+            .where(Roadmap.user_id == user_id, Roadmap.is_active == True)
+        ).first()
+        if not row:
+            return None
+        # Same shape RoadmapResponse gives the steps: only step_num and title
+        steps = [{"step_num": s["step_num"], "title": s["title"]} for s in row.steps]
+        return RoadmapRow(row.id, row.title, steps, row.created_at, row.is_active)
     
+    @serialized
     def handle_task_completion(self, db: Session, user_id: int, completed_tasks: List) -> dict:
         """Handle task completion and determine next steps"""
         user = self.get_user_by_id(db, user_id)
         if not user:
             raise ValueError("User not found")
         
+        self.progress.ensure(db, user_id)
+        
         # Update completed tasks
         completed_count = 0
         total_tasks = 0
@@ -253,48 +477,16 @@ class UserService:
             if task:
                 total_tasks += 1
                 if completed:
-                    task.completed = True
-                    task.completed_at = datetime.now(timezone.utc)
+                    if not task.completed:
+                        self._complete_task(db, task)
                     completed_count += 1
         
         db.commit()
         
         # Check if all tasks for current step are completed
-        roadmap = db.query(Roadmap).filter(Roadmap.user_id == user_id, Roadmap.is_active == True).first()
-        if roadmap:
-            current_step_num = getattr(roadmap, 'current_step', 1) or 1
-            remaining = db.query(Task).filter(
-                Task.user_id == user_id,
-                Task.roadmap_id == roadmap.id,
-                Task.step_num == current_step_num,
-                Task.completed == False,
-                Task.is_active == True
-            ).count()
-            if remaining == 0:
-                # advance step or finish roadmap
-                total_steps = len(roadmap.steps) if roadmap.steps else 0
-                if current_step_num >= total_steps:
-                    # Finish roadmap
-                    roadmap.is_active = False
-                    db.commit()
-                    return {"status": "roadmap_completed", "message": "Congratulations! You have completed the roadmap."}
-                else:
-                    roadmap.current_step = current_step_num + 1
-                    # Auto-generate next step tasks and return them
-                    user = self.get_user_by_id(db, user_id)
-                    tasks_created = self._generate_and_store_tasks_for_current_step(db, user, roadmap)
-                    db.commit()
-                    task_responses = [
-                        TaskResponse(
-                            id=t.id,
-                            title=t.title,
-                            description=t.description,
-                            assigned_time=t.assigned_time,
-                            sources=t.sources,
-                            completed=t.completed
-                        ) for t in tasks_created
-                    ]
-                    return {"tasks": [tr.model_dump() for tr in task_responses]}
+        result = self._retry_on_conflict(db, lambda: self._advance_if_step_done(db, user_id))
+        if result is not None:
+            return result
         
         # If not all current-step tasks completed
         if completed_count == total_tasks and total_tasks > 0:
@@ -308,6 +500,89 @@ class UserService:
             # No tasks completed - tasks will be handled by failure endpoint
             return {"status": "no_completion", "message": "No tasks were completed."}
     
+    def _advance_if_step_done(self, db: Session, user_id: int) -> Optional[dict]:
+        """Advance or finish the active roadmap once its current step is done; None if it is not.
+
+        The step change is committed before the next step's tasks are generated.
+        The roadmap's version check lets exactly one of several concurrent
+        requests win it (the others get StaleDataError), so the LLM is only
+        called once and no step is skipped. If generating the tasks then
+        fails, the result has status "tasks_pending" and a generate_step_tasks
+        job is queued by the request's budget owner (see deadline.degrade).
+        """
+        roadmap = db.query(Roadmap).filter(Roadmap.user_id == user_id, Roadmap.is_active == True).first()
+        if not roadmap:
+            return None
+        current_step_num = getattr(roadmap, 'current_step', 1) or 1
+        tasks_total, tasks_completed = self.progress.step_counts(db, roadmap.id, current_step_num)
+        # A step without tasks was just entered by a request that is still generating them
+        if tasks_total == 0 or tasks_completed < tasks_total:
+            return None
+        # advance step or finish roadmap
+        total_steps = len(roadmap.steps) if roadmap.steps else 0
+        if current_step_num >= total_steps:
+            # Finish roadmap
+            roadmap.is_active = False
+            self.progress.on_roadmap_finished(db, roadmap)
+            self.versions.bump(db, user_id)
+            emit(db, user_id, "roadmap_completed", roadmap_id=roadmap.id)
+            db.commit()
+            return {"status": "roadmap_completed", "message": "Congratulations! You have completed the roadmap."}
+        roadmap.current_step = current_step_num + 1
+        self.progress.on_step_advanced(db, roadmap)
+        self.versions.bump(db, user_id)
+        emit(db, user_id, "step_advanced", roadmap_id=roadmap.id, step_num=current_step_num + 1,
+             previous_step=current_step_num)
+        db.commit()
+        # Auto-generate next step tasks and return them
+        try:
+            user = self.get_user_by_id(db, user_id)
+            tasks_created = self._generate_and_store_tasks_for_current_step(db, user, roadmap)
+            db.commit()
+        except Exception:
+            # The advance is already committed; without tasks the new step could never be finished
+            db.rollback()
+            logger.warning("Generating tasks for step %d of roadmap %d failed; queued a retry",
+                           current_step_num + 1, roadmap.id, exc_info=True)
+            deadline.degrade("tasks", user_id, "generate_step_tasks")
+            return {"status": "tasks_pending", "step": current_step_num + 1,
+                    "message": "Moved to the next step; its tasks are still being generated.", "tasks": []}
+        task_responses = [
+            TaskResponse(
+                id=t.id,
+                title=t.title,
+                description=t.description,
+                assigned_time=t.assigned_time,
+                sources=t.sources,
+                completed=t.completed
+            ) for t in tasks_created
+        ]
+        return {"tasks": [tr.model_dump() for tr in task_responses]}
+
+    def _reassigned_tasks(self, db: Session, incomplete_tasks: List[Task], incomplete_tasks_data: List[Dict],
+                          failure_reason: str, user: User, failure_reasons: List[str]) -> List[Dict[str, Any]]:
+        """Reassigned task data: a pre-generated variant for exactly these tasks, else a live LLM call.
+
+        The variant was generated for GENERIC_FAILURE_REASON, so it is only used
+        when the user gave no reason or a generic one; a specific reason is
+        sent to the LLM.
+        """
+        if incomplete_tasks and is_generic_failure_reason(failure_reason):
+            banked = self.task_bank.take(
+                db, incomplete_tasks[0].roadmap_id, incomplete_tasks[0].step_num or 1, "reassignment",
+                source_task_ids=[t.id for t in incomplete_tasks]
+            )
+            if banked is not None:
+                return banked
+        return self.llm_service.reassign_tasks(
+            incomplete_tasks_data,
+            failure_reason,
+            user.interests,
+            user.time_duration,
+            failure_reasons
+        )
+
+    @serialized
     def handle_task_failure(self, db: Session, user_id: int, failure_reason: str, 
                           completed_tasks: List) -> TasksResponse:
         """Handle task failure and reassign tasks"""
@@ -315,6 +590,8 @@ class UserService:
         if not user:
             raise ValueError("User not found")
         
+        self.progress.ensure(db, user_id)
+        
         # Count completed tasks
         completed_count = 0
         total_tasks = 0
@@ -331,8 +608,8 @@ class UserService:
             if task:
                 total_tasks += 1
                 if completed:
-                    task.completed = True
-                    task.completed_at = datetime.now(timezone.utc)
+                    if not task.completed:
+                        self._complete_task(db, task)
                     completed_count += 1
         
         # Record the failure
@@ -344,6 +621,7 @@ class UserService:
             total_tasks_count=total_tasks
         )
         db.add(task_failure)
+        self.rollups.on_failure(db, user_id)
         
         # Get incomplete tasks
         incomplete_tasks = db.query(Task).filter(
@@ -370,16 +648,13 @@ class UserService:
             ]
             
             # Reassign tasks with more detail
-            reassigned_tasks = self.llm_service.reassign_tasks(
-                incomplete_tasks_data,
-                failure_reason,
-                user.interests,
-                user.time_duration,
-                failure_reasons
+            reassigned_tasks = self._reassigned_tasks(
+                db, incomplete_tasks, incomplete_tasks_data, failure_reason, user, failure_reasons
             )
             
             # Update existing tasks and create new ones
             tasks = []
+            new_tasks = []
             for i, task_data in enumerate(reassigned_tasks):
                 if i < len(incomplete_tasks):
                     # Update existing task
@@ -387,6 +662,7 @@ class UserService:
                     task.title = task_data["title"]
                     task.description = task_data["description"]
                     task.assigned_time = assigned_time
+                    task.is_fallback = bool(task_data.get("is_fallback"))
                 else:
                     # Create new task
                     task_id = f"task_{int(datetime.now(timezone.utc).timestamp() * 1000)}_{uuid.uuid4().hex[:8]}"
@@ -403,9 +679,11 @@ class UserService:
                         description=task_data["description"],
                         assigned_time=assigned_time,
                         sources=task_data.get("sources", []),
-                        completed=False
+                        completed=False,
+                        is_fallback=bool(task_data.get("is_fallback"))
                     )
                     db.add(task)
+                    new_tasks.append(task)
                 
                 tasks.append(TaskResponse(
                     id=task.id,
@@ -414,6 +692,11 @@ class UserService:
                     assigned_time=assigned_time,
                     completed=False
                 ))
+            if new_tasks:
+                db.flush()
+                self._record_tasks_created(
+                    db, user_id, new_tasks[0].roadmap_id, new_tasks[0].step_num, new_tasks
+                )
         else:
             # Some tasks completed - reassign incomplete tasks with more detail
             assigned_time = datetime.now(timezone.utc)
@@ -425,12 +708,8 @@ class UserService:
             ]
             
             # Reassign tasks with more detail
-            reassigned_tasks = self.llm_service.reassign_tasks(
-                incomplete_tasks_data,
-                failure_reason,
-                user.interests,
-                user.time_duration,
-                failure_reasons
+            reassigned_tasks = self._reassigned_tasks(
+                db, incomplete_tasks, incomplete_tasks_data, failure_reason, user, failure_reasons
             )
             
             # Update tasks
@@ -441,6 +720,7 @@ class UserService:
                     task.title = task_data["title"]
                     task.description = task_data["description"]
                     task.assigned_time = assigned_time
+                    task.is_fallback = bool(task_data.get("is_fallback"))
                     
                     tasks.append(TaskResponse(
                         id=task.id,
@@ -451,6 +731,18 @@ class UserService:
                         completed=False
                     ))
         
+        # Failure recorded and tasks rewritten
+        self.versions.bump(db, user_id)
+        rewritten = incomplete_tasks[:len(reassigned_tasks)]
+        if rewritten:
+            emit(db, user_id, "tasks_updated", tasks=[self._task_payload(t) for t in rewritten])
+        db.flush()
+        reassigned = rewritten + (new_tasks if completed_count == 0 else [])
+        if reassigned:
+            self._note_fallback_tasks(
+                reassigned[0].roadmap, reassigned, "reassignment",
+                failure_reason=failure_reason, source_tasks=incomplete_tasks_data
+            )
         db.commit()
         # Return only incomplete tasks (improved). If none left, generate next step tasks and return.
         remaining = db.query(Task).filter(Task.user_id == user_id, Task.completed == False, Task.is_active == True).all()
@@ -477,3 +769,85 @@ class UserService:
                 for t in created
             ])
         return TasksResponse(tasks=[])
+
+    @serialized
+    def upgrade_fallback_roadmap(self, db: Session, user_id: int, roadmap_id: int) -> bool:
+        """Replace a fallback roadmap with an LLM-generated one if the user has not started on it yet.
+
+        Raises RuntimeError while the LLM still fails, so the upgrade job retries.
+        Returns False when there is nothing (left) to upgrade.
+        """
+        roadmap = db.query(Roadmap).filter(
+            Roadmap.id == roadmap_id, Roadmap.user_id == user_id,
+            Roadmap.is_active == True, Roadmap.is_fallback == True
+        ).first()
+        if not roadmap or (roadmap.current_step or 1) > 1:
+            return False
+        started = db.query(Task.id).filter(Task.roadmap_id == roadmap.id, Task.completed == True).first()
+        if started:
+            return False
+        user = self.get_user_by_id(db, user_id)
+        roadmap_data = self.llm_service.generate_roadmap(user.interests, user.time_duration, user.age)
+        if roadmap_data.get("is_fallback"):
+            raise RuntimeError("LLM still unavailable; fallback roadmap kept")
+        db.query(Task).filter(Task.roadmap_id == roadmap.id).update({"is_active": False})
+        self._store_roadmap(db, user, roadmap_data)
+        return True
+
+    @serialized
+    def upgrade_fallback_tasks(self, db: Session, user_id: int, task_ids: List[int], kind: str,
+                               failure_reason: str = "", source_tasks: Optional[List[Dict]] = None) -> int:
+        """Rewrite fallback tasks the user has not completed yet with LLM output; returns tasks upgraded.
+
+        `kind` is "step_tasks" or "reassignment", the call that fell back.
+        Raises RuntimeError while the LLM still fails, so the upgrade job retries.
+        """
+        tasks = db.query(Task).filter(
+            Task.id.in_(task_ids), Task.user_id == user_id, Task.is_active == True,
+            Task.completed == False, Task.is_fallback == True
+        ).order_by(Task.id).all()
+        if not tasks:
+            return 0
+        roadmap = db.query(Roadmap).filter(Roadmap.id == tasks[0].roadmap_id, Roadmap.is_active == True).first()
+        if not roadmap:
+            return 0
+        user = self.get_user_by_id(db, user_id)
+        previous_failures = db.query(TaskFailure.failure_reason).filter(
+            TaskFailure.user_id == user_id
+        ).order_by(TaskFailure.failure_date.desc()).limit(5).all()
+        failure_reasons = [failure[0] for failure in previous_failures]
+        if kind == "reassignment":
+            generated = self.llm_service.reassign_tasks(
+                source_tasks or [{"title": t.title, "description": t.description} for t in tasks],
+                failure_reason,
+                user.interests,
+                user.time_duration,
+                failure_reasons
+            )
+        else:
+            step_num = tasks[0].step_num or 1
+            step_title = next((s.get("title") for s in roadmap.steps
+                               if isinstance(s, dict) and s.get("step_num") == step_num), f"Step {step_num}")
+            generated = self.llm_service.generate_tasks(
+                roadmap_step=step_title,
+                user_interests=user.interests,
+                time_duration=user.time_duration,
+                previous_failures=failure_reasons,
+                all_steps=roadmap.steps,
+                current_step_num=step_num
+            )
+        generated = [td for td in generated if not td.get("is_fallback")]
+        if not generated:
+            raise RuntimeError("LLM still unavailable; fallback tasks kept")
+        # Rewrite in place so ids, counters and step membership stay as they are
+        upgraded = []
+        for task, task_data in zip(tasks, generated):
+            task.title = task_data["title"]
+            task.description = task_data["description"]
+            task.sources = task_data.get("sources", [])
+            task.is_fallback = False
+            upgraded.append(task)
+        self.versions.bump(db, user_id)
+        emit(db, user_id, "tasks_updated", tasks=[self._task_payload(t) for t in upgraded])
+        db.commit()
+        return len(upgraded)
@@ -5,7 +5,6 @@ Simple test script to verify the API endpoints work correctly
 
 import requests
 import json
-import uuid
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000/api"
@@ -15,9 +14,7 @@ def test_user_registration():
     print("Testing user registration...")
     
     user_data = {
-        "uuid": str(uuid.uuid4()),
         "name": "John Doe",
-        "username": "johndoe",
         "age": 23,
         "time_duration": 60,
         "interests": ["backend", "docker", "python"]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Job worker for the Developer Guidance System
+
+Claims jobs from the `jobs` table and runs the LLM work (roadmap and task
+generation, reassignment, source enrichment) outside the API process. Run the
+API with JOB_EXECUTOR=external so only workers execute jobs.
+
+Usage:
+    python worker.py [--concurrency N] [--lanes interactive,background]
+"""
+
+import argparse
+import logging
+import signal
+import sys
+
+from services.job_service import JobService, JobWorker, JOB_WORKERS, LANES, POLL_INTERVAL_SECONDS
+from services.container import Services
+from services.structured_logging import configure_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Developer Guidance System job worker")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKERS, help="Jobs run in parallel (threads)")
+    parser.add_argument("--lanes", help=f"Comma-separated subset of {','.join(LANES)} (default: all)")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS,
+                        help="Seconds between queue checks when idle")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    lanes = args.lanes.split(",") if args.lanes else None
+    for lane in lanes or []:
+        if lane not in LANES:
+            print(f"Unknown lane: {lane}", file=sys.stderr)
+            return 2
+
+    jobs = JobService()
+    Services(jobs).warm_up()
+    worker = JobWorker(jobs, concurrency=args.concurrency, lanes=lanes, poll_interval=args.poll_interval)
+
+    def shutdown(signum, frame):
+        logging.info("Received signal %s, finishing running jobs", signum)
+        worker.request_stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    worker.start()
+    logging.info("Worker %s started with %d threads on lanes %s",
+                 worker.worker_id, args.concurrency, ",".join(lanes or LANES))
+    worker.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())